@@ -0,0 +1,137 @@
+"""Who is signed in, and what happened each night, as the dummy server
+sees it.
+
+Every captured sign in and sign out is applied to an ``Attendance``
+model as it arrives. Each event updates the set of cubs currently
+signed in and the summary of its night (its ``date`` field) in
+constant time, so queries never rescan the history. The dummy server
+serves them at ``/__attendance/present`` and
+``/__attendance/nights[?date=YYYY-MM-DD]``.
+
+The frontend sends ``time`` on a 12 hour clock without AM or PM, so
+times aren't compared. A night's first sign in and last sign out are
+those of the first and last events received.
+
+"""
+
+import threading
+
+
+class _Night:
+    __slots__ = (
+        "date",
+        "cubs",
+        "sign_ins",
+        "sign_outs",
+        "unmatched_sign_outs",
+        "present",
+        "first_sign_in",
+        "last_sign_out",
+    )
+
+    def __init__(self, date):
+        self.date = date
+        self.cubs = set()
+        self.sign_ins = 0
+        self.sign_outs = 0
+        self.unmatched_sign_outs = 0
+        self.present = 0
+        self.first_sign_in = None
+        self.last_sign_out = None
+
+    def summary(self):
+        return {
+            "date": self.date,
+            "cubs": len(self.cubs),
+            "sign_ins": self.sign_ins,
+            "sign_outs": self.sign_outs,
+            "unmatched_sign_outs": self.unmatched_sign_outs,
+            "present": self.present,
+            "first_sign_in": self.first_sign_in,
+            "last_sign_out": self.last_sign_out,
+        }
+
+
+class Attendance:
+    """The cubs signed in and a summary of each night.
+
+    Events from requests served before the last ``clear`` are ignored,
+    like captured requests. Every method is thread safe.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = 0
+        # Cub name -> (date, time) of the sign in they are still here from
+        self._present = {}
+        self._nights = {}
+
+    def clear(self, generation):
+        with self._lock:
+            self.generation = generation
+            self._present = {}
+            self._nights = {}
+
+    def _night(self, date):
+        night = self._nights.get(date)
+        if night is None:
+            night = self._nights[date] = _Night(date)
+        return night
+
+    def apply(self, generation, action, data):
+        """Apply a ``"sign-in"`` or ``"sign-out"`` with the request body
+        ``data``.
+
+        """
+        if not isinstance(data, dict):
+            return
+        name, date, time = data.get("cubName"), data.get("date"), data.get("time")
+        if not isinstance(name, str) or not isinstance(date, str):
+            return
+        name = name.strip()
+        with self._lock:
+            if generation < self.generation:
+                return
+            night = self._night(date)
+            signed_in = self._present.get(name)
+            if action == "sign-in":
+                night.sign_ins += 1
+                night.cubs.add(name)
+                if night.first_sign_in is None:
+                    night.first_sign_in = time
+                if signed_in is not None:
+                    # Signed in again without signing out
+                    self._nights[signed_in[0]].present -= 1
+                night.present += 1
+                self._present[name] = (date, time)
+            elif action == "sign-out":
+                night.sign_outs += 1
+                night.last_sign_out = time
+                if signed_in is None:
+                    night.unmatched_sign_outs += 1
+                else:
+                    self._nights[signed_in[0]].present -= 1
+                    del self._present[name]
+
+    def present(self):
+        """Return the cubs signed in, by name, with the date and time
+        they signed in.
+
+        """
+        with self._lock:
+            return [
+                {"cubName": name, "date": date, "time": time}
+                for name, (date, time) in sorted(self._present.items())
+            ]
+
+    def nights(self, date=None):
+        """Return the summary of every night, or only of ``date``, in date
+        order.
+
+        """
+        with self._lock:
+            if date is not None:
+                night = self._nights.get(date)
+                return [night.summary()] if night is not None else []
+            return [self._nights[date].summary() for date in sorted(self._nights)]
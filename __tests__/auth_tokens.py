@@ -0,0 +1,119 @@
+"""Signed, expiring tokens for the dummy server's auth mode.
+
+With ``auth=True`` the dummy server answers ``/v1/auth/google`` with a
+token and, like the production backend, rejects ``sign-in``,
+``sign-out`` and ``settings`` requests without a valid
+``Authorization: Bearer <token>`` header. Tests can skip the Google
+login by issuing a token themselves::
+
+    server = DummyServer(auth=True)
+    token = server.issue_token("akela@example.com", "Akela")
+
+A token is ``<payload>.<signature>``: the base64url encoded JSON
+claims and their HMAC-SHA256. Tokens that have already been verified
+are kept in a bounded LRU cache, so repeat requests only need a
+lookup and an expiry check.
+
+"""
+
+from collections import OrderedDict
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+DEFAULT_TOKEN_TTL = 3600
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+class InvalidToken(Exception):
+    """Raised when a token is malformed, forged or expired."""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenSigner:
+    """Issues and checks tokens signed with ``secret`` (bytes)."""
+
+    def __init__(self, secret, ttl=DEFAULT_TOKEN_TTL):
+        self.secret = secret
+        self.ttl = ttl
+
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).digest()
+
+    def issue(self, email, name="", now=None):
+        """Return a token for the user that expires in ``ttl`` seconds."""
+        expires = int((time.time() if now is None else now) + self.ttl)
+        claims = {"sub": email, "name": name, "exp": expires}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{payload}.{_b64encode(self._sign(payload))}"
+
+    def verify(self, token, now=None):
+        """Return a token's claims, raising ``InvalidToken`` if it isn't
+        valid.
+
+        """
+        payload, _, signature = token.partition(".")
+        try:
+            valid = hmac.compare_digest(self._sign(payload), _b64decode(signature))
+            claims = json.loads(_b64decode(payload)) if valid else None
+        except (binascii.Error, UnicodeError, ValueError):
+            raise InvalidToken("Malformed token")
+        if claims is None:
+            raise InvalidToken("Bad token signature")
+        if claims["exp"] <= (time.time() if now is None else now):
+            raise InvalidToken("Token has expired")
+        return claims
+
+
+class TokenVerifier:
+    """Verifies tokens with ``signer``, remembering the claims of up to
+    ``cache_size`` valid tokens.
+
+    Cached tokens are still checked for expiry. ``verify`` is thread
+    safe.
+
+    """
+
+    def __init__(self, signer, cache_size=DEFAULT_CACHE_SIZE):
+        self.signer = signer
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims is None:
+                self.misses += 1
+            else:
+                self._cache.move_to_end(token)
+                self.hits += 1
+        if claims is None:
+            claims = self.signer.verify(token, now)
+            if self.cache_size > 0:
+                with self._lock:
+                    self._cache[token] = claims
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        elif claims["exp"] <= now:
+            raise InvalidToken("Token has expired")
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,939 @@
+#!/usr/bin/env python3
+"""Benchmarks for the dummy server.
+
+Each benchmark is a sub-command, for example::
+
+    ./benchmarks.py concurrency --clients 16 --stalled 2
+
+"""
+
+import argparse
+import base64
+import datetime
+import http.client
+import io
+import json
+import random
+import socket
+import tempfile
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+import urllib.parse
+
+from dummy_web_server import (
+    DEFAULT_PREFLIGHT_MAX_AGE,
+    ENGINES,
+    DummyServer,
+    parse_json_body,
+    read_body,
+)
+from attendance import Attendance
+from auth_tokens import TokenSigner, TokenVerifier
+from blob_store import BlobStore, blob_digests, store_data_urls
+from cassette import Cassette
+from load_generator import (
+    CUB_NAMES,
+    make_payload,
+    make_signature,
+    percentile,
+    run_load,
+)
+from name_index import NameIndex
+from request_journal import HEADER, DataURL, JournalReader, JournalWriter
+from server_metrics import Metrics
+from settings_store import SettingsStore
+from sheets_emulator import Sheet
+
+
+def bench_concurrency(engine, clients=16, requests=20, stalled=1, timeout=2.0):
+    """Time ``clients`` concurrent clients each making ``requests`` GET
+    requests while ``stalled`` other clients hold a connection open
+    with a half-sent request.
+
+    """
+    server = DummyServer(port=0, engine=engine, log_requests=False)
+    server.start()
+    port = server.port
+    stalled_sockets = []
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests):
+            conn = http.client.HTTPConnection("localhost", port, timeout=timeout)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", "/v1/names")
+                conn.getresponse().read()
+            except OSError as e:
+                with lock:
+                    failures.append(e)
+            else:
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                conn.close()
+
+    try:
+        for _ in range(stalled):
+            sock = socket.create_connection(("localhost", port))
+            sock.sendall(b"GET /v1/names HTTP/1.1\r\nHost: localhost\r\n")
+            stalled_sockets.append(sock)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        for sock in stalled_sockets:
+            sock.close()
+        server.stop()
+
+    return {
+        "engine": engine,
+        "completed": len(latencies),
+        "failed": len(failures),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies) if latencies else float("nan"),
+    }
+
+
+def run_concurrency(args):
+    print(
+        f"{args.clients} clients x {args.requests} requests, "
+        f"{args.stalled} stalled connection(s)"
+    )
+    print(
+        f"{'engine':<10}{'ok':>6}{'failed':>8}{'elapsed s':>11}"
+        f"{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for engine in args.engines:
+        result = bench_concurrency(
+            engine,
+            clients=args.clients,
+            requests=args.requests,
+            stalled=args.stalled,
+            timeout=args.timeout,
+        )
+        print(
+            f"{result['engine']:<10}{result['completed']:>6}{result['failed']:>8}"
+            f"{result['elapsed']:>11.2f}{result['throughput']:>10.1f}"
+            f"{result['p50'] * 1000:>9.2f}{result['p99'] * 1000:>9.2f}"
+        )
+
+
+def _legacy_parse(rfile, headers):
+    """Parse a body the way the handler did before bodies were streamed,
+    then decode the signatures to bytes so both parsers produce the
+    same thing.
+
+    """
+    data = json.loads(rfile.read(int(headers["content-length"])).decode("utf-8"))
+    for key, value in data.items():
+        if isinstance(value, str) and value.startswith("data:"):
+            data[key] = base64.b64decode(value.split(",", 1)[1])
+    return data
+
+
+def _streaming_parse(rfile, headers):
+    return parse_json_body(read_body(rfile, headers))
+
+
+def bench_body_parsing(parse, body, iterations=200):
+    """Return the mean time and mean peak traced memory of ``parse``
+    over ``iterations`` copies of ``body``.
+
+    """
+    headers = {"content-length": str(len(body))}
+    elapsed = 0.0
+    peaks = []
+    for _ in range(iterations):
+        rfile = io.BytesIO(body)
+        tracemalloc.start()
+        parse(rfile, headers)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        rfile = io.BytesIO(body)
+        start = time.perf_counter()
+        parse(rfile, headers)
+        elapsed += time.perf_counter() - start
+    return elapsed / iterations, statistics.mean(peaks)
+
+
+def run_body(args):
+    rng = random.Random(args.seed)
+    signatures = [
+        make_signature(rng, width=args.width, height=args.height) for _ in range(2)
+    ]
+    body = json.dumps(make_payload("sign-in", rng, signatures)).encode()
+    print(f"sign-in body of {len(body) / 1024:.1f} KiB, {args.iterations} iterations")
+    print(f"{'parser':<12}{'time us':>10}{'peak KiB':>10}")
+    for name, parse in (("legacy", _legacy_parse), ("streaming", _streaming_parse)):
+        mean_time, peak = bench_body_parsing(parse, body, args.iterations)
+        print(f"{name:<12}{mean_time * 1e6:>10.1f}{peak / 1024:>10.1f}")
+
+
+def bench_metrics_overhead(engine, collect_metrics, requests=400, concurrency=8):
+    """Return the load generator summary for a server with metrics
+    collection on or off.
+
+    """
+    server = DummyServer(
+        port=0, engine=engine, log_requests=False, collect_metrics=collect_metrics
+    )
+    server.start()
+    try:
+        return run_load(server.url, requests=requests, concurrency=concurrency, seed=0)
+    finally:
+        server.stop()
+
+
+def bench_observe(iterations=100000):
+    """Return the mean time of a single ``Metrics.observe`` call."""
+    metrics = Metrics()
+    start = time.perf_counter()
+    for i in range(iterations):
+        metrics.observe("POST", "sign-in", 200, 20000, 150, (i % 100) / 1000)
+    return (time.perf_counter() - start) / iterations
+
+
+def run_metrics(args):
+    print(f"Metrics.observe: {bench_observe() * 1e6:.2f} us per request")
+    print(f"{args.requests} sign ins from {args.concurrency} clients")
+    print(f"{'engine':<10}{'metrics':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for engine in args.engines:
+        for collect_metrics in (False, True):
+            result = bench_metrics_overhead(
+                engine, collect_metrics, args.requests, args.concurrency
+            )
+            print(
+                f"{engine:<10}{'on' if collect_metrics else 'off':>8}"
+                f"{result['throughput']:>10.1f}{result['p50'] * 1000:>9.2f}"
+                f"{result['p99'] * 1000:>9.2f}"
+            )
+
+
+def bench_submissions(engine, keep_alive, preflight_max_age, submissions=200):
+    """Make ``submissions`` sign ins the way the browser makes them
+    from another origin and return the time and round trips they took.
+
+    Each POST is preceded by a CORS preflight unless the last one is
+    still cached. Every new TCP connection costs a round trip of its
+    own.
+
+    """
+    rng = random.Random(0)
+    signatures = [make_signature(rng) for _ in range(4)]
+    bodies = [
+        json.dumps(make_payload("sign-in", rng, signatures)).encode()
+        for _ in range(submissions)
+    ]
+    preflight_headers = {
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "authorization,content-type",
+    }
+    headers = {
+        "Origin": "http://localhost:3000",
+        "Authorization": "Bearer benchmark-token",
+        "Content-Type": "application/json",
+    }
+    server = DummyServer(
+        port=0,
+        engine=engine,
+        log_requests=False,
+        keep_alive=keep_alive,
+        preflight_max_age=preflight_max_age,
+    )
+    server.start()
+    conn = http.client.HTTPConnection("localhost", server.port)
+    connections = requests = 0
+    preflight_expires = 0.0
+
+    def request(method, body, headers):
+        nonlocal connections, requests
+        if conn.sock is None:
+            connections += 1
+        requests += 1
+        conn.request(method, "/v1/sign-in", body, headers)
+        response = conn.getresponse()
+        response.read()
+        return response
+
+    try:
+        start = time.perf_counter()
+        for body in bodies:
+            if time.monotonic() >= preflight_expires:
+                response = request("OPTIONS", None, preflight_headers)
+                max_age = response.getheader("Access-Control-Max-Age")
+                if max_age is not None:
+                    preflight_expires = time.monotonic() + int(max_age)
+            request("POST", body, headers)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+        server.stop()
+
+    return {
+        "connections": connections,
+        "requests": requests,
+        "round_trips": (connections + requests) / submissions,
+        "mean": elapsed / submissions,
+    }
+
+
+def run_round_trips(args):
+    print(f"{args.submissions} sign ins on the {args.engine} engine")
+    print(
+        f"{'server':<24}{'conns':>7}{'requests':>10}{'RTT/submit':>12}"
+        f"{'ms/submit':>11}{f'at {args.rtt:g} ms RTT':>16}"
+    )
+    for name, keep_alive, max_age in (
+        ("HTTP/1.0, no max-age", False, None),
+        ("keep-alive, no max-age", True, None),
+        ("keep-alive, max-age", True, DEFAULT_PREFLIGHT_MAX_AGE),
+    ):
+        result = bench_submissions(args.engine, keep_alive, max_age, args.submissions)
+        mean_ms = result["mean"] * 1000
+        print(
+            f"{name:<24}{result['connections']:>7}{result['requests']:>10}"
+            f"{result['round_trips']:>12.2f}{mean_ms:>11.2f}"
+            f"{mean_ms + result['round_trips'] * args.rtt:>16.1f}"
+        )
+
+
+_SYLLABLES = ["al", "be", "cor", "dan", "el", "fi", "gra", "ha", "is", "jo", "ka"]
+_SYLLABLES += ["li", "mo", "ne", "or", "pa", "qui", "ro", "sa", "ti", "ur", "vi"]
+
+
+def make_names(count, rng):
+    """Return ``count`` distinct made up "First Last" names."""
+
+    def word():
+        syllables = rng.randint(2, 4)
+        return "".join(rng.choice(_SYLLABLES) for _ in range(syllables)).title()
+
+    names = set()
+    while len(names) < count:
+        names.add(f"{word()} {word()}")
+    return sorted(names)
+
+
+def _filter_names(names, prefix, limit):
+    """Filter the whole list the way the client does without the index."""
+    prefix = prefix.casefold()
+    matches = []
+    for name in names:
+        words = name.casefold().split()
+        for position, word in enumerate(words):
+            if " ".join(words[position:]).startswith(prefix):
+                matches.append((position, name.casefold(), name))
+                break
+    return [name for _, _, name in sorted(matches)[:limit]]
+
+
+def _mean_time(func, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def _http_get(conn, path):
+    conn.request("GET", path)
+    return conn.getresponse().read()
+
+
+def run_names(args):
+    rng = random.Random(args.seed)
+    names = make_names(args.names, rng)
+    start = time.perf_counter()
+    index = NameIndex(names)
+    build = time.perf_counter() - start
+    print(f"{len(names)} names, index built in {build * 1000:.1f} ms")
+
+    print(f"{'prefix length':<15}{'index us':>10}{'filter us':>11}{'matches':>9}")
+    for length in (1, 2, 3, 5):
+        queries = [rng.choice(names)[:length] for _ in range(50)]
+        indexed = _mean_time(lambda q: index.search(q, args.limit), queries, 20)
+        filtered = _mean_time(lambda q: _filter_names(names, q, args.limit), queries, 1)
+        found = statistics.mean(len(index.search(q, len(names))) for q in queries)
+        print(f"{length:<15}{indexed * 1e6:>10.1f}{filtered * 1e6:>11.0f}{found:>9.0f}")
+
+    server = DummyServer(
+        {"GET": {"names": {"names": names}}},
+        port=0,
+        engine="asyncio",
+        log_requests=False,
+    )
+    server.start()
+    conn = http.client.HTTPConnection("localhost", server.port)
+    queries = [urllib.parse.quote(rng.choice(names)[:2]) for _ in range(50)]
+    try:
+        full = _http_get(conn, "/v1/names")
+        full_time = _mean_time(lambda q: _http_get(conn, "/v1/names"), queries, 1)
+        search = _http_get(conn, f"/v1/names?prefix={queries[0]}&limit={args.limit}")
+        search_time = _mean_time(
+            lambda q: _http_get(conn, f"/v1/names?prefix={q}&limit={args.limit}"),
+            queries,
+            1,
+        )
+    finally:
+        conn.close()
+        server.stop()
+    print(f"{'over HTTP':<15}{'ms':>10}{'KiB':>11}")
+    print(f"{'full list':<15}{full_time * 1000:>10.2f}{len(full) / 1024:>11.1f}")
+    print(
+        f"{'prefix search':<15}{search_time * 1000:>10.2f}{len(search) / 1024:>11.1f}"
+    )
+
+
+def bench_cassette_lookup(interactions, lookups=2000, seed=0):
+    """Return the mean time to look up a request in a cassette of
+    ``interactions`` recorded sign ins.
+
+    """
+    rng = random.Random(seed)
+    bodies = [
+        json.dumps({"cubName": f"Cub {i}", "time": str(rng.random())}).encode()
+        for i in range(interactions)
+    ]
+    fd, path = tempfile.mkstemp(suffix=".cassette")
+    os.close(fd)
+    try:
+        recording = Cassette(path, "record")
+        for body in bodies:
+            recording.record("POST", "/v1/sign-in", body, 200, [], b"")
+        recording.close()
+        cassette = Cassette(path)
+    finally:
+        os.unlink(path)
+    queries = [rng.choice(bodies) for _ in range(lookups)]
+    start = time.perf_counter()
+    for body in queries:
+        cassette.lookup("POST", "/v1/sign-in", body)
+    return (time.perf_counter() - start) / lookups
+
+
+def run_cassette(args):
+    print(f"{'interactions':<14}{'lookup us':>10}")
+    for interactions in args.sizes:
+        mean = bench_cassette_lookup(interactions)
+        print(f"{interactions:<14}{mean * 1e6:>10.2f}")
+
+
+class _DictSheet:
+    """The naive alternative to ``Sheet``: a list of row dicts."""
+
+    def __init__(self):
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(dict(row))
+
+
+def _attendance_rows(count, rng, signatures, rows_per_day=200):
+    """Yield ``count`` sign in and sign out rows as the server appends
+    them, ``rows_per_day`` a day.
+
+    The fields are parsed from JSON, so every row has its own copies of
+    the strings, as it does in the server. Signatures are shared, since
+    each one takes the same space in either store.
+
+    """
+    start = datetime.datetime(2026, 9, 1, 18, 0)
+    for i in range(count):
+        day, slot = divmod(i, rows_per_day)
+        when = start + datetime.timedelta(days=day, seconds=slot * 30)
+        action = "sign-in" if rng.random() < 0.5 else "sign-out"
+        fields = {
+            "cubName": rng.choice(CUB_NAMES),
+            "time": when.strftime("%I:%M:%S"),
+            "date": when.strftime("%Y-%m-%d"),
+        }
+        row = {"action": action, **json.loads(json.dumps(fields))}
+        if action == "sign-in":
+            row["cubSignature"] = rng.choice(signatures)
+        row["parentSignature"] = rng.choice(signatures)
+        yield row
+
+
+def bench_sheet(make_sheet, rows, seed=0):
+    """Return the sustained appends per second and the bytes retained
+    per row of the sheet built by ``make_sheet``.
+
+    """
+    signatures = [DataURL("image/png", bytes(1000 + i)) for i in range(8)]
+
+    generated = list(_attendance_rows(rows, random.Random(seed), signatures))
+    sheet = make_sheet()
+    start = time.perf_counter()
+    for row in generated:
+        sheet.append(row)
+    elapsed = time.perf_counter() - start
+    del generated, sheet
+
+    # Rows are generated as they are appended, so only what the sheet
+    # keeps is still allocated at the end
+    tracemalloc.start()
+    sheet = make_sheet()
+    for row in _attendance_rows(rows, random.Random(seed), signatures):
+        sheet.append(row)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows / elapsed, retained / rows
+
+
+def run_sheets(args):
+    print(f"{args.rows} attendance rows")
+    print(f"{'store':<10}{'appends/s':>12}{'bytes/row':>11}")
+    for name, make_sheet in (("dicts", _DictSheet), ("columnar", lambda: Sheet(""))):
+        rate, per_row = bench_sheet(make_sheet, args.rows, args.seed)
+        print(f"{name:<10}{rate:>12,.0f}{per_row:>11.1f}")
+
+
+def bench_verify(cache_size, users=100, verifications=100000):
+    """Return the mean time to verify one of ``users`` tokens."""
+    signer = TokenSigner(os.urandom(32))
+    verifier = TokenVerifier(signer, cache_size)
+    tokens = [signer.issue(f"leader{i}@example.com") for i in range(users)]
+    start = time.perf_counter()
+    for i in range(verifications):
+        verifier.verify(tokens[i % users])
+    return (time.perf_counter() - start) / verifications
+
+
+def bench_auth_requests(engine, cache_size, users=100, requests=5000):
+    """Return the authenticated settings GETs per second one client
+    gets over a persistent connection.
+
+    """
+    server = DummyServer(
+        port=0,
+        engine=engine,
+        log_requests=False,
+        keep_alive=True,
+        auth=True,
+        auth_cache_size=cache_size,
+    )
+    server.start()
+    tokens = [server.issue_token(f"leader{i}@example.com") for i in range(users)]
+    conn = http.client.HTTPConnection("localhost", server.port)
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            headers = {"Authorization": f"Bearer {tokens[i % users]}"}
+            conn.request("GET", "/v1/settings", headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"Settings GET failed with {response.status}")
+        return requests / (time.perf_counter() - start)
+    finally:
+        conn.close()
+        server.stop()
+
+
+def run_auth(args):
+    print(f"{args.users} users' tokens, verification cache of {args.cache_size}")
+    print(
+        f"{'cache':<8}{'verify us':>10}"
+        + "".join(f"{e + ' req/s':>15}" for e in args.engines)
+    )
+    for cache_size in (0, args.cache_size):
+        row = f"{'on' if cache_size else 'off':<8}"
+        row += f"{bench_verify(cache_size, args.users) * 1e6:>10.2f}"
+        for engine in args.engines:
+            rate = bench_auth_requests(engine, cache_size, args.users, args.requests)
+            row += f"{rate:>15.1f}"
+        print(row)
+
+
+def _user_settings(user):
+    return {
+        "spreadsheetId": f"sheet-{user:08d}",
+        "attendanceSheet": "Attendance",
+        "autocompleteSheet": "Names",
+    }
+
+
+def bench_settings_store(users, cache_size, operations=20000, seed=0):
+    """Return the write and read latencies, in seconds, of a settings
+    store holding ``users`` users.
+
+    Every user's settings are written once, then ``operations`` reads
+    of random users are timed. Reads are skewed towards a few busy
+    users, like a Cub night where a few leaders use the app.
+
+    """
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp()
+    store = SettingsStore(os.path.join(directory, "settings.sqlite3"), cache_size)
+    try:
+        writes = []
+        for user in range(users):
+            start = time.perf_counter()
+            store.put(f"user{user}", _user_settings(user))
+            writes.append(time.perf_counter() - start)
+        reads = []
+        for _ in range(operations):
+            user = min(int(rng.paretovariate(1.2)) - 1, users - 1)
+            start = time.perf_counter()
+            store.get(f"user{user}")
+            reads.append(time.perf_counter() - start)
+        return writes, reads
+    finally:
+        store.close()
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def run_settings(args):
+    print(
+        f"{'users':<10}{'cache':>7}{'write p50':>11}{'write p99':>11}"
+        f"{'read p50':>10}{'read p99':>10}  (us)"
+    )
+    for users in args.users:
+        for cache_size in (0, args.cache_size):
+            writes, reads = bench_settings_store(users, cache_size)
+            print(
+                f"{users:<10}{'on' if cache_size else 'off':>7}"
+                f"{percentile(writes, 50) * 1e6:>11.1f}"
+                f"{percentile(writes, 99) * 1e6:>11.1f}"
+                f"{percentile(reads, 50) * 1e6:>10.1f}"
+                f"{percentile(reads, 99) * 1e6:>10.1f}"
+            )
+
+
+def make_season(nights, cubs, rng, start=datetime.date(2026, 2, 3)):
+    """Return the sign in and sign out events of a season of weekly
+    Cub nights, as ``(action, data)`` pairs.
+
+    Most cubs come most nights, arrive in the first half hour and
+    leave at the end. A few forget to sign out.
+
+    """
+    names = [f"Cub {i}" for i in range(cubs)]
+    events = []
+    for night in range(nights):
+        date = (start + datetime.timedelta(weeks=night)).isoformat()
+        attending = [name for name in names if rng.random() < 0.85]
+        for name in attending:
+            sign_in = f"06:{rng.randrange(30):02d}:00"
+            events.append(("sign-in", {"cubName": name, "date": date, "time": sign_in}))
+        for name in attending:
+            if rng.random() < 0.95:
+                sign_out = f"07:{rng.randrange(30, 60):02d}:00"
+                data = {"cubName": name, "date": date, "time": sign_out}
+                events.append(("sign-out", data))
+    return events
+
+
+def _rescan(events):
+    """Work out who is signed in by replaying every event so far."""
+    present = {}
+    for action, data in events:
+        if action == "sign-in":
+            present[data["cubName"]] = data["date"]
+        else:
+            present.pop(data["cubName"], None)
+    return present
+
+
+def run_attendance(args):
+    rng = random.Random(args.seed)
+    events = make_season(args.nights, args.cubs, rng)
+    print(f"{args.nights} nights of {args.cubs} cubs, {len(events)} events")
+
+    # Answering "who is here?" after each event by rescanning the
+    # history gets slower as the season goes on. Applying each event to
+    # the model costs the same all season.
+    attendance = Attendance()
+    applied = 0
+    print(f"{'events':<10}{'rescan us':>11}{'incremental us':>16}")
+    for quarter in range(1, 5):
+        count = len(events) * quarter // 4
+        start = time.perf_counter()
+        for action, data in events[applied:count]:
+            attendance.apply(0, action, data)
+        incremental = (time.perf_counter() - start) / max(1, count - applied)
+        applied = count
+        start = time.perf_counter()
+        for _ in range(20):
+            _rescan(events[:count])
+        rescan = (time.perf_counter() - start) / 20
+        print(f"{count:<10}{rescan * 1e6:>11.1f}{incremental * 1e6:>16.2f}")
+
+    start = time.perf_counter()
+    attendance.present()
+    attendance.nights()
+    print(
+        f"querying present and every night: {(time.perf_counter() - start) * 1e6:.0f} us"
+    )
+
+
+def bench_captured_memory(bodies, blob_root=None):
+    """Capture ``bodies`` in a journal, with signatures inline or in a
+    blob store at ``blob_root``, and return the journal bytes and the
+    bytes of heap per captured request once they are all read back.
+
+    """
+    store = None if blob_root is None else BlobStore(blob_root)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "journal")
+    try:
+        writer = JournalWriter(path)
+        for body in bodies:
+            data = parse_json_body(body)
+            if store is not None:
+                data = store_data_urls(data, store)
+            writer.append(0, "POST", "sign-in", "/v1/sign-in", {}, data, 0.0)
+        with open(path, "rb") as f:
+            _, journal_bytes = HEADER.unpack(f.read(HEADER.size))
+        reader = JournalReader(path)
+        reader.refresh()
+
+        tracemalloc.start()
+        captured = [reader.get(seq) for seq in range(len(reader))]
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del captured
+        reader.close()
+        writer.close()
+    finally:
+        os.unlink(path)
+        os.rmdir(directory)
+    return journal_bytes / len(bodies), heap / len(bodies)
+
+
+def _directory_size(root):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def run_blobs(args):
+    rng = random.Random(args.seed)
+    signatures = [make_signature(rng) for _ in range(args.signatures)]
+    bodies = [
+        json.dumps(make_payload("sign-in", rng, signatures)).encode()
+        for _ in range(args.requests)
+    ]
+    print(f"{args.requests} sign ins using {args.signatures} distinct signatures")
+    print(f"{'signatures':<12}{'journal KiB/req':>16}{'heap KiB/req':>14}")
+    journal, heap = bench_captured_memory(bodies)
+    print(f"{'inline':<12}{journal / 1024:>16.2f}{heap / 1024:>14.2f}")
+
+    blob_root = tempfile.mkdtemp()
+    try:
+        journal, heap = bench_captured_memory(bodies, blob_root)
+        print(f"{'blob store':<12}{journal / 1024:>16.2f}{heap / 1024:>14.2f}")
+        store = BlobStore(blob_root)
+        blobs = sum(1 for _ in store.digests())
+        print(
+            f"blob store: {blobs} blobs, {_directory_size(blob_root) / 1024:.0f} KiB "
+            "on disk"
+        )
+
+        # As if the server was reconfigured and only the last request
+        # was captured since
+        data = store_data_urls(parse_json_body(bodies[-1]), store)
+        start = time.perf_counter()
+        removed, freed = store.collect(set(blob_digests(data)), min_age=0)
+        elapsed = time.perf_counter() - start
+        print(
+            f"collect: removed {removed} blobs ({freed / 1024:.0f} KiB) in "
+            f"{elapsed * 1000:.1f} ms"
+        )
+    finally:
+        for directory, _, names in os.walk(blob_root, topdown=False):
+            for name in names:
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dummy server benchmarks.")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.required = True
+
+    concurrency = subparsers.add_parser(
+        "concurrency", help="Compare serving engines under concurrent load"
+    )
+    concurrency.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINES),
+        default=sorted(ENGINES, reverse=True),
+        help="Engines to compare",
+    )
+    concurrency.add_argument(
+        "--clients", type=int, default=16, help="Number of concurrent clients"
+    )
+    concurrency.add_argument(
+        "--requests", type=int, default=20, help="Requests made by each client"
+    )
+    concurrency.add_argument(
+        "--stalled",
+        type=int,
+        default=1,
+        help="Connections that send a partial request and then stall",
+    )
+    concurrency.add_argument(
+        "--timeout", type=float, default=2.0, help="Per-request timeout in seconds"
+    )
+    concurrency.set_defaults(func=run_concurrency)
+
+    body = subparsers.add_parser(
+        "body", help="Compare request body parsing time and peak memory"
+    )
+    body.add_argument(
+        "--iterations", type=int, default=200, help="Bodies to parse per parser"
+    )
+    body.add_argument("--width", type=int, default=600, help="Signature canvas width")
+    body.add_argument("--height", type=int, default=200, help="Signature canvas height")
+    body.add_argument("--seed", type=int, default=0, help="Random seed")
+    body.set_defaults(func=run_body)
+
+    metrics = subparsers.add_parser(
+        "metrics", help="Measure the overhead of collecting request metrics"
+    )
+    metrics.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINES),
+        default=sorted(ENGINES, reverse=True),
+        help="Engines to compare",
+    )
+    metrics.add_argument(
+        "--requests", type=int, default=400, help="Total number of sign ins"
+    )
+    metrics.add_argument(
+        "--concurrency", type=int, default=8, help="Number of concurrent clients"
+    )
+    metrics.set_defaults(func=run_metrics)
+
+    round_trips = subparsers.add_parser(
+        "round-trips",
+        help="Compare the round trips per submission with and without "
+        "keep-alive and preflight caching",
+    )
+    round_trips.add_argument(
+        "--engine", choices=sorted(ENGINES), default="asyncio", help="Serving engine"
+    )
+    round_trips.add_argument(
+        "--submissions", type=int, default=200, help="Number of sign ins"
+    )
+    round_trips.add_argument(
+        "--rtt",
+        type=float,
+        default=30,
+        help="Network round trip time in ms used to estimate the time per "
+        "submission on a real network",
+    )
+    round_trips.set_defaults(func=run_round_trips)
+
+    names = subparsers.add_parser(
+        "names", help="Time names prefix searches against filtering the whole list"
+    )
+    names.add_argument(
+        "--names", type=int, default=50000, help="Number of names to index"
+    )
+    names.add_argument("--limit", type=int, default=10, help="Names per search")
+    names.add_argument("--seed", type=int, default=0, help="Random seed")
+    names.set_defaults(func=run_names)
+
+    cassette = subparsers.add_parser(
+        "cassette", help="Time cassette lookups as the cassette grows"
+    )
+    cassette.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 10000, 100000],
+        help="Numbers of recorded interactions to try",
+    )
+    cassette.set_defaults(func=run_cassette)
+
+    sheets = subparsers.add_parser(
+        "sheets", help="Measure emulated sheet append rate and memory per row"
+    )
+    sheets.add_argument(
+        "--rows", type=int, default=200000, help="Number of rows to append"
+    )
+    sheets.add_argument("--seed", type=int, default=0, help="Random seed")
+    sheets.set_defaults(func=run_sheets)
+
+    auth = subparsers.add_parser(
+        "auth", help="Compare token verification with and without the cache"
+    )
+    auth.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINES),
+        default=sorted(ENGINES, reverse=True),
+        help="Engines to compare",
+    )
+    auth.add_argument(
+        "--users", type=int, default=100, help="Number of distinct tokens"
+    )
+    auth.add_argument(
+        "--cache-size", type=int, default=1024, help="Verified tokens to cache"
+    )
+    auth.add_argument(
+        "--requests", type=int, default=5000, help="Settings GETs per server"
+    )
+    auth.set_defaults(func=run_auth)
+
+    settings = subparsers.add_parser(
+        "settings", help="Time settings store reads and writes as users grow"
+    )
+    settings.add_argument(
+        "--users",
+        type=int,
+        nargs="+",
+        default=[100, 10000, 100000],
+        help="Numbers of users to try",
+    )
+    settings.add_argument(
+        "--cache-size", type=int, default=4096, help="Settings to cache"
+    )
+    settings.set_defaults(func=run_settings)
+
+    attendance = subparsers.add_parser(
+        "attendance", help="Time attendance updates over a season of nights"
+    )
+    attendance.add_argument(
+        "--nights", type=int, default=40, help="Number of Cub nights"
+    )
+    attendance.add_argument("--cubs", type=int, default=30, help="Cubs in the pack")
+    attendance.add_argument("--seed", type=int, default=0, help="Random seed")
+    attendance.set_defaults(func=run_attendance)
+
+    blobs = subparsers.add_parser(
+        "blobs", help="Compare captured request memory with and without a blob store"
+    )
+    blobs.add_argument("--requests", type=int, default=500, help="Sign ins to capture")
+    blobs.add_argument(
+        "--signatures", type=int, default=20, help="Distinct signatures to draw from"
+    )
+    blobs.add_argument("--seed", type=int, default=0, help="Random seed")
+    blobs.set_defaults(func=run_blobs)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Content-addressed storage for the signatures in captured requests.
+
+Given ``blob_root``, the dummy server writes each decoded signature to
+a file named after its SHA-256 digest, and captured requests only hold
+a ``BlobRef`` of its MIME type and digest. A signature that has
+already been stored, such as a parent signing several cubs in, is
+stored once. ``DummyServer.load_blobs`` turns the references back into
+``DataURL``.
+
+Blobs are sharded into directories by the first bytes of their digest
+(``ab/cd/abcd...``) so no directory gets too large. ``collect`` removes
+the blobs no longer referenced, along with abandoned temporary files
+and empty shards. Remove the blobs that no request in a journal
+refers to::
+
+    ./blob_store.py /tmp/blobs --journal /tmp/journal
+
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from request_journal import BlobRef, DataURL, JournalReader
+
+# Blobs and temporary files younger than this are never collected, as
+# the request referencing them may not have been captured yet
+DEFAULT_MIN_AGE = 60
+
+_TEMP_DIR = "tmp"
+
+
+class BlobStore:
+    """Blobs under ``root``, sharded ``depth`` levels deep with ``width``
+    hex digits per level.
+
+    ``put`` is safe to call from many threads and processes at once.
+
+    """
+
+    def __init__(self, root, depth=2, width=2):
+        self.root = root
+        self.depth = depth
+        self.width = width
+        os.makedirs(os.path.join(root, _TEMP_DIR), exist_ok=True)
+
+    def path(self, digest):
+        shards = [
+            digest[level * self.width : (level + 1) * self.width]
+            for level in range(self.depth)
+        ]
+        return os.path.join(self.root, *shards, digest)
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store ``data`` if it isn't stored already and return its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        try:
+            # Renew it, so it isn't collected before it is referenced
+            os.utime(path)
+            return digest
+        except FileNotFoundError:
+            pass
+        fd, temp = tempfile.mkstemp(dir=os.path.join(self.root, _TEMP_DIR))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            while True:
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Atomic, so readers never see part of a blob
+                    os.replace(temp, path)
+                    break
+                except FileNotFoundError:
+                    # collect removed an empty shard in between, unless
+                    # it removed the temporary file
+                    if not os.path.exists(temp):
+                        raise
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except FileNotFoundError:
+                pass
+            raise
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def digests(self):
+        """Yield the digest of every stored blob."""
+        for directory, names, files in os.walk(self.root):
+            if directory == self.root:
+                names[:] = [name for name in names if name != _TEMP_DIR]
+            yield from files
+
+    def collect(self, live, min_age=DEFAULT_MIN_AGE):
+        """Remove every blob whose digest isn't in ``live``, temporary
+        files left behind by failed writes, and then empty shards.
+
+        Nothing younger than ``min_age`` seconds is removed. Returns
+        the number of files removed and the bytes they took up.
+
+        """
+        cutoff = time.time() - min_age
+        removed = freed = 0
+        for directory, names, files in os.walk(self.root, topdown=False):
+            temporary = directory == os.path.join(self.root, _TEMP_DIR)
+            for name in files:
+                if not temporary and name in live:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    os.unlink(path)
+                except FileNotFoundError:
+                    # Removed by another collect, or a temporary file
+                    # that has since been renamed into place
+                    continue
+                removed += 1
+                freed += stat.st_size
+            if directory != self.root and not temporary:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return removed, freed
+
+
+def store_data_urls(value, store):
+    """Return ``value`` with every ``DataURL`` in it stored in ``store``
+    and replaced with a ``BlobRef``.
+
+    """
+    if isinstance(value, DataURL):
+        return BlobRef(value.mime_type, store.put(value.data))
+    if isinstance(value, dict):
+        return {key: store_data_urls(item, store) for key, item in value.items()}
+    if isinstance(value, list):
+        return [store_data_urls(item, store) for item in value]
+    return value
+
+
+def load_data_urls(value, store):
+    """The reverse of ``store_data_urls``."""
+    if isinstance(value, BlobRef):
+        return DataURL(value.mime_type, store.get(value.digest))
+    if isinstance(value, dict):
+        return {key: load_data_urls(item, store) for key, item in value.items()}
+    if isinstance(value, list):
+        return [load_data_urls(item, store) for item in value]
+    return value
+
+
+def blob_digests(value):
+    """Yield the digest of every ``BlobRef`` in ``value``."""
+    if isinstance(value, BlobRef):
+        yield value.digest
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from blob_digests(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from blob_digests(item)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect unreferenced blobs.")
+    parser.add_argument("root", help="Root directory of the blob store")
+    parser.add_argument(
+        "--journal",
+        required=True,
+        help="Journal whose requests' blobs are kept",
+    )
+    parser.add_argument(
+        "--generation",
+        type=int,
+        default=None,
+        help="Only keep the blobs of requests from this generation of the "
+        "server's configuration",
+    )
+    parser.add_argument(
+        "--min-age",
+        type=float,
+        default=DEFAULT_MIN_AGE,
+        help="Seconds a blob must have existed for to be collected",
+    )
+    args = parser.parse_args()
+
+    reader = JournalReader(args.journal, generation=args.generation)
+    live = set()
+    for request in reader.tail():
+        live.update(blob_digests(request.data))
+    removed, freed = BlobStore(args.root).collect(live, args.min_age)
+    print(f"Removed {removed} files, freeing {freed / 1024:.0f} KiB")
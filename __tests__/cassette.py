@@ -0,0 +1,139 @@
+"""Recorded request and response pairs for replaying a real backend.
+
+A ``DummyServer`` started with ``record_from`` proxies every request
+to that backend and records the exchange in a cassette file. Started
+with only ``cassette_path``, it replays the recorded responses without
+any network access::
+
+    DummyServer(cassette_path="signin.cassette", record_from="https://api.example.com")
+    DummyServer(cassette_path="signin.cassette")
+
+A cassette is a JSON Lines file with one interaction per line.
+Requests are matched on method, path (including the query string) and
+a hash of the body. JSON bodies are hashed in a canonical form, so key
+order and whitespace don't matter, and ``ignore_fields`` leaves
+top-level fields that change on every request out of the hash. By
+default these are the ``date`` and ``time`` the frontend adds to every
+submission.
+
+"""
+
+from collections import namedtuple
+import base64
+import hashlib
+import json
+import threading
+
+# Fields the frontend sets to the current date and time on every POST
+DEFAULT_IGNORE_FIELDS = ("date", "time")
+
+Interaction = namedtuple(
+    "Interaction", ["method", "path", "body_hash", "status", "headers", "body"]
+)
+Interaction.__doc__ = """A recorded request and the backend's response.
+
+``headers`` is a list of ``(name, value)`` pairs and ``body`` is the
+response body as bytes.
+
+"""
+
+
+def body_hash(body, ignore_fields=()):
+    """Return the hash a request body is matched on."""
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return hashlib.sha256(body).hexdigest()
+    if isinstance(value, dict) and ignore_fields:
+        value = {key: item for key, item in value.items() if key not in ignore_fields}
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class Cassette:
+    """An index of recorded interactions, keyed on method, path and body
+    hash.
+
+    In ``"replay"`` mode the file is loaded up front. In ``"record"``
+    mode it is truncated and each recorded interaction is appended to
+    it straight away. ``record``, ``lookup`` and ``rewind`` are thread
+    safe.
+
+    """
+
+    def __init__(self, path, mode="replay", ignore_fields=DEFAULT_IGNORE_FIELDS):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.ignore_fields = frozenset(ignore_fields)
+        self._lock = threading.Lock()
+        self._index = {}
+        self._replayed = {}
+        self._file = None
+        if mode == "record":
+            self._file = open(path, "w")
+            return
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    self._add(_decode(json.loads(line)))
+
+    def __len__(self):
+        return sum(len(interactions) for interactions in self._index.values())
+
+    def _add(self, interaction):
+        key = (interaction.method, interaction.path, interaction.body_hash)
+        self._index.setdefault(key, []).append(interaction)
+
+    def record(self, method, path, body, status, headers, response_body):
+        interaction = Interaction(
+            method,
+            path,
+            body_hash(body, self.ignore_fields),
+            status,
+            list(headers),
+            bytes(response_body),
+        )
+        line = json.dumps(_encode(interaction)) + "\n"
+        with self._lock:
+            self._add(interaction)
+            self._file.write(line)
+            self._file.flush()
+
+    def lookup(self, method, path, body):
+        """Return the recorded interaction for a request, or ``None``.
+
+        Identical requests get the recorded responses in the order they
+        were recorded, then the last one again.
+
+        """
+        key = (method, path, body_hash(body, self.ignore_fields))
+        with self._lock:
+            interactions = self._index.get(key)
+            if not interactions:
+                return None
+            played = self._replayed.get(key, 0)
+            self._replayed[key] = played + 1
+            return interactions[min(played, len(interactions) - 1)]
+
+    def rewind(self):
+        """Replay every request's recorded responses from the first again."""
+        with self._lock:
+            self._replayed.clear()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _encode(interaction):
+    encoded = interaction._asdict()
+    encoded["body"] = base64.b64encode(interaction.body).decode("ascii")
+    return encoded
+
+
+def _decode(encoded):
+    encoded["body"] = base64.b64decode(encoded["body"])
+    encoded["headers"] = [tuple(header) for header in encoded["headers"]]
+    return Interaction(**encoded)
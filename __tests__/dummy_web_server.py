@@ -14,101 +14,1642 @@ Send a HEAD request::
 Send a POST request::
     curl -d "foo=bar&bin=baz" http://localhost
 
+Two serving engines are available. The default ``"simple"`` engine is
+a single-threaded ``HTTPServer`` that handles one request at a
+time. The ``"asyncio"`` engine reads requests from many connections
+at once, so a slow or stalled client only holds up its own
+connection::
+
+    DummyServer(engine="asyncio")
+
+Responses use HTTP/1.1 persistent connections with the asyncio engine.
+A persistent connection would hold up every other client of the
+single-threaded engine, so it sticks to HTTP/1.0 unless
+``keep_alive=True`` is given. ``OPTIONS`` preflight responses can be
+cached by browsers for ``preflight_max_age`` seconds.
+
+Given ``record_from``, the server proxies requests to a real backend
+and records them in ``cassette_path``, and given only
+``cassette_path`` it replays them offline (see cassette.py).
+
+Like the production backend, sign ins and sign outs are appended to
+the attendance sheet chosen in the requesting user's saved settings.
+``sheets()`` returns the emulated spreadsheets (see sheets_emulator.py).
+
+Sign ins and sign outs also update who is still signed in and a
+summary of each night, served at ``/__attendance`` (see attendance.py).
+
+Given ``blob_root``, signatures are kept once each on disk and
+captured requests only hold a ``BlobRef`` to them (see blob_store.py).
+
+Settings POSTs are saved for the user who made them and served back
+to their settings GETs (see settings_store.py). Users are identified
+by their bearer token, or by its claims in auth mode.
+
+With ``auth=True``, ``/v1/auth/google`` issues signed tokens and the
+endpoints that need one reject requests without it (see
+auth_tokens.py).
+
+Given ``static_root``, it also serves a production build of the
+frontend (see static_files.py).
+
 """
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from http.server import BaseHTTPRequestHandler, HTTPServer
+import asyncio
+import binascii
+import gzip
+import hashlib
+import http.client
+import io
 import json
 import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from attendance import Attendance
+from auth_tokens import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_TOKEN_TTL,
+    InvalidToken,
+    TokenSigner,
+    TokenVerifier,
+)
+from blob_store import DEFAULT_MIN_AGE as DEFAULT_BLOB_MIN_AGE
+from blob_store import BlobStore, blob_digests, load_data_urls, store_data_urls
+from cassette import DEFAULT_IGNORE_FIELDS as DEFAULT_CASSETTE_IGNORE_FIELDS
+from cassette import Cassette
+from fault_profiles import FaultProfiles
+from name_index import NameIndex
+from request_journal import (
+    BlobRef,
+    DataURL,
+    JournalReader,
+    JournalWriter,
+)
+from server_metrics import Metrics
+from settings_store import DEFAULT_CACHE_SIZE as DEFAULT_SETTINGS_CACHE_SIZE
+from settings_store import SettingsStore
+from sheets_emulator import SheetsEmulator
+import static_files
 
 
 def _get_endpoint(url):
-    return url.split("/")[-1]
-
-
-def make_dummy_handler(response_mappings, force_action, queue):
-    get_mappings = response_mappings.get(
-        "GET",
-        {
-            "settings": {
-                "spreadsheetID": "",
-                "attendanceSheet": "",
-                "autocompleteSheet": "",
-            },
-            "names": {"names": ["name1", "name2", "name3"]},
-        },
+    return urllib.parse.urlsplit(url).path.split("/")[-1]
+
+
+DEFAULT_MAX_BODY_SIZE = 4 * 1024 * 1024
+
+
+class BodyTooLarge(Exception):
+    """Raised when a request body is larger than the server accepts."""
+
+
+def read_body(rfile, headers, max_size=DEFAULT_MAX_BODY_SIZE):
+    """Read a request body from ``rfile`` into a single ``bytearray``.
+
+    Both ``Content-Length`` and chunked bodies are supported.
+    ``BodyTooLarge`` is raised as soon as the body is known to be
+    larger than ``max_size``, without reading the rest of it.
+
+    """
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        return _read_chunked(rfile, max_size)
+    length = int(headers.get("content-length", 0))
+    if length > max_size:
+        raise BodyTooLarge(f"{length} byte body exceeds {max_size} bytes")
+    body = bytearray(length)
+    view = memoryview(body)
+    while view:
+        read = rfile.readinto(view)
+        if not read:
+            raise ConnectionError("Connection closed before the body was read")
+        view = view[read:]
+    return body
+
+
+def _read_chunked(rfile, max_size):
+    body = bytearray()
+    while True:
+        size = int(rfile.readline(65537).split(b";")[0], 16)
+        if size == 0:
+            break
+        if len(body) + size > max_size:
+            raise BodyTooLarge(f"Chunked body exceeds {max_size} bytes")
+        chunk = rfile.read(size)
+        if len(chunk) < size:
+            raise ConnectionError("Connection closed before the body was read")
+        body += chunk
+        rfile.readline(65537)
+    # Skip any trailers
+    while rfile.readline(65537) not in (b"\r\n", b"\n", b""):
+        pass
+    return body
+
+
+# A JSON string that stands in for the n-th data URL while the rest of
+# the body is parsed.
+_DATA_URL_PLACEHOLDER = "\x00data-url:"
+_ESCAPED_PLACEHOLDER = b"\\u0000data-url:"
+
+_JSON_WHITESPACE = b" \t\r\n"
+
+
+def _is_escaped(body, index):
+    """Return whether the character at ``index`` follows an odd number of
+    backslashes.
+
+    """
+    backslashes = 0
+    while index > backslashes and body[index - backslashes - 1] == ord("\\"):
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def _is_key(body, end):
+    """Return whether the string ending at ``end`` is an object key."""
+    following = end + 1
+    while following < len(body) and body[following] in _JSON_WHITESPACE:
+        following += 1
+    return body[following : following + 1] == b":"
+
+
+def parse_json_body(body):
+    """Parse a JSON request body, decoding data URL strings to ``DataURL``.
+
+    The base64 payload of each data URL is decoded straight out of
+    ``body``. Only the (small) JSON around the data URLs is copied
+    before it is parsed.
+
+    Raises ``ValueError`` if the body isn't JSON or a data URL isn't
+    valid base64.
+
+    """
+    view = memoryview(body)
+    data_urls = []
+    pieces = []
+    position = 0
+    start = body.find(b'"data:')
+    if _ESCAPED_PLACEHOLDER in body:
+        # The placeholders would be mistaken for the user's own text, so
+        # leave every data URL for _restore_data_urls
+        start = -1
+    while start != -1:
+        end = body.find(b'"', start + 1)
+        comma = body.find(b",", start, end)
+        if end == -1:
+            break
+        header = bytes(view[start + 6 : comma]) if comma != -1 else b""
+        # An unescaped quote followed by "data:" can only open a string.
+        # Keys and data URLs with escapes in them are left for
+        # _restore_data_urls.
+        if (
+            header.endswith(b";base64")
+            and not _is_escaped(body, start)
+            and body.find(b"\\", start, end) == -1
+            and not _is_key(body, end)
+        ):
+            data = binascii.a2b_base64(view[comma + 1 : end])
+            data_urls.append(DataURL(header[:-7].decode("ascii"), data))
+            pieces.append(view[position:start])
+            pieces.append(b'"\\u0000data-url:%d"' % (len(data_urls) - 1))
+            position = end + 1
+        start = body.find(b'"data:', end + 1)
+
+    if not data_urls:
+        value = json.loads(body)
+        return _restore_data_urls(value, data_urls) if b'"data:' in body else value
+    pieces.append(view[position:])
+    return _restore_data_urls(json.loads(b"".join(pieces)), data_urls)
+
+
+def _restore_data_urls(value, data_urls):
+    """Return ``value`` with the placeholders for ``data_urls`` replaced,
+    and any other base64 data URL strings decoded.
+
+    """
+    if isinstance(value, dict):
+        return {k: _restore_data_urls(v, data_urls) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore_data_urls(v, data_urls) for v in value]
+    if not isinstance(value, str):
+        return value
+    if data_urls and value.startswith(_DATA_URL_PLACEHOLDER):
+        return data_urls[int(value[len(_DATA_URL_PLACEHOLDER) :])]
+    if value.startswith("data:"):
+        header, comma, payload = value[5:].partition(",")
+        if comma and header.endswith(";base64"):
+            return DataURL(header[:-7], binascii.a2b_base64(payload))
+    return value
+
+
+DEFAULT_GET_MAPPINGS = {
+    "settings": {"spreadsheetID": "", "attendanceSheet": "", "autocompleteSheet": ""},
+    "names": {"names": ["name1", "name2", "name3"]},
+}
+
+# Path of the endpoint used to reconfigure a running server. It is
+# never captured.
+CONTROL_PATH = "/__control"
+
+# Path of the metrics endpoint (see server_metrics.py). Requests to it
+# are neither captured nor counted.
+METRICS_PATH = "/__metrics"
+
+# Endpoint label every static file is counted under in the metrics, so
+# the number of series doesn't grow with the build
+STATIC_ENDPOINT = "static"
+
+# Path of the endpoint that dumps the emulated spreadsheets. Requests
+# to it are neither captured nor counted.
+SHEETS_PATH = "/__sheets"
+
+# Prefix of the API paths. Other paths are static files when a
+# static root is being served.
+API_PREFIX = "/v1/"
+
+# Path of the endpoint that exchanges a Google login for a token
+AUTH_PATH = "/v1/auth/google"
+
+# Endpoints that need a bearer token in auth mode
+AUTH_ENDPOINTS = ("sign-in", "sign-out", "settings")
+
+# Prefix of the endpoints that query the attendance model. Requests
+# to them are neither captured nor counted.
+ATTENDANCE_PATH = "/__attendance/"
+
+# Endpoints whose POSTs are appended to the attendance sheet and
+# applied to the attendance model
+ATTENDANCE_ENDPOINTS = ("sign-in", "sign-out")
+
+# Number of names returned by a names prefix search without a limit
+DEFAULT_NAMES_LIMIT = 10
+
+# How often, in seconds, a bandwidth throttled response writes a chunk
+THROTTLE_INTERVAL = 0.05
+
+# How long, in seconds, browsers may cache a CORS preflight response
+DEFAULT_PREFLIGHT_MAX_AGE = 600
+
+# How long, in seconds, the "simple" engine keeps an idle persistent
+# connection open. It can't serve anyone else in the meantime.
+KEEP_ALIVE_TIMEOUT = 5
+
+HandlerConfig = namedtuple(
+    "HandlerConfig",
+    [
+        "get_mappings",
+        "get_responses",
+        "force_action",
+        "generation",
+        "faults",
+        "rng",
+        "names_index",
+    ],
+)
+
+EncodedResponse = namedtuple("EncodedResponse", ["body", "etag", "gzipped"])
+EncodedResponse.__doc__ = """A GET response body encoded ahead of time.
+
+``gzipped`` is a ``(body, etag)`` pair for the gzip encoded variant,
+or ``None`` if compressed responses are disabled.
+
+"""
+
+
+def encode_response(value, gzip_responses=False):
+    body = json.dumps(value).encode()
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    gzipped = None
+    if gzip_responses:
+        gzipped = (gzip.compress(body), f'"{digest}-gzip"')
+    return EncodedResponse(body, f'"{digest}"', gzipped)
+
+
+def make_handler_config(
+    response_mappings,
+    force_action,
+    generation=0,
+    gzip_responses=False,
+    fault_profiles=None,
+    fault_seed=None,
+):
+    """Build a handler configuration, encoding every GET response and
+    indexing the names once up front.
+
+    """
+    get_mappings = response_mappings.get("GET", DEFAULT_GET_MAPPINGS)
+    get_responses = {
+        endpoint: encode_response(value, gzip_responses)
+        for endpoint, value in get_mappings.items()
+    }
+    # Unknown endpoints respond with null
+    get_responses[None] = encode_response(None, gzip_responses)
+    names = get_mappings.get("names")
+    names = names.get("names", []) if isinstance(names, dict) else []
+    return HandlerConfig(
+        get_mappings,
+        get_responses,
+        force_action,
+        generation,
+        FaultProfiles(fault_profiles),
+        random.Random(fault_seed),
+        NameIndex(names),
     )
 
+
+def _etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header matches ``etag``, using the weak
+    comparison that RFC 7232 requires for it.
+
+    """
+    if if_none_match is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.replace("W/", "", 1) == etag:
+            return True
+    return False
+
+
+def _accepts_gzip(accept_encoding):
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                # An unparsable q value is treated as not acceptable
+                return False
+    return False
+
+
+# Headers that only apply to one connection, so are never proxied
+_HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+def forward_request(backend, method, path, headers, body, timeout=30):
+    """Send a request to the ``backend`` base URL and return the
+    response's status, headers and body.
+
+    Responses are requested without content coding, so the recorded
+    body is the plain one.
+
+    """
+    url = urllib.parse.urlsplit(backend)
+    if url.scheme == "https":
+        conn = http.client.HTTPSConnection(url.netloc, timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(url.netloc, timeout=timeout)
+    skipped = _HOP_BY_HOP_HEADERS | {"host", "accept-encoding", "content-length"}
+    forwarded = {
+        name: value for name, value in headers.items() if name.lower() not in skipped
+    }
+    try:
+        conn.request(method, url.path.rstrip("/") + path, body or None, forwarded)
+        response = conn.getresponse()
+        response_body = response.read()
+    finally:
+        conn.close()
+    # The serving handler sets these itself
+    replaced = {"content-length", "date", "server"}
+    response_headers = [
+        (name, value)
+        for name, value in response.getheaders()
+        if name.lower() not in _HOP_BY_HOP_HEADERS | replaced
+    ]
+    return response.status, response_headers, response_body
+
+
+class _CountingWriter:
+    """Wraps a handler's ``wfile`` to count the bytes written to it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def make_dummy_handler(
+    response_mappings,
+    force_action,
+    journal,
+    log_requests=True,
+    max_body_size=DEFAULT_MAX_BODY_SIZE,
+    gzip_responses=False,
+    fault_profiles=None,
+    fault_seed=None,
+    metrics=None,
+    keep_alive=False,
+    preflight_max_age=DEFAULT_PREFLIGHT_MAX_AGE,
+    cassette=None,
+    record_from=None,
+    sheets=None,
+    static_root=None,
+    auth=None,
+    settings_store=None,
+    attendance=None,
+    blob_store=None,
+    generation=0,
+):
     class DummyRequestHandler(BaseHTTPRequestHandler):
-        def _set_headers(self):
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
+        protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+        timeout = KEEP_ALIVE_TIMEOUT if keep_alive else None
+        # Headers and body are written separately, so don't let Nagle's
+        # algorithm hold the body back on a persistent connection
+        disable_nagle_algorithm = True
+
+        # Replaced as a whole by the control endpoint, so each request
+        # reads it once and sees a consistent configuration.
+        config = make_handler_config(
+            response_mappings,
+            force_action,
+            generation,
+            gzip_responses=gzip_responses,
+            fault_profiles=fault_profiles,
+            fault_seed=fault_seed,
+        )
+        # The token claims of the request being handled, in auth mode
+        user = None
+        # The fault profile for the request being handled
+        fault_profile = None
+        # The status code and body size of the request being handled
+        status = None
+        bytes_in = 0
+        body_read = False
+        # When the request line of the request being handled was read
+        request_start = None
+
+        def log_message(self, format, *args):
+            if log_requests:
+                super().log_message(format, *args)
+
+        def send_response(self, code, message=None):
+            self.status = code
+            super().send_response(code, message)
+
+        def parse_request(self):
+            # Called once the request line has arrived, so time spent
+            # idle waiting for it on a kept-alive connection isn't
+            # counted as latency
+            self.request_start = time.perf_counter()
+            return super().parse_request()
+
+        def handle_one_request(self):
+            self.body_read = False
+            if metrics is None:
+                super().handle_one_request()
+                return
+            if not isinstance(self.wfile, _CountingWriter):
+                self.wfile = _CountingWriter(self.wfile)
+            written = self.wfile.written
+            self.status = None
+            self.bytes_in = 0
+            self.request_start = None
+            super().handle_one_request()
+            end = time.perf_counter()
+            # Skip connections closed without a request, malformed
+            # requests and the internal endpoints
+            if (
+                self.status is None
+                or self.request_start is None
+                or not self.command
+                or self.path.startswith("/__")
+            ):
+                return
+            endpoint = _get_endpoint(self.path)
+            if (
+                static_root is not None
+                and self.command in ("GET", "HEAD")
+                and not self.path.startswith(API_PREFIX)
+            ):
+                endpoint = STATIC_ENDPOINT
+            metrics.observe(
+                self.command,
+                endpoint,
+                self.status,
+                self.bytes_in,
+                self.wfile.written - written,
+                end - self.request_start,
+            )
+
+        def _capture(self, config, data=None):
+            """Capture the request, returning its data with any signatures
+            replaced by references to the blob store.
+
+            """
+            endpoint = _get_endpoint(self.path)
+            if blob_store is not None:
+                data = store_data_urls(data, blob_store)
+            journal.append(
+                config.generation,
+                self.command,
+                endpoint,
+                self.path,
+                dict(self.headers),
+                data,
+                time.time(),
+            )
+            if (
+                attendance is not None
+                and self.command == "POST"
+                and endpoint in ATTENDANCE_ENDPOINTS
+                and self.status < 400
+            ):
+                attendance.apply(config.generation, endpoint, data)
+            return data
+
+        def _set_headers(
+            self,
+            status=200,
+            extra_headers=(),
+            content_length=0,
+            content_type="application/json",
+        ):
+            self.send_response(status)
+            self.send_header("Content-type", content_type)
             self.send_header("Access-Control-Allow-Origin", "*")
             self.send_header(
                 "Access-Control-Allow-Headers", "Content-Type, Authorization"
             )
+            if content_length is not None:
+                self.send_header("Content-Length", str(content_length))
+            if not self.close_connection and self._has_unread_body():
+                # The rest of the body would be read as the next request
+                self.send_header("Connection", "close")
+            for name, value in extra_headers:
+                self.send_header(name, value)
             self.end_headers()
 
-        def do_GET(self):
-            if force_action == "FAIL":
+        def _has_unread_body(self):
+            if self.body_read:
+                return False
+            chunked = self.headers.get("Transfer-Encoding", "").lower() == "chunked"
+            return chunked or self.headers.get("Content-Length", "0") != "0"
+
+        def _send_encoded(self, response, head_only=False):
+            """Send a pre-encoded response, or a 304 if the client already
+            has it.
+
+            """
+            body, etag = response.body, response.etag
+            headers = []
+            encoding = None
+            if response.gzipped is not None:
+                headers.append(("Vary", "Accept-Encoding"))
+                if _accepts_gzip(self.headers.get("Accept-Encoding")):
+                    body, etag = response.gzipped
+                    encoding = "gzip"
+            headers.append(("ETag", etag))
+
+            if _etag_matches(self.headers.get("If-None-Match"), etag):
+                self._set_headers(304, headers, content_length=None)
+                return
+            if encoding is not None:
+                headers.append(("Content-Encoding", encoding))
+            self._set_headers(200, headers, content_length=len(body))
+            if not head_only:
+                self._write_body(body)
+
+        def _write_body(self, body):
+            """Write a response body, throttled to the fault profile's
+            bandwidth if it has one.
+
+            The asyncio engine buffers the whole response, so there the
+            throttling only delays it.
+
+            """
+            bandwidth = getattr(self.fault_profile, "bandwidth", None)
+            if bandwidth is None:
+                self.wfile.write(body)
+                return
+            chunk_size = max(1, int(bandwidth * THROTTLE_INTERVAL))
+            for start in range(0, len(body), chunk_size):
+                chunk = body[start : start + chunk_size]
+                self.wfile.write(chunk)
+                self.wfile.flush()
+                time.sleep(len(chunk) / bandwidth)
+
+        def _inject_faults(self, config):
+            """Delay the request according to its fault profile and maybe
+            fail it.
+
+            Returns ``True`` if an error response was sent.
+
+            """
+            if config.force_action == "FAIL":
                 self.send_error(500)
+                return True
+            self.fault_profile = config.faults.lookup(
+                self.command, _get_endpoint(self.path)
+            )
+            if self.fault_profile is None:
+                return False
+            time.sleep(self.fault_profile.sample_latency(config.rng))
+            status = self.fault_profile.sample_error(config.rng)
+            if status is not None:
+                self.send_error(status)
+                return True
+            return False
+
+        def _read_json(self):
+            body = read_body(self.rfile, self.headers, self.max_body_size)
+            self.body_read = True
+            self.bytes_in = len(body)
+            return parse_json_body(body)
+
+        def _send_body_error(self, error):
+            if isinstance(error, BodyTooLarge):
+                # The rest of the body is never read, so the connection
+                # can't be reused.
+                self.close_connection = True
+                self.send_error(413, str(error))
             else:
-                # data = self.rfile.read(int(self.headers.get("content-length"))).decode(
-                #     "utf-8"
-                # )
-                # queue.put(json.loads(data))
-                self._set_headers()
-                self.wfile.write(
-                    json.dumps(get_mappings.get(_get_endpoint(self.path))).encode()
-                )
+                self.send_error(400, str(error))
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            if path == METRICS_PATH:
+                self._send_metrics()
+                return
+            if path == SHEETS_PATH:
+                self._send_sheets()
+                return
+            if path.startswith(ATTENDANCE_PATH):
+                self._send_attendance(path)
+                return
+            if static_root is not None and not path.startswith(API_PREFIX):
+                self._send_static(path)
+                return
+            config = self.config
+            if self._inject_faults(config):
+                return
+            if cassette is not None:
+                self._serve_cassette(config)
+                return
+            if not self._authenticate():
+                return
+            try:
+                response = self._get_response(config)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            self._send_encoded(response)
+            self._capture(config)
 
         def do_HEAD(self):
-            if force_action == "FAIL":
-                self.send_error(500)
+            path = urllib.parse.urlsplit(self.path).path
+            if static_root is not None and not path.startswith(API_PREFIX):
+                self._send_static(path, head_only=True)
+                return
+            config = self.config
+            if self._inject_faults(config):
+                return
+            if cassette is not None:
+                self._serve_cassette(config)
+                return
+            if not self._authenticate():
+                return
+            try:
+                response = self._get_response(config)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            self._send_encoded(response, head_only=True)
+
+        def _send_static(self, path, head_only=False):
+            """Send a file from ``static_root``, or a 304 if the client
+            already has it.
+
+            The simple engine sends the file straight from the page
+            cache to the socket with ``sendfile``. The asyncio engine
+            buffers responses, so there it is read into memory.
+
+            """
+            static = static_files.resolve(
+                static_root, path, _accepts_gzip(self.headers.get("Accept-Encoding"))
+            )
+            if static is None:
+                self.send_error(404)
+                return
+            headers = [
+                ("Cache-Control", static.cache_control),
+                ("ETag", static.etag),
+                ("Vary", "Accept-Encoding"),
+            ]
+            if _etag_matches(self.headers.get("If-None-Match"), static.etag):
+                self._set_headers(
+                    304, headers, content_length=None, content_type=static.content_type
+                )
+                return
+            if static.encoding is not None:
+                headers.append(("Content-Encoding", static.encoding))
+            self._set_headers(
+                200,
+                headers,
+                content_length=static.size,
+                content_type=static.content_type,
+            )
+            if head_only:
+                return
+            with open(static.path, "rb") as f:
+                connection = getattr(self, "connection", None)
+                if connection is None:
+                    self.wfile.write(f.read())
+                    return
+                sent = connection.sendfile(f, 0, static.size)
+            if isinstance(self.wfile, _CountingWriter):
+                self.wfile.written += sent
+
+        def _get_response(self, config):
+            url = urllib.parse.urlsplit(self.path)
+            endpoint = _get_endpoint(url.path)
+            if endpoint == "settings" and settings_store is not None:
+                saved = settings_store.get(self._settings_user())
+                if saved is not None:
+                    return encode_response(saved, gzip_responses)
+            if endpoint == "names":
+                query = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+                if "prefix" in query:
+                    return self._search_names(config, query)
+            responses = config.get_responses
+            return responses.get(endpoint, responses[None])
+
+        def _search_names(self, config, query):
+            """Respond to ``/v1/names?prefix=...&limit=k`` with the top
+            ``k`` matching names.
+
+            """
+            limit = int(query.get("limit", [DEFAULT_NAMES_LIMIT])[0])
+            names = config.names_index.search(query["prefix"][0], limit)
+            return encode_response({"names": names}, gzip_responses)
+
+        def do_POST(self):
+            if self.path == CONTROL_PATH:
+                self._control()
+                return
+            config = self.config
+            if self._inject_faults(config):
+                return
+            if cassette is not None:
+                self._serve_cassette(config)
+                return
+            if not self._authenticate():
+                return
+            try:
+                data = self._read_json()
+            except (BodyTooLarge, ValueError) as e:
+                self._send_body_error(e)
+                return
+            if auth is not None and self.path == AUTH_PATH:
+                self._issue_token(data)
             else:
+                if _get_endpoint(self.path) == "settings":
+                    self._save_settings(data)
                 self._set_headers()
+            data = self._capture(config, data)
+            if sheets is not None and isinstance(data, dict):
+                self._write_to_sheet(data)
 
-        def do_POST(self):
-            if force_action == "FAIL":
-                self.send_error(500)
+        def _authenticate(self):
+            """Check the bearer token of a request to an endpoint that
+            needs one.
+
+            Returns ``False`` if a 401 was sent.
+
+            """
+            self.user = None
+            if auth is None or _get_endpoint(self.path) not in AUTH_ENDPOINTS:
+                return True
+            scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+            try:
+                if scheme.lower() != "bearer" or not token.strip():
+                    raise InvalidToken("Missing bearer token")
+                self.user = auth.verify(token.strip())
+            except InvalidToken as e:
+                self._send_unauthorized(str(e))
+                return False
+            return True
+
+        def _send_unauthorized(self, reason):
+            # Sent with the CORS headers, unlike send_error, so the
+            # frontend can see the status
+            body = json.dumps({"error": reason}).encode()
+            self._set_headers(
+                401,
+                [("WWW-Authenticate", 'Bearer error="invalid_token"')],
+                content_length=len(body),
+            )
+            self.wfile.write(body)
+
+        def _issue_token(self, data):
+            """Exchange a Google login for a token.
+
+            Any access token is accepted, since there is no Google to
+            check it with.
+
+            """
+            login = data if isinstance(data, dict) else {}
+            user = login.get("user") or {}
+            if not login.get("accessToken") or not user.get("email"):
+                self._send_unauthorized("Missing Google access token or user")
+                return
+            token = auth.signer.issue(user["email"], user.get("name", ""))
+            body = json.dumps({"token": token}).encode()
+            self._set_headers(content_length=len(body))
+            self.wfile.write(body)
+
+        def _settings_user(self):
+            """Return the user whose settings the request is for."""
+            if self.user is not None:
+                return self.user["sub"]
+            return self.headers.get("Authorization", "").partition(" ")[2].strip()
+
+        def _save_settings(self, data):
+            # Saved before responding, so the next GET sees them
+            if settings_store is not None and isinstance(data, dict):
+                settings_store.put(self._settings_user(), data)
+
+        def _write_to_sheet(self, data):
+            """Append a sign in or sign out to the attendance sheet chosen
+            in the requesting user's saved settings, if they chose one.
+
+            """
+            endpoint = _get_endpoint(self.path)
+            if endpoint not in ATTENDANCE_ENDPOINTS or settings_store is None:
+                return
+            saved = settings_store.get(self._settings_user()) or {}
+            target = (saved.get("spreadsheetId"), saved.get("attendanceSheet"))
+            if all(isinstance(part, str) and part for part in target):
+                sheets.append(*target, {"action": endpoint, **data})
+
+        def _serve_cassette(self, config):
+            """Proxy the request to ``record_from`` and record the exchange,
+            or replay the recorded response.
+
+            """
+            try:
+                body = bytes(read_body(self.rfile, self.headers, self.max_body_size))
+            except (BodyTooLarge, ValueError) as e:
+                self._send_body_error(e)
+                return
+            self.body_read = True
+            self.bytes_in = len(body)
+
+            if record_from is not None:
+                try:
+                    status, headers, response_body = forward_request(
+                        record_from, self.command, self.path, self.headers, body
+                    )
+                except (OSError, http.client.HTTPException) as e:
+                    self.send_error(502, f"Backend request failed: {e}")
+                    return
+                cassette.record(
+                    self.command, self.path, body, status, headers, response_body
+                )
             else:
-                data = self.rfile.read(int(self.headers.get("content-length"))).decode(
-                    "utf-8"
+                interaction = cassette.lookup(self.command, self.path, body)
+                if interaction is None:
+                    self.send_error(404, "No recorded response for this request")
+                    return
+                status, headers, response_body = (
+                    interaction.status,
+                    interaction.headers,
+                    interaction.body,
                 )
-                self._set_headers()
-                queue.put(json.loads(data))
+
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            if not any(
+                name.lower() == "access-control-allow-origin" for name, _ in headers
+            ):
+                self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", str(len(response_body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(response_body)
+
+            try:
+                data = parse_json_body(body) if body else None
+            except ValueError:
+                data = None
+            self._capture(config, data)
 
         def do_OPTIONS(self):
+            headers = [("Access-Control-Allow-Methods", "GET, HEAD, POST, OPTIONS")]
+            if preflight_max_age is not None:
+                headers.append(("Access-Control-Max-Age", str(preflight_max_age)))
+            self._set_headers(extra_headers=headers)
+
+        def _control(self):
+            try:
+                update = self._read_json()
+            except (BodyTooLarge, ValueError) as e:
+                self._send_body_error(e)
+                return
+            if not isinstance(update, dict):
+                self.send_error(400, "Expected a JSON object")
+                return
+            generation = update.get("generation")
+            if not isinstance(generation, int) or isinstance(generation, bool):
+                self.send_error(400, "Expected an integer generation")
+                return
+            response_mappings = update.get("response_mappings", {})
+            if not isinstance(response_mappings, dict):
+                self.send_error(400, "Expected response_mappings to be an object")
+                return
+            try:
+                new_config = make_handler_config(
+                    response_mappings,
+                    update.get("force_action"),
+                    generation,
+                    gzip_responses=gzip_responses,
+                    fault_profiles=update.get("fault_profiles"),
+                    fault_seed=update.get("fault_seed"),
+                )
+            except (AttributeError, TypeError, ValueError) as e:
+                self.send_error(400, f"Bad configuration: {e}")
+                return
+            DummyRequestHandler.config = new_config
+            if sheets is not None:
+                sheets.clear()
+            if settings_store is not None:
+                settings_store.clear()
+            if attendance is not None:
+                attendance.clear(generation)
+            if cassette is not None:
+                cassette.rewind()
             self._set_headers()
 
+        def _send_metrics(self):
+            if metrics is None:
+                self.send_error(404, "Metrics are disabled")
+                return
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            if query.get("format") == ["json"]:
+                body = json.dumps(metrics.snapshot()).encode()
+                content_type = "application/json"
+            else:
+                body = metrics.to_prometheus().encode()
+                content_type = "text/plain; version=0.0.4"
+            self._set_headers(content_length=len(body), content_type=content_type)
+            self.wfile.write(body)
+
+        @staticmethod
+        def _encode_cell(value):
+            if isinstance(value, BlobRef):
+                value = load_data_urls(value, blob_store)
+            if isinstance(value, DataURL):
+                return value.to_url()
+            return value
+
+        def _send_sheets(self):
+            if sheets is None:
+                self.send_error(404, "Sheets are not emulated")
+                return
+            snapshot = sheets.snapshot(self._encode_cell)
+            body = json.dumps({"spreadsheets": snapshot}).encode()
+            self._set_headers(content_length=len(body))
+            self.wfile.write(body)
+
+        def _send_attendance(self, path):
+            """Respond to ``/__attendance/present`` with the cubs signed in,
+            or to ``/__attendance/nights[?date=...]`` with night summaries.
+
+            """
+            if attendance is None:
+                self.send_error(404, "Attendance is not tracked")
+                return
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            if path == ATTENDANCE_PATH + "present":
+                value = {"present": attendance.present()}
+            elif path == ATTENDANCE_PATH + "nights":
+                value = {"nights": attendance.nights(query.get("date", [None])[0])}
+            else:
+                self.send_error(404)
+                return
+            body = json.dumps(value).encode()
+            self._set_headers(content_length=len(body))
+            self.wfile.write(body)
+
+    # Read by the asyncio engine to reject large bodies before buffering
+    DummyRequestHandler.max_body_size = max_body_size
     return DummyRequestHandler
 
 
+def _buffered_handler(handler_class):
+    """Adapt ``handler_class`` to run over a request that has already been
+    read into memory.
+
+    The "request" passed to the handler is the raw request bytes and
+    the response is collected in ``wfile`` rather than written to a
+    socket.
+
+    """
+
+    class BufferedRequestHandler(handler_class):
+        def setup(self):
+            self.rfile = io.BytesIO(self.request)
+            self.wfile = io.BytesIO()
+
+        def handle(self):
+            self.handle_one_request()
+
+        def finish(self):
+            pass
+
+    return BufferedRequestHandler
+
+
+def _body_framing(head):
+    """Return the ``(content_length, chunked)`` framing of a raw request
+    head.
+
+    """
+    length, chunked = 0, False
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value.strip())
+        elif name == b"transfer-encoding":
+            chunked = value.strip().lower() == b"chunked"
+    return length, chunked
+
+
+class AsyncioHTTPServer:
+    """HTTP server that accepts and reads requests on an asyncio event loop.
+
+    Each request is read off its connection without blocking any other
+    connection. Once a request has been fully received it is handed to
+    ``handler_class`` on a worker thread, so the handler semantics are
+    exactly those of the ``"simple"`` engine.
+
+    Like ``HTTPServer``, the socket is bound and listening as soon as
+    the server is constructed.
+
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=32):
+        self.server_address = server_address
+        self.handler_class = _buffered_handler(handler_class)
+        self.max_workers = max_workers
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(server_address)
+        self.socket.listen(128)
+        self.server_address = self.socket.getsockname()
+        self._loop = asyncio.new_event_loop()
+        self._stopped = threading.Event()
+        # The task serving each open connection
+        self._connections = set()
+
+    def serve_forever(self):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._executor = executor
+        asyncio.set_event_loop(self._loop)
+        try:
+            server = self._loop.run_until_complete(
+                asyncio.start_server(self._accept, sock=self.socket)
+            )
+            self._loop.run_forever()
+            server.close()
+            # Finish every connection while the loop can still run the
+            # tasks serving them, rather than leaving them pending
+            connections = list(self._connections)
+            for task in connections:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*connections, return_exceptions=True)
+            )
+            self._loop.run_until_complete(server.wait_closed())
+        finally:
+            executor.shutdown(wait=False)
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop ``serve_forever`` and wait for it to return.
+
+        Must be called from a different thread to ``serve_forever``.
+
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._stopped.wait()
+
+    def server_close(self):
+        self.socket.close()
+        self._loop.close()
+
+    def _dispatch(self, raw_request, client_address):
+        handler = self.handler_class(raw_request, client_address, self)
+        return handler.wfile.getvalue(), handler.close_connection
+
+    async def _read_body(self, reader, head):
+        """Read the raw body of a request.
+
+        If the body is larger than the handler's ``max_body_size``,
+        reading stops as soon as that is known and the handler is left
+        to reject the truncated request.
+
+        """
+        max_size = getattr(self.handler_class, "max_body_size", None)
+        length, chunked = _body_framing(head)
+        if not chunked:
+            if max_size is not None and length > max_size:
+                return b""
+            return await reader.readexactly(length)
+
+        raw = bytearray()
+        total = 0
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            raw += size_line
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                break
+            total += size
+            if max_size is not None and total > max_size:
+                return raw
+            raw += await reader.readexactly(size + 2)
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            raw += line
+            if line == b"\r\n":
+                return raw
+
+    def _accept(self, reader, writer):
+        task = self._loop.create_task(self._handle_connection(reader, writer))
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+
+    async def _handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        try:
+            close_connection = False
+            while not close_connection:
+                head = await reader.readuntil(b"\r\n\r\n")
+                body = await self._read_body(reader, head)
+                response, close_connection = await self._loop.run_in_executor(
+                    self._executor, self._dispatch, head + body, client_address
+                )
+                writer.write(response)
+                await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ConnectionError,
+            ValueError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+
+def _wait_until_accepting(port, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("localhost", port), timeout=timeout).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+ENGINES = {"simple": HTTPServer, "asyncio": AsyncioHTTPServer}
+
+
 class DummyServer:
-    def __init__(self, response_mappings={}, force_action=None, port=8000):
+    def __init__(
+        self,
+        response_mappings={},
+        force_action=None,
+        port=8000,
+        engine="simple",
+        log_requests=True,
+        max_body_size=DEFAULT_MAX_BODY_SIZE,
+        journal_path=None,
+        gzip_responses=False,
+        fault_profiles=None,
+        fault_seed=None,
+        collect_metrics=True,
+        keep_alive=None,
+        preflight_max_age=DEFAULT_PREFLIGHT_MAX_AGE,
+        cassette_path=None,
+        record_from=None,
+        cassette_ignore_fields=DEFAULT_CASSETTE_IGNORE_FIELDS,
+        static_root=None,
+        auth=False,
+        auth_secret=None,
+        token_ttl=DEFAULT_TOKEN_TTL,
+        auth_cache_size=DEFAULT_CACHE_SIZE,
+        settings_path=None,
+        settings_cache_size=DEFAULT_SETTINGS_CACHE_SIZE,
+        blob_root=None,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(
+                f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}"
+            )
+        if record_from is not None and cassette_path is None:
+            raise ValueError("record_from needs a cassette_path to record to")
+        # Fail here rather than in the server process
+        FaultProfiles(fault_profiles)
         self.response_mappings = response_mappings
         self.force_action = force_action
-        self.msg_queue = multiprocessing.Queue()
+        self.fault_profiles = fault_profiles
+        self.fault_seed = fault_seed
+        self.journal_path = journal_path
+        self.journal = None
+        self.generation = 0
         self.port = port
+        self.engine = engine
+        self.log_requests = log_requests
+        self.max_body_size = max_body_size
+        self.gzip_responses = gzip_responses
+        self.collect_metrics = collect_metrics
+        # A persistent connection monopolises the single-threaded engine
+        self.keep_alive = engine == "asyncio" if keep_alive is None else keep_alive
+        self.preflight_max_age = preflight_max_age
+        self.cassette_path = cassette_path
+        self.record_from = record_from
+        self.cassette_ignore_fields = cassette_ignore_fields
+        self.static_root = static_root
+        self.auth = auth
+        self.settings_path = settings_path
+        self.settings_cache_size = settings_cache_size
+        self.blob_root = blob_root
+        self.auth_cache_size = auth_cache_size
+        self.signer = TokenSigner(
+            os.urandom(32) if auth_secret is None else auth_secret, token_ttl
+        )
 
-    def start(self):
-        server_address = ("", self.port)
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
 
-        def setter(data):
-            print("Settings last request data")
-            self.last_request_data = data
+    def __getstate__(self):
+        # The server process is started with this object as its target,
+        # which the spawn and forkserver start methods pickle. It has no
+        # use for the parent's journal reader or previous process.
+        state = self.__dict__.copy()
+        state["journal"] = None
+        state.pop("server_proc", None)
+        return state
 
-        handler_class = make_dummy_handler(
-            self.response_mappings, self.force_action, self.msg_queue
+    def start(self, timeout=10):
+        """Start the server in a child process.
+
+        This blocks until the server is accepting connections. If
+        ``port`` is 0 the OS picks a free port and ``port`` is updated
+        to the port that was actually bound.
+
+        Captured requests are written to ``journal_path``, and saved
+        settings to the SQLite database at ``settings_path``. Either
+        defaults to a temporary file that is removed when the server
+        stops.
+
+        A ``static_root`` is precompressed before the server starts.
+
+        """
+        if self.static_root is not None:
+            static_files.precompress(self.static_root)
+        if self.journal is not None:
+            self.journal.close()
+        journal_path = self.journal_path
+        if journal_path is None:
+            fd, journal_path = tempfile.mkstemp(
+                prefix="dummy-server-", suffix=".journal"
+            )
+            os.close(fd)
+        self._journal_file = journal_path
+        self._settings_file = self.settings_path
+        if self._settings_file is None:
+            fd, self._settings_file = tempfile.mkstemp(
+                prefix="dummy-server-", suffix=".sqlite3"
+            )
+            os.close(fd)
+
+        port_reader, port_writer = multiprocessing.Pipe(duplex=False)
+        self._stop_event = multiprocessing.Event()
+        self.server_proc = multiprocessing.Process(
+            target=self._serve, args=(port_writer,)
         )
-        httpd = HTTPServer(server_address, handler_class)
-        self.server_proc = multiprocessing.Process(target=httpd.serve_forever)
         self.server_proc.start()
+        port_writer.close()
 
-    def stop(self):
+        if not port_reader.poll(timeout):
+            self._kill()
+            raise TimeoutError(f"Server did not start within {timeout} seconds")
+        bound = port_reader.recv()
+        port_reader.close()
+        if isinstance(bound, Exception):
+            self._kill()
+            raise bound
+        self.port = bound
+        self.journal = JournalReader(journal_path, self.generation)
+        _wait_until_accepting(self.port, timeout)
+
+    def _serve(self, port_writer):
+        cassette = None
+        if self.cassette_path is not None:
+            try:
+                cassette = Cassette(
+                    self.cassette_path,
+                    "record" if self.record_from else "replay",
+                    self.cassette_ignore_fields,
+                )
+            except (OSError, ValueError) as e:
+                port_writer.send(e)
+                return
+        try:
+            settings_store = SettingsStore(
+                self._settings_file, self.settings_cache_size
+            )
+        except (OSError, sqlite3.Error) as e:
+            port_writer.send(e)
+            return
+        journal = JournalWriter(self._journal_file)
+        auth = TokenVerifier(self.signer, self.auth_cache_size) if self.auth else None
+        handler_class = make_dummy_handler(
+            self.response_mappings,
+            self.force_action,
+            journal,
+            log_requests=self.log_requests,
+            max_body_size=self.max_body_size,
+            gzip_responses=self.gzip_responses,
+            fault_profiles=self.fault_profiles,
+            fault_seed=self.fault_seed,
+            metrics=Metrics() if self.collect_metrics else None,
+            keep_alive=self.keep_alive,
+            preflight_max_age=self.preflight_max_age,
+            cassette=cassette,
+            record_from=self.record_from,
+            sheets=SheetsEmulator(),
+            static_root=self.static_root,
+            auth=auth,
+            settings_store=settings_store,
+            attendance=Attendance(),
+            blob_store=None if self.blob_root is None else BlobStore(self.blob_root),
+            # Carried over from before a restart, so the journal reader
+            # still sees the requests
+            generation=self.generation,
+        )
+        try:
+            httpd = ENGINES[self.engine](("", self.port), handler_class)
+        except OSError as e:
+            port_writer.send(e)
+            return
+        port_writer.send(httpd.server_address[1])
+        port_writer.close()
+
+        serve_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        serve_thread.start()
+        self._stop_event.wait()
+        httpd.shutdown()
+        httpd.server_close()
+        journal.close()
+        settings_store.close()
+        if cassette is not None:
+            cassette.close()
+
+    def stop(self, timeout=5):
+        """Shut the server down and wait for the port to be released.
+
+        Captured requests can still be queried afterwards.
+
+        """
+        self._stop_event.set()
+        self.server_proc.join(timeout)
+        if self.server_proc.is_alive():
+            self._kill()
+        if self.journal_path is None and os.path.exists(self._journal_file):
+            # The journal stays mapped, so it can still be read
+            os.unlink(self._journal_file)
+        if self.settings_path is None:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self._settings_file + suffix):
+                    os.unlink(self._settings_file + suffix)
+
+    def _kill(self):
         self.server_proc.terminate()
+        self.server_proc.join()
+
+    def reconfigure(
+        self,
+        response_mappings={},
+        force_action=None,
+        fault_profiles=None,
+        fault_seed=None,
+        timeout=10,
+    ):
+        """Swap the running server's responses and fault profiles, clear
+        the captured requests, emulated spreadsheets, attendance and
+        saved settings, and rewind the cassette being replayed.
+
+        The new configuration takes effect atomically: every request
+        is served entirely under either the old or the new
+        configuration. Requests served under the old configuration are
+        never returned by ``requests``, even if they arrive late.
+
+        """
+        FaultProfiles(fault_profiles)
+        self.generation += 1
+        body = json.dumps(
+            {
+                "response_mappings": response_mappings,
+                "force_action": force_action,
+                "fault_profiles": fault_profiles,
+                "fault_seed": fault_seed,
+                "generation": self.generation,
+            }
+        ).encode()
+        request = urllib.request.Request(
+            self.url + CONTROL_PATH,
+            data=body,
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=timeout).close()
+        self.response_mappings = response_mappings
+        self.force_action = force_action
+        self.fault_profiles = fault_profiles
+        self.fault_seed = fault_seed
+        self.journal.reset(self.generation)
+
+    @property
+    def captured(self):
+        """Every request captured since the last ``reconfigure``."""
+        return self.requests()
+
+    def requests(self, endpoint=None, method=None, predicate=None, after=None):
+        """Return every request captured so far that matches the filters.
+
+        ``endpoint`` is the last segment of the request path (e.g.
+        ``"sign-in"``), ``predicate`` is called with each
+        ``CapturedRequest`` and ``after`` only matches requests whose
+        ``seq`` is greater than it. Nothing is removed from the log.
+
+        """
+        self.journal.refresh()
+        matches = []
+        for seq in self.journal.seqs(endpoint, method, after):
+            request = self.journal.get(seq)
+            if predicate is None or predicate(request):
+                matches.append(request)
+        return matches
+
+    def wait_for_request(
+        self, endpoint=None, method=None, predicate=None, after=None, timeout=10
+    ):
+        """Return the first captured request that matches the filters,
+        blocking until one arrives.
+
+        Takes the same filters as ``requests``. Pass the ``seq`` of a
+        previous result as ``after`` to wait for a later request.
+        Raises ``TimeoutError`` if no matching request is recorded
+        within ``timeout`` seconds.
+
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            self.journal.refresh()
+            for seq in self.journal.seqs(endpoint, method, after):
+                request = self.journal.get(seq)
+                if predicate is None or predicate(request):
+                    return request
+                after = seq
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"No {method or 'request'} to {endpoint or 'any endpoint'} "
+                    f"within {timeout} seconds"
+                )
+            time.sleep(delay)
+            delay = min(2 * delay, 0.02)
 
     @property
     def last_request_data(self):
-        return self.msg_queue.get_nowait()
+        """The body of the most recent POST, waiting for one if none has
+        been captured yet.
+
+        """
+        posts = self.requests(method="POST")
+        if posts:
+            return posts[-1].data
+        return self.wait_for_request(method="POST").data
+
+    def issue_token(self, email, name=""):
+        """Return a token the server accepts in auth mode, as if the user
+        had logged in with Google.
+
+        """
+        return self.signer.issue(email, name)
+
+    def load_blobs(self, value):
+        """Return ``value``, such as a captured request's ``data``, with
+        every ``BlobRef`` in it replaced with the ``DataURL`` it stands
+        for. Without a ``blob_root`` there are none, so it is returned
+        as is.
+
+        """
+        if self.blob_root is None:
+            return value
+        return load_data_urls(value, BlobStore(self.blob_root))
+
+    def collect_blobs(self, min_age=DEFAULT_BLOB_MIN_AGE):
+        """Remove the stored blobs that no request captured since the
+        last ``reconfigure`` refers to.
+
+        Returns the number of files removed and the bytes they took up,
+        which are both 0 without a ``blob_root``.
+
+        """
+        if self.blob_root is None:
+            return 0, 0
+        live = set()
+        for request in self.requests():
+            live.update(blob_digests(request.data))
+        return BlobStore(self.blob_root).collect(live, min_age)
+
+    def metrics(self, timeout=10):
+        """Return the request metrics recorded since the server started.
+
+        See ``server_metrics.Metrics.snapshot`` for the format. The
+        same metrics are served to Prometheus at ``/__metrics``.
+
+        """
+        return self._get_json(f"{METRICS_PATH}?format=json", timeout)
+
+    def _get_json(self, path, timeout):
+        with urllib.request.urlopen(self.url + path, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def present(self, timeout=10):
+        """Return the cubs still signed in, by name, as dicts of their
+        ``cubName`` and the ``date`` and ``time`` they signed in.
+
+        """
+        return self._get_json(ATTENDANCE_PATH + "present", timeout)["present"]
+
+    def nights(self, date=None, timeout=10):
+        """Return the summary of each night since the last
+        ``reconfigure``, or only of ``date``.
+
+        See ``attendance._Night.summary`` for the fields.
+
+        """
+        path = ATTENDANCE_PATH + "nights"
+        if date is not None:
+            path += "?" + urllib.parse.urlencode({"date": date})
+        return self._get_json(path, timeout)["nights"]
+
+    def sheets(self, timeout=10):
+        """Return the rows appended to each emulated sheet since the last
+        ``reconfigure``, as ``{spreadsheet id: {sheet name: [row, ...]}}``.
+
+        Each row is a dict of the sign in or sign out's fields, plus
+        ``"action"`` (the endpoint). Signatures are decoded to
+        ``DataURL`` like in captured requests.
+
+        """
+        url = self.url + SHEETS_PATH
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            snapshot = parse_json_body(response.read())["spreadsheets"]
+        return {
+            spreadsheet_id: {
+                name: [dict(zip(sheet["columns"], row)) for row in sheet["rows"]]
+                for name, sheet in spreadsheet.items()
+            }
+            for spreadsheet_id, spreadsheet in snapshot.items()
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""A fake remote WebDriver endpoint for testing remote session creation
+offline.
+
+It implements just enough of the W3C WebDriver protocol to create and
+delete sessions, and accepts every other session command without doing
+anything. Creating a session takes ``--delay`` seconds, and sessions
+whose capabilities include a ``--fail`` value are refused, so slow and
+failing BrowserStack devices can be simulated::
+
+    ./fake_webdriver.py --port 4444 --delay 5 --fail "iPad 5th"
+    REMOTE_WEBDRIVER_URL=http://localhost:4444/wd/hub \\
+        ./integrationTests.py --browserstack True
+
+"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import argparse
+import json
+import socketserver
+import threading
+import time
+import uuid
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeWebDriver:
+    """A fake WebDriver endpoint served from a background thread.
+
+    ``slow`` maps capability values to how long sessions with them take
+    to create, overriding ``delay``. ``created`` and ``deleted`` list
+    the session ids handed out and quit.
+
+    """
+
+    def __init__(self, port=0, delay=0.0, slow={}, fail=()):
+        self.port = port
+        self.delay = delay
+        self.slow = dict(slow)
+        self.fail = set(fail)
+        self.created = []
+        self.deleted = []
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}/wd/hub"
+
+    def start(self):
+        self._httpd = _ThreadingHTTPServer(("", self.port), _make_handler(self))
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def new_session(self, body):
+        """Return the id of a new session, or ``None`` if it is refused."""
+        caps = body.get("desiredCapabilities") or body.get("capabilities", {})
+        values = {str(value) for value in _flatten(caps)}
+        delays = [self.slow[value] for value in values if value in self.slow]
+        time.sleep(max(delays, default=self.delay))
+        if values & self.fail:
+            return None
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.created.append(session_id)
+        return session_id
+
+    def delete_session(self, session_id):
+        with self._lock:
+            if session_id not in self.created or session_id in self.deleted:
+                return False
+            self.deleted.append(session_id)
+            return True
+
+    def is_live(self, session_id):
+        with self._lock:
+            return session_id in self.created and session_id not in self.deleted
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _flatten(item)
+    else:
+        yield value
+
+
+def _make_handler(driver):
+    class FakeWebDriverHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, value):
+            body = json.dumps({"value": value}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status, error, message):
+            self._send(status, {"error": error, "message": message, "stacktrace": ""})
+
+        def _session_path(self):
+            """Return the session id and command of the request path."""
+            parts = self.path.split("/session", 1)[-1].strip("/").split("/")
+            return parts[0], "/".join(parts[1:])
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self):
+            body = self._read_json()
+            session_id, _ = self._session_path()
+            if not session_id:
+                session_id = driver.new_session(body)
+                if session_id is None:
+                    self._send_error(
+                        500, "session not created", "Capabilities were refused"
+                    )
+                    return
+                caps = body.get("desiredCapabilities", {})
+                self._send(200, {"sessionId": session_id, "capabilities": caps})
+            elif driver.is_live(session_id):
+                self._send(200, None)
+            else:
+                self._send_error(404, "invalid session id", session_id)
+
+        def do_GET(self):
+            session_id, _ = self._session_path()
+            if driver.is_live(session_id):
+                self._send(200, None)
+            else:
+                self._send_error(404, "invalid session id", session_id)
+
+        def do_DELETE(self):
+            session_id, command = self._session_path()
+            if command:
+                self.do_GET()
+            elif driver.delete_session(session_id):
+                self._send(200, None)
+            else:
+                self._send_error(404, "invalid session id", session_id)
+
+    return FakeWebDriverHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake remote WebDriver endpoint.")
+    parser.add_argument("--port", type=int, default=4444, help="Port to listen on")
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="Seconds it takes to create a session",
+    )
+    parser.add_argument(
+        "--fail",
+        action="append",
+        default=[],
+        help="Refuse sessions with this capability value, e.g. a device name. "
+        "May be given more than once",
+    )
+    args = parser.parse_args()
+
+    fake = FakeWebDriver(port=args.port, delay=args.delay, fail=args.fail)
+    fake.start()
+    print(f"Fake WebDriver listening on {fake.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
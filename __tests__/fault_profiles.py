@@ -0,0 +1,142 @@
+"""Declarative latency, bandwidth and error injection for the dummy server.
+
+Fault profiles are given as a JSON-compatible dict keyed by
+``"<METHOD> <endpoint>"``, where either part may be ``*``::
+
+    {
+        "POST sign-in": {
+            "latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6},
+            "errors": {"503": 0.05, "500": 0.01},
+        },
+        "GET *": {
+            "latency": {"distribution": "uniform", "low": 0.05, "high": 0.2},
+            "bandwidth": 64000,
+        },
+    }
+
+``latency`` is in seconds and is one of::
+
+    {"distribution": "fixed", "seconds": 0.5}
+    {"distribution": "uniform", "low": 0.1, "high": 0.5}
+    {"distribution": "lognormal", "median": 0.8, "sigma": 0.6}
+
+and may have a ``"max"`` to cap it. ``bandwidth`` throttles response
+bodies to that many bytes per second, and ``errors`` maps status codes
+to the probability of responding with them.
+
+The most specific profile wins: ``"POST sign-in"``, then ``"* sign-in"``,
+then ``"POST *"`` and finally ``"* *"``.
+
+"""
+
+import math
+
+DISTRIBUTIONS = {
+    "fixed": ("seconds",),
+    "uniform": ("low", "high"),
+    "lognormal": ("median", "sigma"),
+}
+
+
+def _check_latency(latency):
+    """Raise ``ValueError`` if a latency's parameters can't be sampled."""
+    distribution = latency["distribution"]
+    if distribution == "fixed" and latency["seconds"] < 0:
+        raise ValueError("fixed latency must not be negative")
+    if distribution == "uniform" and not 0 <= latency["low"] <= latency["high"]:
+        raise ValueError("uniform latency needs 0 <= low <= high")
+    if distribution == "lognormal":
+        if latency["median"] <= 0:
+            raise ValueError("lognormal latency median must be positive")
+        if latency["sigma"] < 0:
+            raise ValueError("lognormal latency sigma must not be negative")
+    if latency.get("max", 0) < 0:
+        raise ValueError("latency max must not be negative")
+
+
+class FaultProfile:
+    """The faults injected into requests for one method and endpoint."""
+
+    def __init__(self, spec):
+        unknown = set(spec) - {"latency", "bandwidth", "errors"}
+        if unknown:
+            raise ValueError(f"Unknown fault profile keys {sorted(unknown)}")
+
+        self.latency = spec.get("latency")
+        if self.latency is not None:
+            distribution = self.latency.get("distribution")
+            if distribution not in DISTRIBUTIONS:
+                raise ValueError(
+                    f"Unknown latency distribution {distribution!r}, expected "
+                    f"one of {sorted(DISTRIBUTIONS)}"
+                )
+            missing = [
+                name for name in DISTRIBUTIONS[distribution] if name not in self.latency
+            ]
+            if missing:
+                raise ValueError(f"{distribution} latency needs {', '.join(missing)}")
+            _check_latency(self.latency)
+
+        self.bandwidth = spec.get("bandwidth")
+        if self.bandwidth is not None and self.bandwidth <= 0:
+            raise ValueError("bandwidth must be positive")
+
+        self.errors = [
+            (int(status), probability)
+            for status, probability in spec.get("errors", {}).items()
+        ]
+        for status, probability in self.errors:
+            if not 400 <= status <= 599:
+                raise ValueError(f"{status} is not an error status code")
+            if not 0 <= probability <= 1:
+                raise ValueError(f"Probability of {status} must be between 0 and 1")
+        if sum(probability for _, probability in self.errors) > 1:
+            raise ValueError("Error probabilities add up to more than 1")
+
+    def sample_latency(self, rng):
+        """Return how many seconds to delay the response by."""
+        if self.latency is None:
+            return 0.0
+        distribution = self.latency["distribution"]
+        if distribution == "fixed":
+            seconds = self.latency["seconds"]
+        elif distribution == "uniform":
+            seconds = rng.uniform(self.latency["low"], self.latency["high"])
+        else:
+            seconds = rng.lognormvariate(
+                math.log(self.latency["median"]), self.latency["sigma"]
+            )
+        return min(seconds, self.latency.get("max", seconds))
+
+    def sample_error(self, rng):
+        """Return the status code to fail the request with, or ``None``."""
+        if not self.errors:
+            return None
+        roll = rng.random()
+        for status, probability in self.errors:
+            if roll < probability:
+                return status
+            roll -= probability
+        return None
+
+
+class FaultProfiles:
+    """A set of fault profiles, looked up by method and endpoint."""
+
+    def __init__(self, spec=None):
+        self.profiles = {}
+        for key, profile in (spec or {}).items():
+            method, _, endpoint = key.partition(" ")
+            if not endpoint:
+                raise ValueError(
+                    f"Fault profile key {key!r} should be '<METHOD> <endpoint>'"
+                )
+            self.profiles[(method.upper(), endpoint)] = FaultProfile(profile)
+
+    def lookup(self, method, endpoint):
+        """Return the profile for a request, or ``None`` if it has none."""
+        for key in ((method, endpoint), ("*", endpoint), (method, "*"), ("*", "*")):
+            profile = self.profiles.get(key)
+            if profile is not None:
+                return profile
+        return None
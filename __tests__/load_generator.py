@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Load generator that simulates a cub night sign in rush.
+
+It replays the ``/v1/sign-in`` and ``/v1/sign-out`` POSTs the
+frontend makes, complete with a Bearer token and PNG signature data
+URLs like the ones ``SignaturePad.toDataURL()`` produces, and reports
+throughput and latency percentiles.
+
+Run it against a dummy server started in-process::
+
+    ./load_generator.py --requests 30 --rate 0.1
+
+or against any running backend::
+
+    ./load_generator.py --url http://localhost:8080 --token <token>
+
+"""
+
+import argparse
+import base64
+import datetime
+import http.client
+import json
+import queue
+import random
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+
+from dummy_web_server import ENGINES, DummyServer
+
+CUB_NAMES = [
+    "Alex Nguyen",
+    "Billie Smith",
+    "Charlie Brown",
+    "Dylan O'Connor",
+    "Eden Papadopoulos",
+    "Finn Walker",
+    "Georgia Chen",
+    "Harper Singh",
+    "Isla Murphy",
+    "Jack Wilson",
+    "Kai Tanaka",
+    "Lily Rossi",
+    "Max Kowalski",
+    "Noah Ahmed",
+    "Olivia Jones",
+    "Priya Patel",
+    "Quinn Taylor",
+    "Ruby Martin",
+    "Sam Lee",
+    "Tom Anderson",
+]
+
+
+def percentile(samples, pct):
+    """Return the ``pct`` percentile of ``samples`` by nearest rank."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _png(width, height, rows):
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_signature(rng, width=600, height=200, strokes=4):
+    """Return a PNG data URL of a scribbled signature.
+
+    The image is a transparent RGBA canvas with anti-aliased looking
+    strokes, so it compresses about as well as a real signature pad
+    capture of the same size.
+
+    """
+    rows = [bytearray(width * 4) for _ in range(height)]
+    for _ in range(strokes):
+        x, y = rng.uniform(0, width), rng.uniform(height * 0.2, height * 0.8)
+        dx, dy = rng.uniform(1, 3), 0.0
+        for _ in range(rng.randint(80, 200)):
+            dy = max(-4.0, min(4.0, dy + rng.uniform(-1.5, 1.5)))
+            x, y = x + dx, y + dy
+            for ox in range(-2, 3):
+                for oy in range(-2, 3):
+                    px, py = int(x) + ox, int(y) + oy
+                    if 0 <= px < width and 0 <= py < height:
+                        alpha = max(
+                            0, 255 - 60 * (abs(ox) + abs(oy)) - rng.randint(0, 40)
+                        )
+                        offset = px * 4
+                        row = rows[py]
+                        row[offset + 3] = max(row[offset + 3], alpha)
+    png = _png(width, height, rows)
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
+def make_payload(kind, rng, signatures):
+    """Return the JSON body the frontend sends to ``/v1/<kind>``."""
+    now = datetime.datetime.now()
+    data = {"cubName": rng.choice(CUB_NAMES)}
+    if kind == "sign-in":
+        data["cubSignature"] = rng.choice(signatures)
+    data["parentSignature"] = rng.choice(signatures)
+    data["time"] = now.strftime("%I:%M:%S")
+    data["date"] = now.strftime("%Y-%m-%d")
+    return data
+
+
+def run_load(
+    base_url,
+    requests=100,
+    concurrency=8,
+    rate=None,
+    sign_out_fraction=0.0,
+    token="load-test-token",
+    seed=None,
+    timeout=10,
+    signature_variants=8,
+):
+    """Send ``requests`` submissions to ``base_url`` and return a summary.
+
+    Submissions arrive as a Poisson process at ``rate`` per second, or
+    as fast as ``concurrency`` clients can send them if ``rate`` is
+    ``None``. Latency is measured until a response has been read from
+    when the request was scheduled to arrive, so time spent queued
+    behind a stalled server counts, or without ``rate`` from when it
+    was sent.
+
+    """
+    rng = random.Random(seed)
+    signatures = [make_signature(rng) for _ in range(signature_variants)]
+    bodies = queue.Queue()
+    for _ in range(requests):
+        kind = "sign-out" if rng.random() < sign_out_fraction else "sign-in"
+        body = json.dumps(make_payload(kind, rng, signatures)).encode()
+        bodies.put((kind, body))
+    for _ in range(concurrency):
+        bodies.put(None)
+
+    url = urllib.parse.urlsplit(base_url)
+    if url.scheme == "https":
+        connection_class = http.client.HTTPSConnection
+    else:
+        connection_class = http.client.HTTPConnection
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+    latencies = []
+    statuses = {}
+    errors = []
+    bytes_sent = [0]
+    lock = threading.Lock()
+    # Arrival times are shared by every client so the rate is global
+    next_arrival = [time.perf_counter()]
+
+    def client():
+        conn = connection_class(url.hostname, url.port, timeout=timeout)
+        for kind, body in iter(bodies.get, None):
+            start = time.perf_counter()
+            if rate is not None:
+                with lock:
+                    arrival = next_arrival[0]
+                    next_arrival[0] += rng.expovariate(rate)
+                if arrival > start:
+                    time.sleep(arrival - start)
+                # Counting from when the request was due rather than
+                # sent avoids coordinated omission
+                start = arrival
+            try:
+                conn.request("POST", f"{url.path}/v1/{kind}", body, headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                with lock:
+                    errors.append(e)
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                bytes_sent[0] += len(body)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "statuses": statuses,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "bytes_sent": bytes_sent[0],
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=float("nan")),
+    }
+
+
+def print_summary(summary):
+    statuses = ", ".join(
+        f"{status}: {count}" for status, count in sorted(summary["statuses"].items())
+    )
+    print(f"completed   {summary['completed']}/{summary['requests']}")
+    print(f"errors      {summary['errors']}")
+    print(f"statuses    {statuses or '-'}")
+    print(f"elapsed     {summary['elapsed']:.2f} s")
+    print(f"throughput  {summary['throughput']:.1f} req/s")
+    print(f"sent        {summary['bytes_sent'] / 1024:.0f} KiB")
+    for name in ("p50", "p95", "p99", "max"):
+        print(f"{name:<12}{summary[name] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sign in rush load generator.")
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="Base URL of the backend. If omitted, a dummy server is started",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="asyncio",
+        help="Engine for the dummy server started when --url is omitted",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Total number of submissions"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Number of concurrent clients"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Mean arrival rate in submissions per second. If omitted, "
+        "clients send as fast as they can",
+    )
+    parser.add_argument(
+        "--sign-out-fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of submissions that are sign outs",
+    )
+    parser.add_argument(
+        "--token", default="load-test-token", help="Bearer token to send"
+    )
+    parser.add_argument(
+        "--fault-profiles",
+        type=argparse.FileType("r"),
+        default=None,
+        help="JSON file of fault profiles for the dummy server started when "
+        "--url is omitted (see fault_profiles.py)",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument(
+        "--timeout", type=float, default=10, help="Per-request timeout in seconds"
+    )
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = DummyServer(
+            port=0,
+            engine=args.engine,
+            log_requests=False,
+            fault_profiles=json.load(args.fault_profiles)
+            if args.fault_profiles
+            else None,
+            fault_seed=args.seed,
+        )
+        server.start()
+        base_url = server.url
+    try:
+        summary = run_load(
+            base_url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            sign_out_fraction=args.sign_out_fraction,
+            token=args.token,
+            seed=args.seed,
+            timeout=args.timeout,
+        )
+    finally:
+        if server is not None:
+            server.stop()
+    print_summary(summary)
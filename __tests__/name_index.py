@@ -0,0 +1,81 @@
+"""Prefix search over the autocomplete names.
+
+The dummy server answers ``GET /v1/names?prefix=<prefix>&limit=<k>``
+from a ``NameIndex`` built once from the configured ``names`` list,
+instead of sending the whole list for the client to filter.
+
+Matching is case insensitive and any word of a name can match, so
+``"smi"`` finds ``"Billie Smith"``. Names that start with the prefix
+rank first, then names by how early the matching word is, then
+alphabetically.
+
+"""
+
+import bisect
+import heapq
+
+# Sorts after any character a prefix can end with
+_MAX_CHAR = "\U0010ffff"
+
+
+def _normalise(text):
+    return " ".join(text.casefold().split())
+
+
+class NameIndex:
+    """Sorted arrays of names and name suffixes that start at a word.
+
+    A search is a binary search for the prefix in each array. The
+    common case, where at least ``limit`` names start with the prefix,
+    only reads the ``limit`` names after the match.
+
+    """
+
+    def __init__(self, names):
+        keyed = sorted({(_normalise(name), name) for name in names})
+        self.names = [name for _, name in keyed]
+        # Every name, in the same order as self.names
+        self._name_keys = [key for key, _ in keyed]
+
+        # Every suffix of a name that starts at its second or later
+        # word, with the word position and name id, sorted by suffix
+        suffixes = []
+        for name_id, key in enumerate(self._name_keys):
+            start = key.find(" ")
+            position = 1
+            while start != -1:
+                suffixes.append((key[start + 1 :], position, name_id))
+                start = key.find(" ", start + 1)
+                position += 1
+        suffixes.sort()
+        self._suffix_keys = [suffix for suffix, _, _ in suffixes]
+        self._suffix_ranks = [(position, name_id) for _, position, name_id in suffixes]
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, prefix, limit=10):
+        """Return up to ``limit`` names matching ``prefix``, best first."""
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+        prefix = _normalise(prefix)
+        start = bisect.bisect_left(self._name_keys, prefix)
+        end = bisect.bisect_left(self._name_keys, prefix + _MAX_CHAR, start)
+        if end - start >= limit:
+            return self.names[start : start + limit]
+
+        # Too few names start with the prefix, so rank the names with a
+        # later word that does by the position of their earliest match
+        word_start = bisect.bisect_left(self._suffix_keys, prefix)
+        word_end = bisect.bisect_left(self._suffix_keys, prefix + _MAX_CHAR, word_start)
+        positions = {}
+        for position, name_id in self._suffix_ranks[word_start:word_end]:
+            if start <= name_id < end:
+                continue
+            if name_id not in positions or position < positions[name_id]:
+                positions[name_id] = position
+        ranked = heapq.nsmallest(
+            limit - (end - start),
+            ((position, name_id) for name_id, position in positions.items()),
+        )
+        return self.names[start:end] + [self.names[name_id] for _, name_id in ranked]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Performance budgets for the frontend's pages.
+
+After a page loads, ``collect_page_timings`` reads the browser's
+Navigation, Paint and Resource Timing entries in one script call. The
+integration tests check each page against a budget for every driver.
+Budgets are JSON, with optional overrides by driver name::
+
+    {"default": {"first_paint_ms": 3000, "dom_content_loaded_ms": 3000,
+                 "transfer_bytes": 8388608},
+     "firefox": {"first_paint_ms": 4000}}
+
+The timings are written to a report::
+
+    {"pages": {"<page>": {"<driver>": {"first_paint_ms": 812.4,
+        "dom_content_loaded_ms": 640.1, "load_ms": 901.7,
+        "transfer_bytes": 2310045, "resources": 14}}}}
+
+Check a report against budgets, listing the pages over budget::
+
+    ./page_budgets.py page_timings.json --budgets budgets.json
+
+"""
+
+from collections import namedtuple
+import argparse
+import json
+import sys
+import time
+
+from phase_timings import load_report
+
+# Metrics a budget can limit
+BUDGETED_METRICS = ("first_paint_ms", "dom_content_loaded_ms", "transfer_bytes")
+
+# Generous enough for the unminified development bundle
+DEFAULT_BUDGETS = {
+    "default": {
+        "first_paint_ms": 3000,
+        "dom_content_loaded_ms": 3000,
+        "transfer_bytes": 8 * 1024 * 1024,
+    }
+}
+
+# How long to wait for the browser to report the first paint
+PAINT_TIMEOUT = 5
+
+Violation = namedtuple("Violation", ["metric", "value", "budget"])
+
+# Times are relative to the start of navigation. Resources served
+# from the cache have no transfer size, so their encoded size is used.
+PAGE_TIMING_SCRIPT = """
+var navigation = performance.getEntriesByType("navigation")[0];
+var timing = performance.timing;
+var paints = {};
+performance.getEntriesByType("paint").forEach(function (entry) {
+    paints[entry.name] = entry.startTime;
+});
+var size = function (entry) {
+    return Math.max(entry.transferSize || 0, entry.encodedBodySize || 0);
+};
+var resources = performance.getEntriesByType("resource");
+var bytes = navigation ? size(navigation) : 0;
+resources.forEach(function (entry) { bytes += size(entry); });
+var firstPaint = "first-paint" in paints ? paints["first-paint"]
+    : paints["first-contentful-paint"];
+return {
+    "first_paint_ms": firstPaint === undefined ? null : firstPaint,
+    "dom_content_loaded_ms": navigation ? navigation.domContentLoadedEventEnd
+        : timing.domContentLoadedEventEnd - timing.navigationStart,
+    "load_ms": navigation ? navigation.loadEventEnd
+        : timing.loadEventEnd - timing.navigationStart,
+    "transfer_bytes": bytes,
+    "resources": resources.length,
+    "paint_supported": typeof PerformancePaintTiming !== "undefined"
+};
+"""
+
+
+def collect_page_timings(driver, paint_timeout=PAINT_TIMEOUT):
+    """Return the timings of the page ``driver`` has just loaded.
+
+    ``first_paint_ms`` is ``None`` if the browser hasn't reported a
+    paint within ``paint_timeout`` seconds, or doesn't report paints,
+    in which case it isn't waited for.
+
+    """
+    deadline = time.monotonic() + paint_timeout
+    while True:
+        timings = driver.execute_script(PAGE_TIMING_SCRIPT)
+        paint_supported = timings.pop("paint_supported")
+        if (
+            timings["first_paint_ms"] is not None
+            or not paint_supported
+            or time.monotonic() > deadline
+        ):
+            return timings
+        time.sleep(0.1)
+
+
+def load_budgets(path):
+    with open(path) as f:
+        budgets = json.load(f)
+    for name, budget in budgets.items():
+        unknown = set(budget) - set(BUDGETED_METRICS)
+        if unknown:
+            raise ValueError(
+                f"Unknown metrics {sorted(unknown)} in the {name!r} budget, "
+                f"expected some of {list(BUDGETED_METRICS)}"
+            )
+    return budgets
+
+
+def budget_for(budgets, driver_name):
+    """Return the budget for a driver: the default budget, updated with
+    the driver's own.
+
+    """
+    budget = dict(budgets.get("default", {}))
+    budget.update(budgets.get(driver_name, {}))
+    return budget
+
+
+def check_budget(timings, budget):
+    """Return a ``Violation`` for each metric over budget.
+
+    Metrics the browser didn't report can't be over budget.
+
+    """
+    violations = []
+    for metric, limit in sorted(budget.items()):
+        value = timings.get(metric)
+        if value is not None and value > limit:
+            violations.append(Violation(metric, value, limit))
+    return violations
+
+
+def format_violations(violations):
+    return ", ".join(
+        f"{metric} {value:.0f} > {budget:.0f}" for metric, value, budget in violations
+    )
+
+
+class PageTimings:
+    """Collects the timings of each page for each driver."""
+
+    def __init__(self):
+        self.pages = {}
+
+    def reset(self):
+        self.pages.clear()
+
+    def record(self, page, driver, timings):
+        self.pages.setdefault(page, {})[driver] = timings
+
+    def report(self):
+        return {"pages": {page: dict(drivers) for page, drivers in self.pages.items()}}
+
+
+def merge_page_reports(reports):
+    merged = {}
+    for report in reports:
+        for page, drivers in report["pages"].items():
+            merged.setdefault(page, {}).update(drivers)
+    return {"pages": merged}
+
+
+def check_report(report, budgets):
+    """Return ``(page, driver, violations)`` for each page over budget.
+
+    Drivers are named ``<index>-<name>``, so the budget for ``<name>``
+    applies.
+
+    """
+    over = []
+    for page, drivers in sorted(report["pages"].items()):
+        for driver, timings in sorted(drivers.items()):
+            name = driver.split("-", 1)[-1]
+            violations = check_budget(timings, budget_for(budgets, name))
+            if violations:
+                over.append((page, driver, violations))
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check page timings against budgets.")
+    parser.add_argument("report", help="Page timings report to check")
+    parser.add_argument(
+        "--budgets", default=None, help="Budgets JSON file, defaults to the built in"
+    )
+    args = parser.parse_args()
+
+    budgets = load_budgets(args.budgets) if args.budgets else DEFAULT_BUDGETS
+    over = check_report(load_report(args.report), budgets)
+    for page, driver, violations in over:
+        print(f"{page} [{driver}]: {format_violations(violations)}")
+    if not over:
+        print("Every page is within budget")
+    sys.exit(1 if over else 0)
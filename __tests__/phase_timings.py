@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Per-phase timings of the integration tests.
+
+The integration tests time each phase of every test for each driver:
+starting drivers and the dummy server, page loads, element lookups,
+filling in forms and collecting their state, the time from clicking
+submit until the server captures the request, and teardown. Every
+WebDriver command is also counted and timed as ``webdriver_command``,
+so its ``count`` is the round trips a test made. The report is JSON::
+
+    {"tests": {"<test id>": {"<driver>": {"<phase>": {
+        "count": 3, "total": 1.2, "mean": 0.4, "max": 0.6}}}}}
+
+Compare a report with a baseline, listing the phases whose mean time
+got more than 25% (and 50 ms) slower::
+
+    ./phase_timings.py timings.json --baseline baseline.json
+
+With ``--round-trips``, it also lists how many WebDriver round trips
+each test made, and how long they took, before and after. Record the
+baseline before a change to the tests to measure what it saves.
+
+"""
+
+from collections import defaultdict, namedtuple
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+DEFAULT_THRESHOLD = 0.25
+
+# Phases that got slower by less than this many seconds are noise
+DEFAULT_MIN_SLOWDOWN = 0.05
+
+Regression = namedtuple(
+    "Regression", ["test", "driver", "phase", "baseline", "current"]
+)
+
+RoundTrips = namedtuple(
+    "RoundTrips",
+    ["test", "driver", "baseline_count", "count", "baseline_total", "total"],
+)
+
+ROUND_TRIP_PHASE = "webdriver_command"
+
+
+class PhaseTimer:
+    """Collects phase timings for the test that is running.
+
+    Phases that don't belong to one driver, like starting the server,
+    are recorded against the driver ``"-"``.
+
+    """
+
+    def __init__(self):
+        self.test = None
+        self.samples = defaultdict(list)
+        self.marks = {}
+
+    def reset(self):
+        self.samples.clear()
+        self.marks.clear()
+
+    def record(self, phase, seconds, driver="-", test=None):
+        key = (test or self.test or "-", driver, phase)
+        self.samples[key].append(seconds)
+
+    @contextlib.contextmanager
+    def phase(self, phase, driver="-", test=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, driver, test)
+
+    def mark(self, name, driver="-"):
+        """Remember the wall clock time something happened."""
+        self.marks[name] = (driver, time.time())
+
+    def record_since(self, name, phase, timestamp):
+        """Record the time from mark ``name`` until the wall clock
+        ``timestamp`` as ``phase``, if the mark has been set.
+
+        """
+        if name in self.marks:
+            driver, marked = self.marks.pop(name)
+            self.record(phase, timestamp - marked, driver)
+
+    def report(self):
+        tests = {}
+        for (test, driver, phase), samples in sorted(self.samples.items()):
+            drivers = tests.setdefault(test, {})
+            drivers.setdefault(driver, {})[phase] = {
+                "count": len(samples),
+                "total": sum(samples),
+                "mean": sum(samples) / len(samples),
+                "max": max(samples),
+            }
+        return {"tests": tests}
+
+
+def merge_reports(reports):
+    """Combine reports for different tests, or different runs of the
+    same tests, into one.
+
+    """
+    merged = {}
+    for report in reports:
+        for test, drivers in report["tests"].items():
+            for driver, phases in drivers.items():
+                for phase, stats in phases.items():
+                    phases_seen = merged.setdefault(test, {}).setdefault(driver, {})
+                    if phase not in phases_seen:
+                        phases_seen[phase] = dict(stats)
+                        continue
+                    combined = phases_seen[phase]
+                    combined["count"] += stats["count"]
+                    combined["total"] += stats["total"]
+                    combined["mean"] = combined["total"] / combined["count"]
+                    combined["max"] = max(combined["max"], stats["max"])
+    return {"tests": merged}
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    report, baseline, threshold=DEFAULT_THRESHOLD, min_slowdown=DEFAULT_MIN_SLOWDOWN
+):
+    """Return a ``Regression`` for each phase whose mean time in
+    ``report`` is more than ``threshold`` (a fraction) and
+    ``min_slowdown`` seconds slower than in ``baseline``.
+
+    Phases missing from the baseline are ignored.
+
+    """
+    regressions = []
+    for test, drivers in sorted(report["tests"].items()):
+        for driver, phases in sorted(drivers.items()):
+            for phase, stats in sorted(phases.items()):
+                try:
+                    before = baseline["tests"][test][driver][phase]["mean"]
+                except KeyError:
+                    continue
+                after = stats["mean"]
+                if after > before * (1 + threshold) and after - before > min_slowdown:
+                    regressions.append(Regression(test, driver, phase, before, after))
+    return regressions
+
+
+def compare_round_trips(report, baseline):
+    """Return ``RoundTrips`` for each test and driver that made a
+    different number of WebDriver round trips in ``report`` than in
+    ``baseline``.
+
+    Tests missing from the baseline are ignored.
+
+    """
+    changes = []
+    for test, drivers in sorted(report["tests"].items()):
+        for driver, phases in sorted(drivers.items()):
+            try:
+                before = baseline["tests"][test][driver][ROUND_TRIP_PHASE]
+                after = phases[ROUND_TRIP_PHASE]
+            except KeyError:
+                continue
+            if after["count"] != before["count"]:
+                changes.append(
+                    RoundTrips(
+                        test,
+                        driver,
+                        before["count"],
+                        after["count"],
+                        before["total"],
+                        after["total"],
+                    )
+                )
+    return changes
+
+
+def print_round_trips(changes, file=sys.stderr):
+    if not changes:
+        print("No test changed its number of WebDriver round trips", file=file)
+        return
+    print(f"{len(changes)} test(s) changed their WebDriver round trips:", file=file)
+    for test, driver, before, after, before_total, total in changes:
+        print(
+            f"  {test} [{driver}]: {before} -> {after} round trips, "
+            f"{before_total * 1000:.0f} ms -> {total * 1000:.0f} ms",
+            file=file,
+        )
+    saved = sum(change.baseline_total - change.total for change in changes)
+    print(f"Saved {saved * 1000:.0f} ms in WebDriver round trips", file=file)
+
+
+def print_regressions(regressions, threshold, file=sys.stderr):
+    if not regressions:
+        print(f"No phase slowed down by more than {threshold:.0%}", file=file)
+        return
+    print(
+        f"{len(regressions)} phase(s) slowed down by more than {threshold:.0%}:",
+        file=file,
+    )
+    for test, driver, phase, before, after in regressions:
+        growth = f"+{after / before - 1:.0%}" if before else "new"
+        print(
+            f"  {test} [{driver}] {phase}: {before * 1000:.0f} ms -> "
+            f"{after * 1000:.0f} ms ({growth})",
+            file=file,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare phase timing reports.")
+    parser.add_argument("report", help="Timings report of the run to check")
+    parser.add_argument(
+        "--baseline", required=True, help="Timings report to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fraction a phase's mean time may grow by before it is flagged",
+    )
+    parser.add_argument(
+        "--min-slowdown",
+        type=float,
+        default=DEFAULT_MIN_SLOWDOWN,
+        help="Seconds a phase must slow down by to be flagged",
+    )
+    parser.add_argument(
+        "--round-trips",
+        action="store_true",
+        help="Also list the tests whose WebDriver round trips changed",
+    )
+    args = parser.parse_args()
+
+    report = load_report(args.report)
+    baseline = load_report(args.baseline)
+    regressions = compare(report, baseline, args.threshold, args.min_slowdown)
+    print_regressions(regressions, args.threshold, file=sys.stdout)
+    if args.round_trips:
+        print_round_trips(compare_round_trips(report, baseline), file=sys.stdout)
+    sys.exit(1 if regressions else 0)
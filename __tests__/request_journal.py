@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Append-only journal of the requests captured by the dummy server.
+
+The server process appends each captured request to a memory-mapped
+file and any other process can read it back through its own mapping,
+without consuming anything. Records are indexed by sequence number and
+endpoint as they are read, and only decoded when asked for.
+
+Print the requests in a journal, following new ones as they arrive::
+
+    ./request_journal.py /tmp/journal --follow --endpoint sign-in
+
+File layout. The header is::
+
+    magic (4 bytes) | reserved (4 bytes) | committed length (uint64)
+
+The committed length is the offset just past the last complete record
+and is only updated once a record has been fully written. Each record
+is::
+
+    generation (uint32) | meta length (uint32) | blobs length (uint32)
+    | endpoint length (uint16) | method length (uint8)
+    | method | endpoint | meta JSON | blobs
+
+Binary values, such as decoded signatures, are stored raw in the
+blobs section and referenced from the meta JSON. Values already moved
+to a blob store (see blob_store.py) are stored as just their digest.
+
+"""
+
+from collections import defaultdict, namedtuple
+import argparse
+import base64
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"DSJ\x01"
+HEADER = struct.Struct("<4s4xQ")
+RECORD = struct.Struct("<IIIHB")
+DEFAULT_CAPACITY = 16 * 1024 * 1024
+
+# Key of the JSON object that stands in for a DataURL in the meta JSON
+_BLOB_KEY = "\x00blob"
+
+# Key of the JSON object that stands in for a BlobRef in the meta JSON
+_REF_KEY = "\x00ref"
+
+CapturedRequest = namedtuple(
+    "CapturedRequest",
+    ["seq", "method", "endpoint", "path", "headers", "data", "timestamp"],
+)
+CapturedRequest.__doc__ = """A request recorded by the dummy server.
+
+``seq`` is the position of the request in the server's log, starting
+at 0 after each ``reconfigure``, and ``data`` is the decoded JSON body
+(``None`` for requests without a body). Data URL strings in the body,
+such as signatures, are decoded to ``DataURL``.
+
+"""
+
+
+class DataURL(namedtuple("DataURL", ["mime_type", "data"])):
+    """A decoded base64 ``data:`` URL, such as a signature from
+    ``SignaturePad.toDataURL()``.
+
+    """
+
+    __slots__ = ()
+
+    def to_url(self):
+        encoded = base64.b64encode(self.data).decode("ascii")
+        return f"data:{self.mime_type};base64,{encoded}"
+
+
+class BlobRef(namedtuple("BlobRef", ["mime_type", "digest"])):
+    """A ``DataURL`` whose bytes are kept in a ``BlobStore`` under the hex
+    SHA-256 ``digest``.
+
+    """
+
+    __slots__ = ()
+
+
+def _encode_blobs(value, blobs, offset):
+    """Replace each ``DataURL`` in ``value`` with a reference to its
+    bytes, which are appended to ``blobs``.
+
+    Returns the new value and the offset just past the last blob.
+
+    """
+    if isinstance(value, DataURL):
+        blobs.append(value.data)
+        reference = {_BLOB_KEY: [value.mime_type, offset, len(value.data)]}
+        return reference, offset + len(value.data)
+    if isinstance(value, BlobRef):
+        return {_REF_KEY: list(value)}, offset
+    if isinstance(value, dict):
+        encoded = {}
+        for key, item in value.items():
+            encoded[key], offset = _encode_blobs(item, blobs, offset)
+        return encoded, offset
+    if isinstance(value, list):
+        encoded = []
+        for item in value:
+            item, offset = _encode_blobs(item, blobs, offset)
+            encoded.append(item)
+        return encoded, offset
+    return value, offset
+
+
+def _decode_blobs(value, blobs):
+    if isinstance(value, dict):
+        if _BLOB_KEY in value:
+            mime_type, offset, length = value[_BLOB_KEY]
+            return DataURL(mime_type, bytes(blobs[offset : offset + length]))
+        if _REF_KEY in value:
+            return BlobRef(*value[_REF_KEY])
+        return {key: _decode_blobs(item, blobs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_blobs(item, blobs) for item in value]
+    return value
+
+
+class JournalWriter:
+    """Appends records to a journal file, creating or truncating it.
+
+    ``append`` is thread safe. The file starts at ``capacity`` bytes
+    (sparse on most file systems) and doubles whenever it fills up.
+
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w+b")
+        self._file.truncate(capacity)
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        HEADER.pack_into(self._map, 0, MAGIC, HEADER.size)
+        self._end = HEADER.size
+
+    def append(self, generation, method, endpoint, path, headers, data, timestamp):
+        blobs = []
+        data, blobs_length = _encode_blobs(data, blobs, 0)
+        meta = json.dumps(
+            {"path": path, "headers": headers, "data": data, "timestamp": timestamp}
+        ).encode()
+        method = method.encode("ascii")
+        endpoint = endpoint.encode("utf-8")
+        length = RECORD.size + len(method) + len(endpoint) + len(meta) + blobs_length
+
+        with self._lock:
+            start = self._end
+            if start + length > len(self._map):
+                self._map.resize(max(2 * len(self._map), start + length))
+            RECORD.pack_into(
+                self._map,
+                start,
+                generation,
+                len(meta),
+                blobs_length,
+                len(endpoint),
+                len(method),
+            )
+            position = start + RECORD.size
+            for part in (method, endpoint, meta, *blobs):
+                self._map[position : position + len(part)] = part
+                position += len(part)
+            # Only publish the record once all of it has been written
+            self._end = position
+            HEADER.pack_into(self._map, 0, MAGIC, self._end)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_IndexEntry = namedtuple("_IndexEntry", ["offset", "method", "endpoint"])
+
+
+class JournalReader:
+    """Reads a journal written by a ``JournalWriter``, possibly in another
+    process.
+
+    Only records from ``generation`` are indexed (every record if it
+    is ``None``), and they are numbered from 0 in the order they were
+    appended. Call ``refresh`` to index records appended since the
+    last call.
+
+    """
+
+    def __init__(self, path, generation=0):
+        self.path = path
+        self.generation = generation
+        self._file = open(path, "rb")
+        self._map = None
+        self._offset = HEADER.size
+        self._entries = []
+        self._by_endpoint = defaultdict(list)
+        self._remap()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        magic, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a request journal")
+
+    def refresh(self):
+        """Index any records appended since the last refresh and return
+        how many of them are from this reader's generation.
+
+        """
+        _, committed = HEADER.unpack_from(self._map, 0)
+        if committed > len(self._map):
+            self._remap()
+        added = 0
+        while self._offset < committed:
+            offset = self._offset
+            (
+                generation,
+                meta_length,
+                blobs_length,
+                endpoint_length,
+                method_length,
+            ) = RECORD.unpack_from(self._map, offset)
+            position = offset + RECORD.size
+            self._offset = (
+                position + method_length + endpoint_length + meta_length + blobs_length
+            )
+            if self.generation is not None and generation != self.generation:
+                continue
+            method = self._map[position : position + method_length].decode("ascii")
+            position += method_length
+            endpoint = self._map[position : position + endpoint_length].decode("utf-8")
+            self._by_endpoint[endpoint].append(len(self._entries))
+            self._entries.append(_IndexEntry(offset, method, endpoint))
+            added += 1
+        return added
+
+    def reset(self, generation):
+        """Forget every indexed record and only index records from
+        ``generation`` that are appended from now on.
+
+        """
+        self.generation = generation
+        self._entries = []
+        self._by_endpoint = defaultdict(list)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, seq):
+        """Decode record ``seq``."""
+        offset, method, endpoint = self._entries[seq]
+        (
+            _,
+            meta_length,
+            blobs_length,
+            endpoint_length,
+            method_length,
+        ) = RECORD.unpack_from(self._map, offset)
+        position = offset + RECORD.size + method_length + endpoint_length
+        meta = json.loads(self._map[position : position + meta_length])
+        position += meta_length
+        blobs = memoryview(self._map)[position : position + blobs_length]
+        try:
+            data = _decode_blobs(meta["data"], blobs)
+        finally:
+            blobs.release()
+        return CapturedRequest(
+            seq,
+            method,
+            endpoint,
+            meta["path"],
+            meta["headers"],
+            data,
+            meta["timestamp"],
+        )
+
+    def seqs(self, endpoint=None, method=None, after=None):
+        """Return the sequence numbers of the indexed records that match
+        the filters, in order, without decoding any records.
+
+        """
+        if endpoint is None:
+            candidates = range(len(self._entries))
+        else:
+            candidates = self._by_endpoint.get(endpoint, [])
+        if after is not None:
+            candidates = candidates[bisect.bisect_right(candidates, after) :]
+        if method is None:
+            return list(candidates)
+        return [seq for seq in candidates if self._entries[seq].method == method]
+
+    def tail(self, follow=False, poll_interval=0.05):
+        """Yield every record, then wait for new ones if ``follow`` is
+        set.
+
+        """
+        seq = 0
+        while True:
+            self.refresh()
+            while seq < len(self._entries):
+                yield self.get(seq)
+                seq += 1
+            if not follow:
+                return
+            time.sleep(poll_interval)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _summarise(value):
+    if isinstance(value, DataURL):
+        return f"<{value.mime_type}, {len(value.data)} bytes>"
+    if isinstance(value, BlobRef):
+        return f"<{value.mime_type}, sha256 {value.digest[:12]}>"
+    if isinstance(value, dict):
+        return {key: _summarise(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_summarise(item) for item in value]
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a request journal.")
+    parser.add_argument("path", help="Path of the journal")
+    parser.add_argument(
+        "--follow", action="store_true", help="Keep printing new requests"
+    )
+    parser.add_argument("--endpoint", default=None, help="Only print this endpoint")
+    parser.add_argument("--method", default=None, help="Only print this method")
+    parser.add_argument(
+        "--generation",
+        type=int,
+        default=None,
+        help="Only print requests from this generation of the server's "
+        "configuration",
+    )
+    args = parser.parse_args()
+
+    reader = JournalReader(args.path, generation=args.generation)
+    try:
+        for request in reader.tail(follow=args.follow):
+            if args.endpoint is not None and request.endpoint != args.endpoint:
+                continue
+            if args.method is not None and request.method != args.method:
+                continue
+            summary = _summarise(request._asdict())
+            print(json.dumps(summary), flush=True)
+    except (KeyboardInterrupt, BrokenPipeError):
+        sys.exit(0)
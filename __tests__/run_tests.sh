@@ -5,18 +5,35 @@ trap "{ kill $(jobs -p) }" SIGINT SIGTERM
 cd $(dirname $0)
 
 to_run="${1:-all}"
+workers="${WORKERS:-1}"
 
 it_exit_code=0
 ut_exit_code=0
 
 # Run integration tests
-if [[ "$to_run" == "integration" || "$to_run" == "all" ]]; then
+if [[ "$to_run" == "integration" || "$to_run" == "all" ]] && [[ -n "$STATIC" ]]; then
+    # Serve a production build from the dummy servers instead of
+    # starting a development server per worker
+    REACT_APP_API_URL= npm run build || exit $?
+    pipenv run python integrationTests.py --port 8345 --client-port 8345 --headless true --workers "$workers" --page-timings page_timings.json --static-root ../build
+    it_exit_code=$?
+elif [[ "$to_run" == "integration" || "$to_run" == "all" ]]; then
     PORT=3345 npm run start:test &
     if [[ $? != 0 ]]; then
 	echo "Node server failed to start"
 	exit $?
     fi
-    pipenv run python integrationTests.py --port 8345 --client-port 3345 --headless true
+    # Each extra integration test worker needs its own client, pointed
+    # at its own dummy server
+    for ((i = 1; i < workers; i++)); do
+	PORT=$((3345 + i)) REACT_APP_API_URL="http://localhost:$((8345 + i))" npm run start:test &
+	if [[ $? != 0 ]]; then
+	    echo "Node server failed to start"
+	    exit $?
+	fi
+    done
+    pipenv run python integrationTests.py --port 8345 --client-port 3345 --headless true --workers "$workers" --page-timings page_timings.json
+    it_exit_code=$?
     kill $(jobs -p)
 fi
 
@@ -24,6 +41,8 @@ fi
 if [[ "$to_run" == "unit" || "$to_run" == "all" ]]; then
     npm test
     ut_exit_code=$?
+    # The dummy server's own tests
+    pipenv run python -m unittest discover -p "test_*.py" || ut_exit_code=1
 fi
 
 if [[ $it_exit_code != 0 || $ut_exit_code != 0 ]]; then
@@ -0,0 +1,146 @@
+"""Request metrics for the dummy server.
+
+The server records the count, status codes, bytes in and out and a
+latency histogram for every method and endpoint. They are served in
+the Prometheus text format at ``/__metrics`` and as JSON at
+``/__metrics?format=json``, which is what ``DummyServer.metrics()``
+returns. Every static file is counted under the one ``static``
+endpoint.
+
+"""
+
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the latency histogram buckets. The last
+# bucket (+Inf) is implicit.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _Series:
+    __slots__ = ("statuses", "bytes_in", "bytes_out", "buckets", "latency_sum")
+
+    def __init__(self):
+        self.statuses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+
+
+class Metrics:
+    """Thread safe per-method, per-endpoint request metrics.
+
+    ``observe`` only takes a lock and updates a few counters, so it is
+    cheap enough to leave on under load.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, method, endpoint, status, bytes_in, bytes_out, seconds):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        key = (method, endpoint)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.bytes_in += bytes_in
+            series.bytes_out += bytes_out
+            series.buckets[bucket] += 1
+            series.latency_sum += seconds
+
+    def snapshot(self):
+        """Return the metrics as a JSON-compatible dict.
+
+        Histogram buckets are cumulative, as in Prometheus, and the
+        last one has an upper bound of ``None`` (+Inf).
+
+        """
+        requests = []
+        with self._lock:
+            for (method, endpoint), series in sorted(self._series.items()):
+                cumulative = []
+                count = 0
+                for bound, bucket in zip(LATENCY_BUCKETS + (None,), series.buckets):
+                    count += bucket
+                    cumulative.append([bound, count])
+                requests.append(
+                    {
+                        "method": method,
+                        "endpoint": endpoint,
+                        "statuses": {
+                            str(status): n for status, n in series.statuses.items()
+                        },
+                        "bytes_in": series.bytes_in,
+                        "bytes_out": series.bytes_out,
+                        "latency": {
+                            "buckets": cumulative,
+                            "sum": series.latency_sum,
+                            "count": count,
+                        },
+                    }
+                )
+        return {"requests": requests}
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        requests = self.snapshot()["requests"]
+        lines = [
+            "# HELP dummy_server_requests_total Requests served.",
+            "# TYPE dummy_server_requests_total counter",
+        ]
+        for series in requests:
+            for status, count in sorted(series["statuses"].items()):
+                labels = _labels(series, status=status)
+                lines.append(f"dummy_server_requests_total{labels} {count}")
+
+        for name, key, help_text in (
+            ("request_bytes", "bytes_in", "Request body bytes received."),
+            ("response_bytes", "bytes_out", "Response bytes sent."),
+        ):
+            lines.append(f"# HELP dummy_server_{name}_total {help_text}")
+            lines.append(f"# TYPE dummy_server_{name}_total counter")
+            for series in requests:
+                lines.append(
+                    f"dummy_server_{name}_total{_labels(series)} {series[key]}"
+                )
+
+        name = "dummy_server_request_duration_seconds"
+        lines.append(f"# HELP {name} Time spent handling requests.")
+        lines.append(f"# TYPE {name} histogram")
+        for series in requests:
+            latency = series["latency"]
+            for bound, count in latency["buckets"]:
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f"{name}_bucket{_labels(series, le=le)} {count}")
+            lines.append(f"{name}_sum{_labels(series)} {latency['sum']}")
+            lines.append(f"{name}_count{_labels(series)} {latency['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(series, **extra):
+    labels = {"method": series["method"], "endpoint": series["endpoint"], **extra}
+    pairs = ",".join(f'{name}="{_escape(str(v))}"' for name, v in labels.items())
+    return "{" + pairs + "}"
@@ -0,0 +1,116 @@
+"""Per-user settings saved by ``/v1/settings`` POSTs.
+
+The dummy server keeps each user's settings in SQLite, so a settings
+POST can be read back by the ``GET`` the settings page makes, and
+settings outlive the server when ``settings_path`` is given.
+
+The database is in WAL mode, so reads never wait for a write, and each
+thread reuses one connection. Settings that have been read or written
+are kept in an LRU cache in front of the database. Writes go to the
+database first and then replace the cached copy, so the cache never
+serves settings older than the last write.
+
+"""
+
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Cached for users without settings, so they aren't looked up again
+_MISSING = object()
+
+
+class SettingsStore:
+    """Settings by user, in the SQLite database at ``path``.
+
+    Every method is thread safe.
+
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS settings "
+                "(user TEXT PRIMARY KEY, settings TEXT NOT NULL)"
+            )
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each connection is only used by the thread that opened it,
+            # but close() is called from another
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode this is still safe from corruption, it only
+            # risks the last writes if the machine loses power
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _cache_put(self, user, settings, replace=True):
+        """Cache a user's settings.
+
+        Settings read from the database don't ``replace`` a cached copy,
+        since a write may have cached newer ones since they were read.
+
+        """
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            if replace or user not in self._cache:
+                self._cache[user] = settings
+            self._cache.move_to_end(user)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, user):
+        """Return a copy of the user's settings, or ``None`` if they have
+        never saved any.
+
+        """
+        with self._lock:
+            settings = self._cache.get(user)
+            if settings is not None:
+                self._cache.move_to_end(user)
+        if settings is None:
+            row = (
+                self._connection()
+                .execute("SELECT settings FROM settings WHERE user = ?", (user,))
+                .fetchone()
+            )
+            settings = json.loads(row[0]) if row else _MISSING
+            self._cache_put(user, settings, replace=False)
+        return None if settings is _MISSING else dict(settings)
+
+    def put(self, user, settings):
+        settings = dict(settings)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO settings (user, settings) VALUES (?, ?)",
+                (user, json.dumps(settings)),
+            )
+        self._cache_put(user, settings)
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM settings")
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
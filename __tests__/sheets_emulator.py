@@ -0,0 +1,147 @@
+"""In-memory stand-in for the Google Sheets the backend writes to.
+
+The production backend appends every sign in and sign out to the
+attendance sheet chosen in the settings. The dummy server does the
+same to a ``SheetsEmulator``: each sign in or sign out is appended as a
+row to the spreadsheet and sheet in the requesting user's saved
+settings.
+``DummyServer.sheets()`` returns what has been written.
+
+Sheets are stored by column. Each column keeps every distinct value
+once and a compact array of codes, one per row, so repeated values like
+cub names and dates cost a byte or two per row.
+
+"""
+
+import array
+import json
+import threading
+
+# Array typecodes to widen codes through as a column's distinct values
+# grow, with the largest code each can hold
+_CODE_TYPES = (("B", 0xFF), ("H", 0xFFFF), ("I", 0xFFFFFFFF))
+
+
+def _key(value):
+    """Return a hashable key for ``value`` that keeps ``1``, ``1.0`` and
+    ``True`` apart.
+
+    """
+    if isinstance(value, (dict, list)):
+        return (json, json.dumps(value, sort_keys=True, default=repr))
+    return (type(value), value)
+
+
+class _Column:
+    """A dictionary encoded column. Code 0 is ``None``."""
+
+    __slots__ = ("values", "codes", "_lookup", "_code_type")
+
+    def __init__(self, rows=0):
+        self.values = [None]
+        self._lookup = {_key(None): 0}
+        self._code_type = 0
+        self.codes = array.array(_CODE_TYPES[0][0], bytes(rows))
+
+    def append(self, value):
+        key = _key(value)
+        code = self._lookup.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._lookup[key] = code
+            if code > _CODE_TYPES[self._code_type][1]:
+                self._code_type += 1
+                self.codes = array.array(_CODE_TYPES[self._code_type][0], self.codes)
+        self.codes.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+
+class Sheet:
+    """Rows appended to one sheet of a spreadsheet.
+
+    Columns are added the first time a row has them. Earlier rows, and
+    later rows without them, read as ``None``.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, row):
+        """Append a row, given as a dict of column name to value, and
+        return its index.
+
+        """
+        for name in row:
+            if name not in self.columns:
+                self.columns[name] = _Column(self._rows)
+        for name, column in self.columns.items():
+            column.append(row.get(name))
+        self._rows += 1
+        return self._rows - 1
+
+    def row(self, index):
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def rows(self):
+        for index in range(self._rows):
+            yield self.row(index)
+
+    def column(self, name):
+        column = self.columns.get(name)
+        if column is None:
+            return [None] * self._rows
+        return [column.values[code] for code in column.codes]
+
+
+class SheetsEmulator:
+    """Spreadsheets by id, each a dict of sheets by name.
+
+    Spreadsheets and sheets are created when first appended to. Every
+    method is thread safe.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spreadsheets = {}
+
+    def append(self, spreadsheet_id, sheet_name, row):
+        with self._lock:
+            sheets = self.spreadsheets.setdefault(spreadsheet_id, {})
+            sheet = sheets.get(sheet_name)
+            if sheet is None:
+                sheet = sheets[sheet_name] = Sheet(sheet_name)
+            return sheet.append(row)
+
+    def clear(self):
+        with self._lock:
+            self.spreadsheets = {}
+
+    def snapshot(self, encode=lambda value: value):
+        """Return every sheet as ``{spreadsheet: {sheet: {"columns": [...],
+        "rows": [[...], ...]}}}``, passing each value through ``encode``.
+
+        """
+        with self._lock:
+            return {
+                spreadsheet_id: {
+                    name: {
+                        "columns": list(sheet.columns),
+                        "rows": [
+                            [encode(value) for value in row.values()]
+                            for row in sheet.rows()
+                        ],
+                    }
+                    for name, sheet in sheets.items()
+                }
+                for spreadsheet_id, sheets in self.spreadsheets.items()
+            }
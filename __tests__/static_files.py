@@ -0,0 +1,127 @@
+"""Serving a production build of the frontend from the dummy server.
+
+Given ``static_root``, the dummy server serves the built ``build/``
+directory alongside the API, the way ``nginx.conf`` does in
+production: paths that aren't files fall back to ``index.html`` so the
+client side routes work. Build the frontend against the dummy server's
+own origin and point the tests at the server's port::
+
+    REACT_APP_API_URL= npm run build
+    ./integrationTests.py --static-root ../build --port 8345 --client-port 8345
+
+Assets with a content hash in their name are cached by browsers for a
+year, and everything else is revalidated on every use. A ``.gz`` file
+next to an asset is sent instead of it to clients that accept gzip;
+``precompress`` creates them.
+
+"""
+
+from collections import namedtuple
+import gzip
+import mimetypes
+import os
+import re
+import shutil
+import urllib.parse
+
+# CRA names its output like main.1a2b3c4d.chunk.js and logo.5d5d9eef.svg
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Extensions worth compressing
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".txt",
+}
+
+# Files smaller than this aren't worth compressing
+PRECOMPRESS_MIN_SIZE = 256
+
+StaticFile = namedtuple(
+    "StaticFile",
+    ["path", "size", "content_type", "encoding", "etag", "cache_control"],
+)
+StaticFile.__doc__ = """The file to send in response to a static request.
+
+``path`` is the file actually sent, which is the ``.gz`` variant when
+``encoding`` is ``"gzip"``. ``content_type`` is that of the original.
+
+"""
+
+
+def precompress(root, min_size=PRECOMPRESS_MIN_SIZE):
+    """Write a ``.gz`` variant of each compressible file under ``root``
+    that doesn't have an up to date one, and return how many were
+    written.
+
+    """
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = os.stat(path)
+            if stat.st_size < min_size:
+                continue
+            compressed = path + ".gz"
+            try:
+                if os.stat(compressed).st_mtime >= stat.st_mtime:
+                    continue
+            except FileNotFoundError:
+                pass
+            with open(path, "rb") as src, gzip.open(compressed, "wb", 9) as dst:
+                shutil.copyfileobj(src, dst)
+            written += 1
+    return written
+
+
+def resolve(root, url_path, accept_gzip=False):
+    """Return the ``StaticFile`` to serve for ``url_path``.
+
+    Like ``try_files $uri $uri/ /index.html``, a path that isn't a file
+    under ``root`` gets the directory's ``index.html`` or, failing
+    that, the root ``index.html``. Returns ``None`` if there is nothing
+    to serve.
+
+    """
+    root = os.path.realpath(root)
+    relative = urllib.parse.unquote(url_path).lstrip("/")
+    path = os.path.realpath(os.path.join(root, relative))
+    if path != root and not path.startswith(root + os.sep):
+        path = root
+    if os.path.isdir(path):
+        path = os.path.join(path, "index.html")
+    if not os.path.isfile(path):
+        path = os.path.join(root, "index.html")
+        if not os.path.isfile(path):
+            return None
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    if _HASHED_NAME.search(os.path.basename(path)):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = REVALIDATE_CACHE_CONTROL
+
+    encoding = None
+    stat = os.stat(path)
+    if accept_gzip:
+        try:
+            compressed = os.stat(path + ".gz")
+        except FileNotFoundError:
+            compressed = None
+        # A stale variant would serve an old version of the file
+        if compressed is not None and compressed.st_mtime >= stat.st_mtime:
+            path, stat, encoding = path + ".gz", compressed, "gzip"
+    # Nanoseconds, so a file rewritten within a second gets a new ETag
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return StaticFile(path, stat.st_size, content_type, encoding, etag, cache_control)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Unit tests for the attendance model and night summaries."""
+
+import http.client
+import json
+import unittest
+
+from attendance import Attendance
+from dummy_web_server import DummyServer
+
+
+def _event(name, date="2026-10-16", time="7:00:00"):
+    return {"cubName": name, "date": date, "time": time}
+
+
+class AttendanceTests(unittest.TestCase):
+    def setUp(self):
+        self.attendance = Attendance()
+
+    def apply(self, action, *args, generation=0, **kwargs):
+        self.attendance.apply(generation, action, _event(*args, **kwargs))
+
+    def test_empty(self):
+        self.assertEqual(self.attendance.present(), [])
+        self.assertEqual(self.attendance.nights(), [])
+
+    def test_sign_in_and_out(self):
+        self.apply("sign-in", "Mowgli", time="6:58:00")
+        self.apply("sign-in", "Akela ", time="7:01:00")
+        self.assertEqual(
+            self.attendance.present(),
+            [_event("Akela", time="7:01:00"), _event("Mowgli", time="6:58:00")],
+        )
+        self.apply("sign-out", "Mowgli", time="8:30:00")
+        self.assertEqual(self.attendance.present(), [_event("Akela", time="7:01:00")])
+        self.assertEqual(
+            self.attendance.nights(),
+            [
+                {
+                    "date": "2026-10-16",
+                    "cubs": 2,
+                    "sign_ins": 2,
+                    "sign_outs": 1,
+                    "unmatched_sign_outs": 0,
+                    "present": 1,
+                    "first_sign_in": "6:58:00",
+                    "last_sign_out": "8:30:00",
+                }
+            ],
+        )
+
+    def test_unmatched_sign_out(self):
+        self.apply("sign-in", "Mowgli")
+        self.apply("sign-out", "Baloo")
+        self.apply("sign-out", "Mowgli")
+        self.apply("sign-out", "Mowgli")
+        (night,) = self.attendance.nights()
+        self.assertEqual(night["sign_outs"], 3)
+        self.assertEqual(night["unmatched_sign_outs"], 2)
+        self.assertEqual(night["present"], 0)
+
+    def test_signing_in_again(self):
+        self.apply("sign-in", "Mowgli", time="6:58:00")
+        self.apply("sign-in", "Mowgli", time="7:05:00")
+        self.assertEqual(self.attendance.present(), [_event("Mowgli", time="7:05:00")])
+        (night,) = self.attendance.nights()
+        self.assertEqual(
+            (night["cubs"], night["sign_ins"], night["present"]), (1, 2, 1)
+        )
+
+    def test_signing_in_again_on_a_later_night(self):
+        self.apply("sign-in", "Mowgli", date="2026-10-09")
+        self.apply("sign-in", "Mowgli", date="2026-10-16")
+        first, second = self.attendance.nights()
+        self.assertEqual((first["date"], first["present"]), ("2026-10-09", 0))
+        self.assertEqual((second["date"], second["present"]), ("2026-10-16", 1))
+        # Signing out counts on the night it is sent, but the cub leaves
+        # the night they signed in on
+        self.apply("sign-out", "Mowgli", date="2026-10-17")
+        self.assertEqual(
+            [night["present"] for night in self.attendance.nights()], [0, 0, 0]
+        )
+
+    def test_nights_by_date(self):
+        self.apply("sign-in", "Mowgli", date="2026-10-16")
+        self.apply("sign-in", "Mowgli", date="2026-10-09")
+        self.assertEqual(
+            [night["date"] for night in self.attendance.nights()],
+            ["2026-10-09", "2026-10-16"],
+        )
+        (night,) = self.attendance.nights("2026-10-09")
+        self.assertEqual(night["sign_ins"], 1)
+        self.assertEqual(self.attendance.nights("2026-10-02"), [])
+
+    def test_ignores_malformed_events(self):
+        self.attendance.apply(0, "sign-in", None)
+        self.attendance.apply(0, "sign-in", ["Mowgli"])
+        self.attendance.apply(0, "sign-in", {"cubName": "Mowgli"})
+        self.attendance.apply(0, "sign-in", {"cubName": 1, "date": "2026-10-16"})
+        self.assertEqual(self.attendance.nights(), [])
+
+    def test_clear_ignores_earlier_generations(self):
+        self.apply("sign-in", "Mowgli")
+        self.attendance.clear(1)
+        self.assertEqual(self.attendance.present(), [])
+        self.assertEqual(self.attendance.nights(), [])
+        self.apply("sign-in", "Baloo", generation=0)
+        self.apply("sign-in", "Akela", generation=1)
+        self.assertEqual(self.attendance.present(), [_event("Akela")])
+
+
+class DummyServerAttendanceTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(port=0, log_requests=False)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def post(self, endpoint, body):
+        conn = http.client.HTTPConnection("localhost", self.server.port)
+        try:
+            conn.request("POST", f"/v1/{endpoint}", json.dumps(body).encode())
+            conn.getresponse().read()
+        finally:
+            conn.close()
+
+    def test_attendance(self):
+        self.post("sign-in", _event("Mowgli"))
+        self.post("sign-in", _event("Akela"))
+        self.post("sign-out", _event("Mowgli", time="8:30:00"))
+        self.assertEqual(self.server.present(), [_event("Akela")])
+        (night,) = self.server.nights("2026-10-16")
+        self.assertEqual((night["sign_ins"], night["sign_outs"]), (2, 1))
+        self.server.reconfigure()
+        self.assertEqual(self.server.present(), [])
+        self.assertEqual(self.server.nights(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
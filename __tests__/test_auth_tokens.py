@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Unit tests for the signed tokens of the dummy server's auth mode."""
+
+import http.client
+import json
+import unittest
+
+from auth_tokens import InvalidToken, TokenSigner, TokenVerifier, _b64encode
+from dummy_web_server import DummyServer
+
+NOW = 1700000000
+
+
+class TokenSignerTests(unittest.TestCase):
+    def setUp(self):
+        self.signer = TokenSigner(b"secret", ttl=60)
+
+    def test_round_trip(self):
+        token = self.signer.issue("akela@example.com", "Akela", now=NOW)
+        self.assertEqual(
+            self.signer.verify(token, now=NOW),
+            {"sub": "akela@example.com", "name": "Akela", "exp": NOW + 60},
+        )
+
+    def test_expiry(self):
+        token = self.signer.issue("akela@example.com", now=NOW)
+        self.signer.verify(token, now=NOW + 59)
+        with self.assertRaisesRegex(InvalidToken, "expired"):
+            self.signer.verify(token, now=NOW + 60)
+
+    def test_other_secret(self):
+        token = TokenSigner(b"other").issue("akela@example.com", now=NOW)
+        with self.assertRaisesRegex(InvalidToken, "signature"):
+            self.signer.verify(token, now=NOW)
+
+    def test_forged_claims(self):
+        token = self.signer.issue("akela@example.com", now=NOW)
+        _, _, signature = token.partition(".")
+        claims = {"sub": "baloo@example.com", "name": "", "exp": NOW + 60}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        with self.assertRaisesRegex(InvalidToken, "signature"):
+            self.signer.verify(f"{payload}.{signature}", now=NOW)
+
+    def test_malformed(self):
+        for token in ("", "no-signature", "a.b.c", "abc.!!!", "abc.é"):
+            with self.subTest(token=token), self.assertRaises(InvalidToken):
+                self.signer.verify(token, now=NOW)
+
+
+class TokenVerifierTests(unittest.TestCase):
+    def setUp(self):
+        self.signer = TokenSigner(b"secret", ttl=60)
+
+    def test_cache_hits(self):
+        verifier = TokenVerifier(self.signer)
+        token = self.signer.issue("akela@example.com", now=NOW)
+        first = verifier.verify(token, now=NOW)
+        self.assertEqual(verifier.verify(token, now=NOW + 1), first)
+        self.assertEqual((verifier.hits, verifier.misses), (1, 1))
+
+    def test_cached_tokens_expire(self):
+        verifier = TokenVerifier(self.signer)
+        token = self.signer.issue("akela@example.com", now=NOW)
+        verifier.verify(token, now=NOW)
+        with self.assertRaises(InvalidToken):
+            verifier.verify(token, now=NOW + 60)
+
+    def test_invalid_tokens_are_not_cached(self):
+        verifier = TokenVerifier(self.signer)
+        token = TokenSigner(b"other").issue("akela@example.com", now=NOW)
+        for _ in range(2):
+            with self.assertRaises(InvalidToken):
+                verifier.verify(token, now=NOW)
+        self.assertEqual((verifier.hits, verifier.misses), (0, 2))
+
+    def test_least_recently_used_is_evicted(self):
+        verifier = TokenVerifier(self.signer, cache_size=2)
+        first, second, third = (
+            self.signer.issue(f"{name}@example.com", now=NOW)
+            for name in ("akela", "baloo", "bagheera")
+        )
+        verifier.verify(first, now=NOW)
+        verifier.verify(second, now=NOW)
+        verifier.verify(first, now=NOW)
+        verifier.verify(third, now=NOW)
+        verifier.verify(first, now=NOW)
+        self.assertEqual((verifier.hits, verifier.misses), (2, 3))
+        verifier.verify(second, now=NOW)
+        self.assertEqual((verifier.hits, verifier.misses), (2, 4))
+
+    def test_no_cache(self):
+        verifier = TokenVerifier(self.signer, cache_size=0)
+        token = self.signer.issue("akela@example.com", now=NOW)
+        verifier.verify(token, now=NOW)
+        verifier.verify(token, now=NOW)
+        self.assertEqual((verifier.hits, verifier.misses), (0, 2))
+
+    def test_clear(self):
+        verifier = TokenVerifier(self.signer)
+        token = self.signer.issue("akela@example.com", now=NOW)
+        verifier.verify(token, now=NOW)
+        verifier.clear()
+        verifier.verify(token, now=NOW)
+        self.assertEqual(verifier.misses, 2)
+
+
+class DummyServerAuthTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(port=0, log_requests=False, auth=True)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def request(self, method, path, body=None, token=None):
+        conn = http.client.HTTPConnection("localhost", self.server.port)
+        headers = {}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            data = None if body is None else json.dumps(body).encode()
+            conn.request(method, path, data, headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def test_requests_need_a_token(self):
+        status, _ = self.request("POST", "/v1/sign-in", {"cubName": "Cub"})
+        self.assertEqual(status, 401)
+        status, _ = self.request("GET", "/v1/settings", token="not.valid")
+        self.assertEqual(status, 401)
+        # Endpoints outside AUTH_ENDPOINTS stay open
+        status, _ = self.request("GET", "/v1/names")
+        self.assertEqual(status, 200)
+
+    def test_issued_token(self):
+        token = self.server.issue_token("akela@example.com", "Akela")
+        status, _ = self.request("POST", "/v1/sign-in", {"cubName": "Cub"}, token)
+        self.assertEqual(status, 200)
+
+    def test_google_login(self):
+        status, _ = self.request("POST", "/v1/auth/google", {"accessToken": "x"})
+        self.assertEqual(status, 401)
+        login = {"accessToken": "x", "user": {"email": "akela@example.com"}}
+        status, body = self.request("POST", "/v1/auth/google", login)
+        self.assertEqual(status, 200)
+        token = json.loads(body)["token"]
+        status, _ = self.request("GET", "/v1/settings", token=token)
+        self.assertEqual(status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
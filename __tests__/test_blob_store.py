@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Unit tests for the blob store and its garbage collection."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from blob_store import BlobStore, blob_digests, load_data_urls, store_data_urls
+from dummy_web_server import DummyServer
+from request_journal import BlobRef, DataURL
+
+
+def _age(path, seconds):
+    """Make ``path`` look ``seconds`` old."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+class BlobStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = BlobStore(self.root)
+
+    def test_put_and_get(self):
+        digest = self.store.put(b"signature")
+        self.assertEqual(digest, hashlib.sha256(b"signature").hexdigest())
+        self.assertEqual(self.store.get(digest), b"signature")
+        self.assertIn(digest, self.store)
+
+    def test_sharded_path(self):
+        digest = self.store.put(b"signature")
+        self.assertEqual(
+            self.store.path(digest),
+            os.path.join(self.root, digest[:2], digest[2:4], digest),
+        )
+
+    def test_put_stores_once(self):
+        first = self.store.put(b"signature")
+        _age(self.store.path(first), 120)
+        second = self.store.put(b"signature")
+        self.assertEqual(first, second)
+        self.assertEqual(list(self.store.digests()), [first])
+        # Putting it again renews it
+        self.assertGreater(os.stat(self.store.path(first)).st_mtime, time.time() - 60)
+
+    def test_digests_skip_temporary_files(self):
+        digests = {self.store.put(b"a"), self.store.put(b"b")}
+        tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        self.assertEqual(set(self.store.digests()), digests)
+
+    def test_collect(self):
+        live = self.store.put(b"live")
+        dead = self.store.put(b"dead")
+        for digest in (live, dead):
+            _age(self.store.path(digest), 120)
+        self.assertEqual(self.store.collect({live}), (1, len(b"dead")))
+        self.assertEqual(list(self.store.digests()), [live])
+        # The dead blob's shards are removed once empty
+        self.assertFalse(os.path.exists(os.path.dirname(self.store.path(dead))))
+
+    def test_collect_keeps_young_blobs(self):
+        digest = self.store.put(b"young")
+        self.assertEqual(self.store.collect(set()), (0, 0))
+        self.assertIn(digest, self.store)
+
+    def test_collect_removes_old_temporary_files(self):
+        fd, young = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        os.close(fd)
+        fd, old = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        os.close(fd)
+        _age(old, 120)
+        self.assertEqual(self.store.collect(set()), (1, 0))
+        self.assertTrue(os.path.exists(young))
+        self.assertFalse(os.path.exists(old))
+
+    def test_put_while_collecting(self):
+        blobs = [os.urandom(32) for _ in range(200)]
+        stop = threading.Event()
+        errors = []
+
+        def collect():
+            while not stop.is_set():
+                try:
+                    self.store.collect(set(), min_age=60)
+                except Exception as e:
+                    errors.append(e)
+
+        collector = threading.Thread(target=collect)
+        collector.start()
+        try:
+            digests = [self.store.put(blob) for blob in blobs]
+        finally:
+            stop.set()
+            collector.join()
+        self.assertEqual(errors, [])
+        self.assertEqual([self.store.get(digest) for digest in digests], blobs)
+
+
+class DataURLTests(unittest.TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.store = BlobStore(root)
+
+    def test_round_trip(self):
+        data = {
+            "cubName": "Cub",
+            "cubSignature": DataURL("image/png", b"cub"),
+            "signatures": [DataURL("image/png", b"parent"), 1],
+        }
+        stored = store_data_urls(data, self.store)
+        self.assertIsInstance(stored["cubSignature"], BlobRef)
+        self.assertEqual(stored["cubSignature"].mime_type, "image/png")
+        self.assertEqual(stored["cubName"], "Cub")
+        self.assertEqual(
+            sorted(blob_digests(stored)),
+            sorted(hashlib.sha256(blob).hexdigest() for blob in (b"cub", b"parent")),
+        )
+        self.assertEqual(load_data_urls(stored, self.store), data)
+
+
+class DummyServerBlobTests(unittest.TestCase):
+    def test_without_blob_root(self):
+        server = DummyServer(port=0)
+        value = {"cubSignature": DataURL("image/png", b"cub")}
+        self.assertIs(server.load_blobs(value), value)
+        self.assertEqual(server.collect_blobs(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
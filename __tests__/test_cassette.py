@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Unit tests for cassette recording and matching."""
+
+import http.client
+import json
+import os
+import tempfile
+import unittest
+
+from cassette import Cassette, body_hash
+from dummy_web_server import DummyServer
+
+
+def _post(port, path, body):
+    conn = http.client.HTTPConnection("localhost", port)
+    try:
+        conn.request("POST", path, json.dumps(body).encode())
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+class BodyHashTests(unittest.TestCase):
+    def test_json_key_order_and_whitespace(self):
+        self.assertEqual(
+            body_hash(b'{"a": 1, "b": [1, 2]}'), body_hash(b'{"b":[1,2],"a":1}')
+        )
+
+    def test_ignored_fields(self):
+        first = b'{"cubName": "Cub", "time": "07:01:02"}'
+        second = b'{"cubName": "Cub", "time": "07:09:10"}'
+        self.assertNotEqual(body_hash(first), body_hash(second))
+        self.assertEqual(body_hash(first, {"time"}), body_hash(second, {"time"}))
+
+    def test_only_top_level_fields_are_ignored(self):
+        first = b'{"nested": {"time": "07:01:02"}}'
+        second = b'{"nested": {"time": "07:09:10"}}'
+        self.assertNotEqual(body_hash(first, {"time"}), body_hash(second, {"time"}))
+
+    def test_non_json_bodies(self):
+        self.assertEqual(body_hash(b"not json"), body_hash(b"not json"))
+        self.assertNotEqual(body_hash(b"not json"), body_hash(b"not json!"))
+
+
+class CassetteTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".cassette")
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+
+    def record(self, interactions):
+        cassette = Cassette(self.path, "record")
+        for body, response in interactions:
+            cassette.record("POST", "/v1/sign-in", body, 200, [], response)
+        cassette.close()
+        return Cassette(self.path)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Cassette(self.path, "rewind")
+
+    def test_round_trip(self):
+        cassette = self.record([(b'{"cubName": "Cub"}', b"signed in")])
+        self.assertEqual(len(cassette), 1)
+        interaction = cassette.lookup("POST", "/v1/sign-in", b'{"cubName":"Cub"}')
+        self.assertEqual(interaction.status, 200)
+        self.assertEqual(interaction.body, b"signed in")
+        self.assertIsNone(cassette.lookup("GET", "/v1/sign-in", b'{"cubName":"Cub"}'))
+        self.assertIsNone(cassette.lookup("POST", "/v1/sign-out", b'{"cubName":"Cub"}'))
+        self.assertIsNone(cassette.lookup("POST", "/v1/sign-in", b'{"cubName":"Cu"}'))
+
+    def test_ignores_date_and_time_by_default(self):
+        cassette = self.record(
+            [(b'{"cubName": "Cub", "date": "2026-02-03", "time": "07:01:02"}', b"ok")]
+        )
+        body = b'{"cubName": "Cub", "date": "2026-10-18", "time": "06:59:00"}'
+        self.assertIsNotNone(cassette.lookup("POST", "/v1/sign-in", body))
+
+    def test_repeated_requests_replay_in_order(self):
+        cassette = self.record([(b"{}", b"first"), (b"{}", b"second")])
+        bodies = [cassette.lookup("POST", "/v1/sign-in", b"{}").body for _ in range(3)]
+        self.assertEqual(bodies, [b"first", b"second", b"second"])
+
+    def test_rewind(self):
+        cassette = self.record([(b"{}", b"first"), (b"{}", b"second")])
+        cassette.lookup("POST", "/v1/sign-in", b"{}")
+        cassette.rewind()
+        self.assertEqual(cassette.lookup("POST", "/v1/sign-in", b"{}").body, b"first")
+
+    def test_reconfigure_rewinds_the_server(self):
+        self.record([(b"{}", b"first"), (b"{}", b"second")])
+        server = DummyServer(port=0, log_requests=False, cassette_path=self.path)
+        server.start()
+        try:
+            self.assertEqual(_post(server.port, "/v1/sign-in", {}), (200, b"first"))
+            server.reconfigure()
+            self.assertEqual(_post(server.port, "/v1/sign-in", {}), (200, b"first"))
+            self.assertEqual(_post(server.port, "/v1/sign-in", {}), (200, b"second"))
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Unit tests for the dummy server's request parsing and control."""
+
+import binascii
+import http.client
+import io
+import json
+import socket
+import threading
+import unittest
+
+from dummy_web_server import (
+    CONTROL_PATH,
+    DEFAULT_GET_MAPPINGS,
+    ENGINES,
+    BodyTooLarge,
+    DummyServer,
+    _accepts_gzip,
+    parse_json_body,
+    read_body,
+)
+from request_journal import DataURL
+
+
+class ParseJsonBodyTests(unittest.TestCase):
+    def test_plain_json(self):
+        body = b'{"cubName": "Cub Name", "count": 2, "tags": ["a", null]}'
+        self.assertEqual(parse_json_body(body), json.loads(body))
+
+    def test_decodes_data_urls(self):
+        body = json.dumps(
+            {
+                "cubSignature": "data:image/png;base64,QUJD",
+                "signatures": ["data:image/jpeg;base64,REVG"],
+            }
+        ).encode()
+        self.assertEqual(
+            parse_json_body(body),
+            {
+                "cubSignature": DataURL("image/png", b"ABC"),
+                "signatures": [DataURL("image/jpeg", b"DEF")],
+            },
+        )
+
+    def test_accepts_bytearray(self):
+        body = bytearray(b'{"cubSignature": "data:image/png;base64,QUJD"}')
+        self.assertEqual(
+            parse_json_body(body), {"cubSignature": DataURL("image/png", b"ABC")}
+        )
+
+    def test_leaves_data_urls_without_base64(self):
+        body = b'{"note": "data:text/plain,hello"}'
+        self.assertEqual(parse_json_body(body), {"note": "data:text/plain,hello"})
+
+    def test_escaped_quote_before_data_url(self):
+        body = json.dumps({"note": 'say "data:t;base64,QUJD'}).encode()
+        self.assertEqual(parse_json_body(body), {"note": 'say "data:t;base64,QUJD'})
+
+    def test_escaped_backslash_before_data_url(self):
+        body = json.dumps(
+            {"note": "C:\\", "cubSignature": "data:image/png;base64,QUJD"}
+        ).encode()
+        self.assertEqual(
+            parse_json_body(body),
+            {"note": "C:\\", "cubSignature": DataURL("image/png", b"ABC")},
+        )
+
+    def test_escapes_inside_data_url(self):
+        body = b'{"cubSignature": "data:image\\/png;base64,QUJD"}'
+        self.assertEqual(
+            parse_json_body(body), {"cubSignature": DataURL("image/png", b"ABC")}
+        )
+
+    def test_data_url_keys_are_left_alone(self):
+        body = b'{"data:t;base64,QUJD" : 1}'
+        self.assertEqual(parse_json_body(body), {"data:t;base64,QUJD": 1})
+
+    def test_text_like_the_placeholder(self):
+        body = json.dumps(
+            {"note": "\x00data-url:0", "cubSignature": "data:image/png;base64,QUJD"}
+        ).encode()
+        self.assertEqual(
+            parse_json_body(body),
+            {"note": "\x00data-url:0", "cubSignature": DataURL("image/png", b"ABC")},
+        )
+
+    def test_bad_base64(self):
+        with self.assertRaises(binascii.Error):
+            parse_json_body(b'{"cubSignature": "data:image/png;base64,QUJ"}')
+
+    def test_bad_json(self):
+        with self.assertRaises(ValueError):
+            parse_json_body(b'{"cubSignature": "data:image/png;base64,QUJD",}')
+
+
+class ReadBodyTests(unittest.TestCase):
+    def test_content_length(self):
+        body = read_body(io.BytesIO(b"hello, world"), {"content-length": "5"})
+        self.assertEqual(body, b"hello")
+
+    def test_chunked(self):
+        rfile = io.BytesIO(b"5\r\nhello\r\n7;ext=1\r\n, world\r\n0\r\nX-A: b\r\n\r\n")
+        body = read_body(rfile, {"transfer-encoding": "chunked"})
+        self.assertEqual(body, b"hello, world")
+
+    def test_content_length_over_limit(self):
+        rfile = io.BytesIO(b"x" * 11)
+        with self.assertRaises(BodyTooLarge):
+            read_body(rfile, {"content-length": "11"}, max_size=10)
+        # Nothing is read once the body is known to be too large
+        self.assertEqual(rfile.tell(), 0)
+
+    def test_chunked_over_limit(self):
+        rfile = io.BytesIO(b"6\r\nhello,\r\n6\r\n world\r\n0\r\n\r\n")
+        with self.assertRaises(BodyTooLarge):
+            read_body(rfile, {"transfer-encoding": "chunked"}, max_size=10)
+
+    def test_limit_is_inclusive(self):
+        body = read_body(io.BytesIO(b"x" * 10), {"content-length": "10"}, 10)
+        self.assertEqual(len(body), 10)
+
+    def test_truncated_body(self):
+        with self.assertRaises(ConnectionError):
+            read_body(io.BytesIO(b"hel"), {"content-length": "5"})
+
+
+class AcceptsGzipTests(unittest.TestCase):
+    def test_accepts_gzip(self):
+        self.assertTrue(_accepts_gzip("deflate, gzip"))
+        self.assertTrue(_accepts_gzip("gzip;q=0.5"))
+        self.assertTrue(_accepts_gzip("*"))
+
+    def test_refuses_gzip(self):
+        self.assertFalse(_accepts_gzip(None))
+        self.assertFalse(_accepts_gzip("deflate"))
+        self.assertFalse(_accepts_gzip("gzip;q=0"))
+        self.assertFalse(_accepts_gzip("gzip;q=0.0"))
+
+    def test_malformed_q_value(self):
+        self.assertFalse(_accepts_gzip("gzip;q=x"))
+        self.assertFalse(_accepts_gzip("gzip;q="))
+
+
+DEFAULT_NAMES = DEFAULT_GET_MAPPINGS["names"]
+
+
+def _request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("localhost", port, timeout=10)
+    try:
+        conn.request(method, path, body)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+class ControlTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(port=0, log_requests=False)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def get_names(self):
+        status, body = _request(self.server.port, "GET", "/v1/names")
+        return status, json.loads(body) if status == 200 else None
+
+    def test_reconfigure(self):
+        self.server.reconfigure({"GET": {"names": {"names": ["Akela"]}}})
+        self.assertEqual(self.get_names(), (200, {"names": ["Akela"]}))
+        self.server.reconfigure(force_action="FAIL")
+        self.assertEqual(self.get_names(), (500, None))
+        self.server.reconfigure()
+        self.assertEqual(self.get_names()[0], 200)
+
+    def test_swap_is_atomic(self):
+        old = ({"GET": {"names": {"names": ["old"]}}}, None)
+        new = ({"GET": {"names": {"names": ["new"]}}}, "FAIL")
+        seen = []
+        stop = threading.Event()
+
+        def poll():
+            while not stop.is_set():
+                seen.append(self.get_names())
+
+        poller = threading.Thread(target=poll)
+        poller.start()
+        try:
+            for _ in range(20):
+                for response_mappings, force_action in (new, old):
+                    self.server.reconfigure(response_mappings, force_action)
+        finally:
+            stop.set()
+            poller.join()
+        # Never the new names without the forced failure, or vice versa
+        allowed = [(200, DEFAULT_NAMES), (200, {"names": ["old"]}), (500, None)]
+        self.assertTrue(seen)
+        for response in seen:
+            self.assertIn(response, allowed)
+
+    def test_clears_the_log(self):
+        _request(self.server.port, "POST", "/v1/sign-in", b'{"cubName": "A"}')
+        self.server.wait_for_request("sign-in")
+        self.server.reconfigure()
+        self.assertEqual(self.server.captured, [])
+        # Control requests are never captured
+        _request(self.server.port, "POST", "/v1/sign-in", b'{"cubName": "B"}')
+        request = self.server.wait_for_request("sign-in")
+        self.assertEqual((request.seq, request.data), (0, {"cubName": "B"}))
+
+    def test_malformed_bodies(self):
+        for body in (
+            b"not json",
+            b"[]",
+            b"{}",
+            b'{"generation": "1"}',
+            b'{"generation": true}',
+            b'{"generation": 1, "response_mappings": []}',
+            b'{"generation": 1, "fault_profiles": {"sign-in": {}}}',
+        ):
+            with self.subTest(body=body):
+                status, _ = _request(self.server.port, "POST", CONTROL_PATH, body)
+                self.assertEqual(status, 400)
+        # The configuration is left as it was
+        self.assertEqual(self.get_names(), (200, DEFAULT_NAMES))
+
+    def test_restart_after_reconfigure(self):
+        self.server.reconfigure()
+        self.server.stop()
+        self.server.start()
+        _request(self.server.port, "POST", "/v1/sign-in", b'{"cubName": "A"}')
+        request = self.server.wait_for_request("sign-in", timeout=5)
+        self.assertEqual(request.data, {"cubName": "A"})
+
+
+class StartTests(unittest.TestCase):
+    def test_binds_a_free_port(self):
+        server = DummyServer(port=0, log_requests=False)
+        server.start()
+        self.addCleanup(server.stop)
+        self.assertNotEqual(server.port, 0)
+        # Accepting as soon as start returns, without retrying
+        socket.create_connection(("localhost", server.port), timeout=1).close()
+        self.assertEqual(_request(server.port, "GET", "/v1/names")[0], 200)
+
+    def test_bind_errors_are_raised(self):
+        taken = socket.socket()
+        self.addCleanup(taken.close)
+        taken.bind(("", 0))
+        taken.listen(1)
+        server = DummyServer(port=taken.getsockname()[1], log_requests=False)
+        with self.assertRaises(OSError):
+            server.start(timeout=5)
+        self.assertFalse(server.server_proc.is_alive())
+
+    def test_errors_in_the_server_process_are_raised(self):
+        server = DummyServer(port=0, cassette_path="/nonexistent/cassette")
+        with self.assertRaises(OSError):
+            server.start(timeout=5)
+
+    def test_restart_on_the_same_port(self):
+        for engine in sorted(ENGINES):
+            with self.subTest(engine=engine):
+                server = DummyServer(port=0, engine=engine, log_requests=False)
+                server.start()
+                port = server.port
+                for _ in range(3):
+                    # Leaves connections in TIME_WAIT on the server's side
+                    self.assertEqual(_request(port, "GET", "/v1/names")[0], 200)
+                    server.stop()
+                    server = DummyServer(port=port, engine=engine, log_requests=False)
+                    server.start()
+                    self.assertEqual(server.port, port)
+                server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
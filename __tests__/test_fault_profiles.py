@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Unit tests for fault profiles."""
+
+import http.client
+import json
+import random
+import time
+import unittest
+
+from dummy_web_server import DummyServer
+from fault_profiles import FaultProfile, FaultProfiles
+
+
+class FaultProfileTests(unittest.TestCase):
+    def test_invalid_profiles(self):
+        for spec in (
+            {"latncy": {"distribution": "fixed", "seconds": 1}},
+            {"latency": {"distribution": "normal", "mean": 1}},
+            {"latency": {"distribution": "uniform", "low": 1}},
+            {"latency": {"distribution": "fixed", "seconds": -1}},
+            {"latency": {"distribution": "uniform", "low": 0.5, "high": 0.1}},
+            {"latency": {"distribution": "uniform", "low": -0.1, "high": 0.1}},
+            {"latency": {"distribution": "lognormal", "median": 0, "sigma": 0.6}},
+            {"latency": {"distribution": "lognormal", "median": -1, "sigma": 0.6}},
+            {"latency": {"distribution": "lognormal", "median": 0.8, "sigma": -1}},
+            {"latency": {"distribution": "fixed", "seconds": 1, "max": -1}},
+            {"bandwidth": 0},
+            {"bandwidth": -64000},
+            {"errors": {"503": 0.6, "500": 0.5}},
+            {"errors": {"503": -0.5, "500": 1.2}},
+            {"errors": {"503": 1.5}},
+            {"errors": {"200": 0.1}},
+            {"errors": {"unavailable": 0.1}},
+        ):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                FaultProfile(spec)
+
+    def test_no_faults(self):
+        profile = FaultProfile({})
+        rng = random.Random(0)
+        self.assertEqual(profile.sample_latency(rng), 0.0)
+        self.assertIsNone(profile.sample_error(rng))
+
+    def test_fixed_latency(self):
+        profile = FaultProfile({"latency": {"distribution": "fixed", "seconds": 0.5}})
+        self.assertEqual(profile.sample_latency(random.Random(0)), 0.5)
+
+    def test_uniform_latency(self):
+        profile = FaultProfile(
+            {"latency": {"distribution": "uniform", "low": 0.1, "high": 0.2}}
+        )
+        rng = random.Random(0)
+        for _ in range(100):
+            self.assertTrue(0.1 <= profile.sample_latency(rng) <= 0.2)
+
+    def test_lognormal_latency(self):
+        profile = FaultProfile(
+            {"latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6}}
+        )
+        rng = random.Random(0)
+        samples = sorted(profile.sample_latency(rng) for _ in range(2001))
+        self.assertAlmostEqual(samples[1000], 0.8, delta=0.1)
+
+    def test_latency_cap(self):
+        profile = FaultProfile(
+            {
+                "latency": {
+                    "distribution": "lognormal",
+                    "median": 1,
+                    "sigma": 2,
+                    "max": 1.5,
+                }
+            }
+        )
+        rng = random.Random(0)
+        self.assertEqual(max(profile.sample_latency(rng) for _ in range(100)), 1.5)
+
+    def test_error_rates(self):
+        profile = FaultProfile({"errors": {"503": 0.25, "500": 0.05}})
+        rng = random.Random(0)
+        errors = [profile.sample_error(rng) for _ in range(10000)]
+        self.assertAlmostEqual(errors.count(503) / len(errors), 0.25, delta=0.02)
+        self.assertAlmostEqual(errors.count(500) / len(errors), 0.05, delta=0.01)
+        self.assertEqual(set(errors), {None, 500, 503})
+
+    def test_seeded_samples_repeat(self):
+        profile = FaultProfile({"errors": {"503": 0.5}})
+        first = [profile.sample_error(random.Random(7)) for _ in range(20)]
+        second = [profile.sample_error(random.Random(7)) for _ in range(20)]
+        self.assertEqual(first, second)
+
+
+class FaultProfilesTests(unittest.TestCase):
+    def test_bad_key(self):
+        with self.assertRaises(ValueError):
+            FaultProfiles({"sign-in": {}})
+
+    def test_most_specific_profile_wins(self):
+        profiles = FaultProfiles(
+            {
+                "post sign-in": {"bandwidth": 1},
+                "* sign-in": {"bandwidth": 2},
+                "POST *": {"bandwidth": 3},
+                "* *": {"bandwidth": 4},
+            }
+        )
+        self.assertEqual(profiles.lookup("POST", "sign-in").bandwidth, 1)
+        self.assertEqual(profiles.lookup("GET", "sign-in").bandwidth, 2)
+        self.assertEqual(profiles.lookup("POST", "sign-out").bandwidth, 3)
+        self.assertEqual(profiles.lookup("GET", "names").bandwidth, 4)
+
+    def test_no_profile(self):
+        profiles = FaultProfiles({"POST sign-in": {}})
+        self.assertIsNone(profiles.lookup("GET", "sign-in"))
+        self.assertIsNone(FaultProfiles().lookup("POST", "sign-in"))
+
+
+class DummyServerFaultTests(unittest.TestCase):
+    def test_invalid_profiles_fail_early(self):
+        with self.assertRaises(ValueError):
+            DummyServer(port=0, fault_profiles={"POST sign-in": {"bandwidth": -1}})
+
+    def test_injected_faults(self):
+        server = DummyServer(
+            port=0,
+            log_requests=False,
+            fault_profiles={
+                "POST sign-in": {
+                    "latency": {"distribution": "fixed", "seconds": 0.2},
+                    "errors": {"503": 1},
+                }
+            },
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        conn = http.client.HTTPConnection("localhost", server.port)
+        self.addCleanup(conn.close)
+        start = time.monotonic()
+        conn.request("POST", "/v1/sign-in", json.dumps({}).encode())
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 503)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
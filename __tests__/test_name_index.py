@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Unit tests for the autocomplete name index."""
+
+import http.client
+import json
+import random
+import unittest
+
+from dummy_web_server import DummyServer
+from name_index import NameIndex
+
+NAMES = [
+    "Billie Smith",
+    "Sam Smithers",
+    "Alex Jordan Smith",
+    "Smita Patel",
+    "Jordan Lee",
+    "jordan  alexander",
+]
+
+
+def _brute_force(names, prefix, limit):
+    """Rank ``names`` the way ``NameIndex.search`` documents, the slow way."""
+    prefix = " ".join(prefix.casefold().split())
+    ranked = []
+    for name in set(names):
+        key = " ".join(name.casefold().split())
+        words = key.split(" ")
+        positions = [
+            position
+            for position in range(len(words))
+            if " ".join(words[position:]).startswith(prefix)
+        ]
+        if positions:
+            ranked.append((positions[0], key, name))
+    return [name for _, _, name in sorted(ranked)[:limit]]
+
+
+class NameIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = NameIndex(NAMES)
+
+    def test_len(self):
+        self.assertEqual(len(self.index), len(NAMES))
+        self.assertEqual(len(NameIndex(NAMES + ["Billie Smith"])), len(NAMES))
+
+    def test_names_starting_with_the_prefix_rank_first(self):
+        self.assertEqual(
+            self.index.search("smi"),
+            ["Smita Patel", "Billie Smith", "Sam Smithers", "Alex Jordan Smith"],
+        )
+
+    def test_case_and_whitespace_are_ignored(self):
+        self.assertEqual(self.index.search("  JORDAN   a"), ["jordan  alexander"])
+        self.assertEqual(self.index.search("jordan s"), ["Alex Jordan Smith"])
+
+    def test_earliest_matching_word_ranks_first(self):
+        self.assertEqual(
+            self.index.search("jordan"),
+            ["jordan  alexander", "Jordan Lee", "Alex Jordan Smith"],
+        )
+
+    def test_limit(self):
+        self.assertEqual(self.index.search("smi", limit=1), ["Smita Patel"])
+        self.assertEqual(self.index.search("smi", limit=0), [])
+        with self.assertRaises(ValueError):
+            self.index.search("smi", limit=-1)
+
+    def test_no_matches(self):
+        self.assertEqual(self.index.search("zed"), [])
+        self.assertEqual(NameIndex([]).search("a"), [])
+
+    def test_empty_prefix(self):
+        self.assertEqual(
+            self.index.search("", limit=2), ["Alex Jordan Smith", "Billie Smith"]
+        )
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+
+        def word():
+            return "".join(rng.choice("abc") for _ in range(rng.randint(1, 3)))
+
+        names = [" ".join(word() for _ in range(rng.randint(1, 3))) for _ in range(300)]
+        index = NameIndex(names)
+        for prefix in ["", "a", "ab", "b c", "cc", "abc", "a b", "x"]:
+            for limit in (1, 5, 50, 500):
+                with self.subTest(prefix=prefix, limit=limit):
+                    self.assertEqual(
+                        index.search(prefix, limit), _brute_force(names, prefix, limit)
+                    )
+
+
+class DummyServerNamesTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(
+            {"GET": {"names": {"names": NAMES}}}, port=0, log_requests=False
+        )
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def get(self, path):
+        conn = http.client.HTTPConnection("localhost", self.server.port)
+        try:
+            conn.request("GET", path)
+            return json.loads(conn.getresponse().read())
+        finally:
+            conn.close()
+
+    def test_prefix_search(self):
+        self.assertEqual(
+            self.get("/v1/names?prefix=jordan&limit=2"),
+            {"names": ["jordan  alexander", "Jordan Lee"]},
+        )
+
+    def test_without_prefix_sends_every_name(self):
+        self.assertEqual(self.get("/v1/names"), {"names": NAMES})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Unit tests for the integration tests' phase timings."""
+
+import io
+import unittest
+
+from phase_timings import (
+    PhaseTimer,
+    RoundTrips,
+    compare_round_trips,
+    print_round_trips,
+)
+
+
+def timings(commands):
+    """Return a report of ``commands`` (test to command times) sent to
+    the driver ``"chrome"``.
+
+    """
+    timer = PhaseTimer()
+    for test, seconds in commands.items():
+        for duration in seconds:
+            timer.record("webdriver_command", duration, "chrome", test)
+    return timer.report()
+
+
+class RoundTripTests(unittest.TestCase):
+    def test_compare_round_trips(self):
+        baseline = timings(
+            {"sign_in": [0.1] * 12, "title": [0.1] * 2, "removed": [0.1]}
+        )
+        report = timings({"sign_in": [0.1] * 4, "title": [0.2] * 2, "new": [0.1]})
+        (change,) = compare_round_trips(report, baseline)
+        self.assertEqual(change[:4], ("sign_in", "chrome", 12, 4))
+        self.assertAlmostEqual(change.baseline_total, 1.2)
+        self.assertAlmostEqual(change.total, 0.4)
+
+    def test_print_round_trips(self):
+        out = io.StringIO()
+        print_round_trips(
+            [
+                RoundTrips("sign_in", "chrome", 12, 4, 1.2, 0.4),
+                RoundTrips("sign_out", "chrome", 9, 4, 0.9, 0.4),
+            ],
+            file=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertIn(
+            "  sign_in [chrome]: 12 -> 4 round trips, 1200 ms -> 400 ms", lines
+        )
+        self.assertEqual(lines[-1], "Saved 1300 ms in WebDriver round trips")
+
+
+if __name__ == "__main__":
+    unittest.main()
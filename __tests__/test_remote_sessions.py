@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Unit tests for starting remote sessions, against a fake WebDriver."""
+
+import http.client
+import json
+import threading
+import time
+import unittest
+
+from fake_webdriver import FakeWebDriver
+from integrationTests import start_sessions
+
+
+class _Session:
+    """Just enough of a remote WebDriver to start and quit a session."""
+
+    def __init__(self, port, capabilities):
+        self.port = port
+        status, value = self._request(
+            "POST", "/wd/hub/session", {"desiredCapabilities": capabilities}
+        )
+        if status != 200:
+            raise RuntimeError(value["message"])
+        self.session_id = value["sessionId"]
+
+    def _request(self, method, path, body=None):
+        conn = http.client.HTTPConnection("localhost", self.port, timeout=10)
+        try:
+            data = None if body is None else json.dumps(body).encode()
+            conn.request(method, path, data)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())["value"]
+        finally:
+            conn.close()
+
+    def quit(self):
+        self._request("DELETE", f"/wd/hub/session/{self.session_id}")
+
+
+class StartSessionsTests(unittest.TestCase):
+    def start_fake(self, **kwargs):
+        fake = FakeWebDriver(**kwargs)
+        fake.start()
+        self.addCleanup(fake.stop)
+        return fake
+
+    def builder(self, fake):
+        """Return a ``build`` for ``start_sessions`` that records how many
+        sessions were being created at once.
+
+        """
+        lock = threading.Lock()
+        building = [0]
+        self.most_at_once = 0
+
+        def build(capabilities):
+            with lock:
+                building[0] += 1
+                self.most_at_once = max(self.most_at_once, building[0])
+            try:
+                return _Session(fake.port, capabilities)
+            finally:
+                with lock:
+                    building[0] -= 1
+
+        return build
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out")
+            time.sleep(0.01)
+
+    def test_sessions_start_concurrently_within_the_pool(self):
+        fake = self.start_fake(delay=0.3)
+        capabilities = [{"device": f"iPad {index}"} for index in range(6)]
+        start = time.monotonic()
+        drivers, failures = start_sessions(self.builder(fake), capabilities, 3, 10)
+        elapsed = time.monotonic() - start
+        self.assertEqual(failures, [])
+        self.assertEqual(len(drivers), 6)
+        self.assertEqual(
+            sorted(driver.session_id for driver in drivers), sorted(fake.created)
+        )
+        self.assertEqual(self.most_at_once, 3)
+        # Two rounds of three, rather than six one after another
+        self.assertLess(elapsed, 1.2)
+
+    def test_timeout(self):
+        fake = self.start_fake(slow={"iPad slow": 1})
+        capabilities = [{"device": "iPad fast"}, {"device": "iPad slow"}]
+        start = time.monotonic()
+        drivers, failures = start_sessions(self.builder(fake), capabilities, 2, 0.3)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(len(drivers), 1)
+        ((caps, error),) = failures
+        self.assertEqual(caps, {"device": "iPad slow"})
+        self.assertIsInstance(error, TimeoutError)
+        # The slow session is quit once it does start
+        self.wait_for(lambda: len(fake.created) == 2)
+        self.wait_for(lambda: fake.deleted == fake.created[1:])
+        self.assertTrue(fake.is_live(drivers[0].session_id))
+
+    def test_partial_failure(self):
+        fake = self.start_fake(fail={"iPad broken"})
+        capabilities = [
+            {"device": "iPad 1"},
+            {"device": "iPad broken"},
+            {"device": "iPad 2"},
+        ]
+        drivers, failures = start_sessions(self.builder(fake), capabilities, 2, 10)
+        self.assertEqual(len(drivers), 2)
+        self.assertEqual(len(fake.created), 2)
+        ((caps, error),) = failures
+        self.assertEqual(caps, {"device": "iPad broken"})
+        self.assertIn("refused", str(error))
+
+    def test_every_session_fails(self):
+        fake = self.start_fake(fail={"iPad broken"})
+        capabilities = [{"device": "iPad broken"}] * 2
+        drivers, failures = start_sessions(self.builder(fake), capabilities, 2, 10)
+        self.assertEqual(drivers, [])
+        self.assertEqual(len(failures), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
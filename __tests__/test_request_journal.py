@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Unit tests for the request journal and the dummy server's capture API."""
+
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from dummy_web_server import DummyServer
+from request_journal import BlobRef, DataURL, JournalReader, JournalWriter
+
+
+def _post(port, path, body):
+    conn = http.client.HTTPConnection("localhost", port)
+    try:
+        conn.request("POST", path, json.dumps(body).encode())
+        conn.getresponse().read()
+    finally:
+        conn.close()
+
+
+class JournalTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".journal")
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+        self.writer = JournalWriter(self.path, capacity=4096)
+        self.addCleanup(self.writer.close)
+
+    def reader(self, generation=0):
+        reader = JournalReader(self.path, generation)
+        self.addCleanup(reader.close)
+        return reader
+
+    def append(self, method, endpoint, data=None, generation=0):
+        self.writer.append(
+            generation, method, endpoint, f"/v1/{endpoint}", {}, data, 1.5
+        )
+
+    def test_round_trip(self):
+        data = {
+            "cubName": "Cub",
+            "cubSignature": DataURL("image/png", b"\x89PNG"),
+            "signatures": [BlobRef("image/png", "ab" * 32), None],
+        }
+        self.writer.append(0, "POST", "sign-in", "/v1/sign-in", {"A": "b"}, data, 1.5)
+        reader = self.reader()
+        self.assertEqual(reader.refresh(), 1)
+        request = reader.get(0)
+        self.assertEqual(
+            request,
+            (0, "POST", "sign-in", "/v1/sign-in", {"A": "b"}, data, 1.5),
+        )
+
+    def test_not_a_journal(self):
+        with open(self.path, "r+b") as f:
+            f.write(b"nope")
+        with self.assertRaises(ValueError):
+            JournalReader(self.path)
+
+    def test_refresh_only_indexes_new_records(self):
+        reader = self.reader()
+        self.assertEqual(reader.refresh(), 0)
+        self.append("POST", "sign-in")
+        self.assertEqual(reader.refresh(), 1)
+        self.append("GET", "names")
+        self.append("POST", "sign-out")
+        self.assertEqual(reader.refresh(), 2)
+        self.assertEqual(len(reader), 3)
+
+    def test_grows_past_capacity(self):
+        reader = self.reader()
+        blob = DataURL("image/png", os.urandom(3000))
+        for _ in range(5):
+            self.append("POST", "sign-in", {"cubSignature": blob})
+        self.assertEqual(reader.refresh(), 5)
+        self.assertEqual(reader.get(4).data, {"cubSignature": blob})
+
+    def test_generations(self):
+        self.append("POST", "sign-in", generation=0)
+        self.append("POST", "sign-in", generation=1)
+        self.append("POST", "sign-out", generation=1)
+        self.assertEqual(self.reader(0).refresh(), 1)
+        self.assertEqual(self.reader(1).refresh(), 2)
+        self.assertEqual(self.reader(None).refresh(), 3)
+
+    def test_reset(self):
+        reader = self.reader()
+        self.append("POST", "sign-in")
+        reader.refresh()
+        reader.reset(1)
+        self.assertEqual(len(reader), 0)
+        self.append("POST", "sign-in", generation=0)
+        self.append("POST", "sign-out", generation=1)
+        self.assertEqual(reader.refresh(), 1)
+        self.assertEqual(reader.get(0)[:3], (0, "POST", "sign-out"))
+
+    def test_seqs(self):
+        self.append("POST", "sign-in")
+        self.append("GET", "names")
+        self.append("GET", "sign-in")
+        self.append("POST", "sign-in")
+        reader = self.reader()
+        reader.refresh()
+        self.assertEqual(reader.seqs(), [0, 1, 2, 3])
+        self.assertEqual(reader.seqs(endpoint="sign-in"), [0, 2, 3])
+        self.assertEqual(reader.seqs(method="GET"), [1, 2])
+        self.assertEqual(reader.seqs("sign-in", "POST"), [0, 3])
+        self.assertEqual(reader.seqs("sign-in", after=0), [2, 3])
+        self.assertEqual(reader.seqs(after=3), [])
+        self.assertEqual(reader.seqs(endpoint="sign-out"), [])
+
+    def test_tail(self):
+        self.append("POST", "sign-in")
+        self.append("POST", "sign-out")
+        reader = self.reader()
+        endpoints = [request.endpoint for request in reader.tail()]
+        self.assertEqual(endpoints, ["sign-in", "sign-out"])
+
+
+class CaptureTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(port=0, log_requests=False)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def post(self, endpoint, body):
+        _post(self.server.port, f"/v1/{endpoint}", body)
+
+    def test_requests(self):
+        self.post("sign-in", {"cubName": "A"})
+        self.post("sign-out", {"cubName": "A"})
+        self.post("sign-in", {"cubName": "B"})
+        self.server.wait_for_request(predicate=lambda request: request.seq == 2)
+        self.assertEqual(
+            [request.data for request in self.server.requests("sign-in")],
+            [{"cubName": "A"}, {"cubName": "B"}],
+        )
+        self.assertEqual(len(self.server.requests(method="GET")), 0)
+        self.assertEqual(
+            [request.seq for request in self.server.requests(after=0)], [1, 2]
+        )
+        names = self.server.requests(predicate=lambda r: r.data["cubName"] == "B")
+        self.assertEqual([request.seq for request in names], [2])
+        self.assertEqual(self.server.last_request_data, {"cubName": "B"})
+
+    def test_wait_for_request_blocks_until_it_arrives(self):
+        timer = threading.Timer(0.2, self.post, ("sign-in", {"cubName": "A"}))
+        timer.start()
+        self.addCleanup(timer.join)
+        request = self.server.wait_for_request("sign-in", "POST", timeout=5)
+        self.assertEqual(request.data, {"cubName": "A"})
+
+    def test_wait_for_request_after(self):
+        self.post("sign-in", {"cubName": "A"})
+        first = self.server.wait_for_request("sign-in")
+        self.post("sign-in", {"cubName": "B"})
+        second = self.server.wait_for_request("sign-in", after=first.seq)
+        self.assertEqual(second.data, {"cubName": "B"})
+
+    def test_wait_for_request_times_out(self):
+        self.post("sign-in", {"cubName": "A"})
+        with self.assertRaises(TimeoutError):
+            self.server.wait_for_request("sign-out", timeout=0.1)
+        with self.assertRaises(TimeoutError):
+            self.server.wait_for_request(
+                predicate=lambda request: request.data["cubName"] == "B", timeout=0.1
+            )
+
+    def test_reconfigure_clears_the_log(self):
+        self.post("sign-in", {"cubName": "A"})
+        self.server.wait_for_request("sign-in")
+        self.server.reconfigure()
+        self.assertEqual(self.server.captured, [])
+        self.post("sign-in", {"cubName": "B"})
+        request = self.server.wait_for_request("sign-in")
+        self.assertEqual((request.seq, request.data), (0, {"cubName": "B"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Unit tests that the dummy server behaves the same on every engine."""
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from dummy_web_server import (
+    DEFAULT_PREFLIGHT_MAX_AGE,
+    AsyncioHTTPServer,
+    DummyServer,
+    make_dummy_handler,
+)
+from request_journal import JournalWriter
+
+NAMES = {"names": ["Akela", "Baloo"]}
+
+
+class _EngineTests:
+    """Handler checks run against the engine named by ``ENGINE``."""
+
+    ENGINE = None
+
+    def start_server(self, **kwargs):
+        kwargs.setdefault("response_mappings", {"GET": {"names": NAMES}})
+        server = DummyServer(port=0, engine=self.ENGINE, log_requests=False, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def connect(self, server):
+        conn = http.client.HTTPConnection("localhost", server.port, timeout=10)
+        self.addCleanup(conn.close)
+        return conn
+
+    def request(self, server, method, path, body=None, headers={}):
+        conn = self.connect(server)
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    def test_response_mappings(self):
+        server = self.start_server()
+        response, body = self.request(server, "GET", "/v1/names")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body), NAMES)
+        response, body = self.request(server, "GET", "/v1/unknown")
+        self.assertEqual(json.loads(body), None)
+
+    def test_force_fail(self):
+        server = self.start_server(force_action="FAIL")
+        response, _ = self.request(server, "GET", "/v1/names")
+        self.assertEqual(response.status, 500)
+        response, _ = self.request(server, "POST", "/v1/sign-in", b"{}")
+        self.assertEqual(response.status, 500)
+
+    def test_cors_headers(self):
+        server = self.start_server()
+        for method in ("GET", "OPTIONS"):
+            with self.subTest(method=method):
+                response, _ = self.request(server, method, "/v1/names")
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.getheader("Access-Control-Allow-Origin"), "*")
+                self.assertIn(
+                    "Authorization",
+                    response.getheader("Access-Control-Allow-Headers"),
+                )
+
+    def test_keep_alive(self):
+        server = self.start_server(keep_alive=True)
+        conn = self.connect(server)
+        for _ in range(2):
+            conn.request("GET", "/v1/names")
+            response = conn.getresponse()
+            self.assertEqual(json.loads(response.read()), NAMES)
+            sock = conn.sock
+        conn.request("POST", "/v1/sign-in", b'{"cubName": "Akela"}')
+        conn.getresponse().read()
+        self.assertIs(conn.sock, sock)
+
+    def test_chunked_body(self):
+        server = self.start_server()
+        conn = self.connect(server)
+        conn.request(
+            "POST",
+            "/v1/sign-in",
+            iter([b'{"cubName": ', b'"Akela"}']),
+            {"Transfer-Encoding": "chunked"},
+            encode_chunked=True,
+        )
+        self.assertEqual(conn.getresponse().status, 200)
+        request = server.wait_for_request("sign-in")
+        self.assertEqual(request.data, {"cubName": "Akela"})
+
+    def test_body_too_large(self):
+        server = self.start_server(max_body_size=10)
+        response, _ = self.request(server, "POST", "/v1/sign-in", b"x" * 11)
+        self.assertEqual(response.status, 413)
+        self.assertEqual(server.captured, [])
+
+    def test_keep_alive_framing(self):
+        server = self.start_server(keep_alive=True)
+        sock = socket.create_connection(("localhost", server.port), timeout=10)
+        self.addCleanup(sock.close)
+        reader = sock.makefile("rb")
+        self.addCleanup(reader.close)
+        body = b'{"cubName": "Akela"}'
+        # Both requests in one write, so the second is only read
+        # correctly if the first's body was read exactly
+        sock.sendall(
+            b"POST /v1/sign-in HTTP/1.1\r\nHost: x\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+            + b"GET /v1/names HTTP/1.1\r\nHost: x\r\n\r\n"
+        )
+        for expected in (None, NAMES):
+            status, headers = _read_head(reader)
+            self.assertEqual(status, 200)
+            self.assertNotEqual(headers.get("connection"), "close")
+            content = reader.read(int(headers["content-length"]))
+            if expected is not None:
+                self.assertEqual(json.loads(content), expected)
+        self.assertEqual(server.wait_for_request("sign-in").data, {"cubName": "Akela"})
+
+    def test_body_too_large_closes_the_connection(self):
+        server = self.start_server(keep_alive=True, max_body_size=10)
+        response, _ = self.request(server, "POST", "/v1/sign-in", b"x" * 11)
+        self.assertEqual(response.status, 413)
+        self.assertEqual(response.getheader("Connection"), "close")
+
+    def test_preflight_max_age(self):
+        for max_age, expected in ((None, None), (0, "0"), (123, "123")):
+            with self.subTest(max_age=max_age):
+                server = self.start_server(preflight_max_age=max_age)
+                response, _ = self.request(server, "OPTIONS", "/v1/sign-in")
+                self.assertEqual(response.getheader("Access-Control-Max-Age"), expected)
+        server = self.start_server()
+        response, _ = self.request(server, "OPTIONS", "/v1/sign-in")
+        self.assertEqual(
+            response.getheader("Access-Control-Max-Age"),
+            str(DEFAULT_PREFLIGHT_MAX_AGE),
+        )
+
+
+def _read_head(reader):
+    """Read a response's status line and headers off a raw connection."""
+    status = int(reader.readline().split()[1])
+    headers = {}
+    for line in iter(reader.readline, b"\r\n"):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+class SimpleEngineTests(_EngineTests, unittest.TestCase):
+    ENGINE = "simple"
+
+
+class AsyncioEngineTests(_EngineTests, unittest.TestCase):
+    ENGINE = "asyncio"
+
+    def test_stalled_client_does_not_block(self):
+        server = self.start_server()
+        stalled = socket.create_connection(("localhost", server.port))
+        self.addCleanup(stalled.close)
+        stalled.sendall(b"POST /v1/sign-in HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+        start = time.monotonic()
+        response, body = self.request(server, "GET", "/v1/names")
+        self.assertEqual(json.loads(body), NAMES)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_shutdown_finishes_open_connections(self):
+        fd, path = tempfile.mkstemp(suffix=".journal")
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        journal = JournalWriter(path)
+        self.addCleanup(journal.close)
+        handler = make_dummy_handler({}, None, journal, log_requests=False)
+        httpd = AsyncioHTTPServer(("", 0), handler)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        idle = socket.create_connection(("localhost", httpd.server_address[1]))
+        self.addCleanup(idle.close)
+        idle.sendall(b"POST /v1/sign-in HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+        time.sleep(0.1)
+        httpd.shutdown()
+        thread.join()
+        pending = [task for task in asyncio.all_tasks(httpd._loop) if not task.done()]
+        httpd.server_close()
+        self.assertEqual(pending, [])
+        # The connection was closed rather than abandoned
+        self.assertEqual(idle.recv(1), b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Unit tests for the dummy server's request metrics."""
+
+import http.client
+import os
+import shutil
+import tempfile
+import unittest
+
+from dummy_web_server import DummyServer
+from server_metrics import LATENCY_BUCKETS, Metrics
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.observe("POST", "sign-in", 200, 100, 20, 0.003)
+        self.metrics.observe("POST", "sign-in", 200, 50, 20, 0.2)
+        self.metrics.observe("POST", "sign-in", 503, 10, 5, 20)
+        self.metrics.observe("GET", "names", 200, 0, 40, 0.001)
+
+    def test_snapshot(self):
+        get, post = self.metrics.snapshot()["requests"]
+        self.assertEqual((get["method"], get["endpoint"]), ("GET", "names"))
+        self.assertEqual(post["statuses"], {"200": 2, "503": 1})
+        self.assertEqual((post["bytes_in"], post["bytes_out"]), (160, 45))
+        latency = post["latency"]
+        self.assertEqual(latency["count"], 3)
+        self.assertAlmostEqual(latency["sum"], 20.203)
+        buckets = dict(latency["buckets"])
+        self.assertEqual(len(buckets), len(LATENCY_BUCKETS) + 1)
+        self.assertEqual(
+            (buckets[0.0025], buckets[0.005], buckets[0.25], buckets[10.0]),
+            (0, 1, 2, 2),
+        )
+        self.assertEqual(buckets[None], 3)
+        # Bounds are inclusive, as in Prometheus
+        self.assertEqual(dict(get["latency"]["buckets"])[0.001], 1)
+
+    def test_prometheus(self):
+        lines = self.metrics.to_prometheus().splitlines()
+        labels = 'method="POST",endpoint="sign-in"'
+        name = "dummy_server_request_duration_seconds"
+        for line in (
+            "# HELP dummy_server_requests_total Requests served.",
+            "# TYPE dummy_server_requests_total counter",
+            f'dummy_server_requests_total{{{labels},status="200"}} 2',
+            f'dummy_server_requests_total{{{labels},status="503"}} 1',
+            "# TYPE dummy_server_request_bytes_total counter",
+            f"dummy_server_request_bytes_total{{{labels}}} 160",
+            f"dummy_server_response_bytes_total{{{labels}}} 45",
+            f"# HELP {name} Time spent handling requests.",
+            f"# TYPE {name} histogram",
+            f'{name}_bucket{{{labels},le="0.005"}} 1',
+            f'{name}_bucket{{{labels},le="10.0"}} 2',
+            f'{name}_bucket{{{labels},le="+Inf"}} 3',
+            f"{name}_count{{{labels}}} 3",
+        ):
+            self.assertIn(line, lines)
+        (total,) = [line for line in lines if line.startswith(f"{name}_sum{{{labels}")]
+        self.assertAlmostEqual(float(total.split()[-1]), 20.203)
+        # Buckets are cumulative
+        counts = [
+            int(line.split()[-1])
+            for line in lines
+            if line.startswith(f"{name}_bucket{{{labels}")
+        ]
+        self.assertEqual(counts, sorted(counts))
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.observe("GET", 'a"b\\c', 200, 0, 0, 0)
+        self.assertIn('endpoint="a\\"b\\\\c"', metrics.to_prometheus())
+
+
+class DummyServerMetricsTests(unittest.TestCase):
+    def start_server(self, **kwargs):
+        server = DummyServer(port=0, log_requests=False, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def request(self, server, method, path, body=None):
+        conn = http.client.HTTPConnection("localhost", server.port, timeout=10)
+        try:
+            conn.request(method, path, body)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def series(self, server):
+        return {
+            (series["method"], series["endpoint"]): series
+            for series in server.metrics()["requests"]
+        }
+
+    def test_counts_and_bytes(self):
+        server = self.start_server()
+        body = b'{"cubName": "Akela"}'
+        for _ in range(2):
+            self.request(server, "POST", "/v1/sign-in", body)
+        _, names = self.request(server, "GET", "/v1/names")
+        self.request(server, "GET", "/__sheets")
+        series = self.series(server)
+        self.assertEqual(set(series), {("POST", "sign-in"), ("GET", "names")})
+        sign_in = series["POST", "sign-in"]
+        self.assertEqual(sign_in["statuses"], {"200": 2})
+        self.assertEqual(sign_in["bytes_in"], 2 * len(body))
+        self.assertEqual(sign_in["latency"]["count"], 2)
+        get = series["GET", "names"]
+        self.assertEqual(get["bytes_in"], 0)
+        # The status line and headers count too
+        self.assertGreater(get["bytes_out"], len(names))
+
+    def test_static_files_are_one_endpoint(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, "static", "js"))
+        for name in ("index.html", "static/js/main.1a2b3c4d.chunk.js"):
+            with open(os.path.join(root, name), "w") as f:
+                f.write("x")
+        server = self.start_server(static_root=root)
+        for path in ("/", "/sign-in", "/static/js/main.1a2b3c4d.chunk.js"):
+            self.assertEqual(self.request(server, "GET", path)[0], 200)
+        self.request(server, "GET", "/v1/names")
+        series = self.series(server)
+        self.assertEqual(set(series), {("GET", "static"), ("GET", "names")})
+        self.assertEqual(series["GET", "static"]["statuses"], {"200": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Unit tests for the per-user settings store."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from settings_store import SettingsStore
+
+SETTINGS = {"spreadsheetId": "pack", "attendanceSheet": "Monday"}
+
+
+class SettingsStoreTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "settings.sqlite3")
+
+    def open(self, **kwargs):
+        store = SettingsStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_wal_mode(self):
+        self.open()
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        (mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+        self.assertEqual(mode, "wal")
+
+    def test_users_are_isolated(self):
+        store = self.open()
+        store.put("akela", SETTINGS)
+        store.put("baloo", {"spreadsheetId": "other"})
+        self.assertEqual(store.get("akela"), SETTINGS)
+        self.assertEqual(store.get("baloo"), {"spreadsheetId": "other"})
+        self.assertIsNone(store.get("bagheera"))
+
+    def test_returns_copies(self):
+        store = self.open()
+        settings = dict(SETTINGS)
+        store.put("akela", settings)
+        settings["attendanceSheet"] = "Tuesday"
+        store.get("akela")["attendanceSheet"] = "Wednesday"
+        self.assertEqual(store.get("akela"), SETTINGS)
+
+    def test_reads_see_the_last_write(self):
+        for cache_size in (0, 1, 16):
+            with self.subTest(cache_size=cache_size):
+                store = SettingsStore(":memory:", cache_size=cache_size)
+                self.addCleanup(store.close)
+                # Cache a missing user, and a user's old settings
+                self.assertIsNone(store.get("akela"))
+                store.put("akela", {"attendanceSheet": "Monday"})
+                self.assertEqual(store.get("akela"), {"attendanceSheet": "Monday"})
+                store.put("baloo", {"attendanceSheet": "Monday"})
+                store.put("akela", {"attendanceSheet": "Tuesday"})
+                self.assertEqual(store.get("akela"), {"attendanceSheet": "Tuesday"})
+                self.assertEqual(store.get("baloo"), {"attendanceSheet": "Monday"})
+
+    def test_clear(self):
+        store = self.open()
+        store.put("akela", SETTINGS)
+        store.get("akela")
+        store.clear()
+        self.assertIsNone(store.get("akela"))
+
+    def test_persists_across_reopening(self):
+        store = SettingsStore(self.path)
+        store.put("akela", SETTINGS)
+        store.close()
+        self.assertEqual(self.open().get("akela"), SETTINGS)
+
+    def test_concurrent_access(self):
+        store = self.open(cache_size=4)
+        errors = []
+
+        def work(worker):
+            try:
+                for index in range(50):
+                    user = f"user{worker}-{index % 5}"
+                    store.put(user, {"index": index})
+                    self.assertEqual(store.get(user), {"index": index})
+                    # Another worker's settings, which it keeps writing
+                    store.get(f"user{(worker + 1) % 8}-0")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        for worker in range(8):
+            for user in range(5):
+                self.assertEqual(
+                    store.get(f"user{worker}-{user}"), {"index": 45 + user}
+                )
+        # Each thread used its own connection
+        self.assertEqual(len(store._connections), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Unit tests for the emulated Google Sheets."""
+
+import http.client
+import json
+import unittest
+
+from dummy_web_server import DummyServer
+from sheets_emulator import Sheet, SheetsEmulator
+
+
+class SheetTests(unittest.TestCase):
+    def test_append_and_read_back(self):
+        sheet = Sheet("Attendance")
+        rows = [
+            {"cubName": "Akela", "date": "2026-10-16"},
+            {"cubName": "Baloo", "date": "2026-10-16"},
+            {"cubName": "Akela", "date": "2026-10-23"},
+        ]
+        self.assertEqual([sheet.append(row) for row in rows], [0, 1, 2])
+        self.assertEqual(len(sheet), 3)
+        self.assertEqual(list(sheet.rows()), rows)
+        self.assertEqual(sheet.row(1), rows[1])
+        self.assertEqual(sheet.column("cubName"), ["Akela", "Baloo", "Akela"])
+        # Each distinct value is stored once
+        self.assertEqual(sheet.columns["cubName"].values, [None, "Akela", "Baloo"])
+
+    def test_missing_columns_read_as_none(self):
+        sheet = Sheet("Attendance")
+        sheet.append({"cubName": "Akela"})
+        sheet.append({"cubName": "Baloo", "time": "7:00:00"})
+        sheet.append({"time": None})
+        self.assertEqual(
+            list(sheet.rows()),
+            [
+                {"cubName": "Akela", "time": None},
+                {"cubName": "Baloo", "time": "7:00:00"},
+                {"cubName": None, "time": None},
+            ],
+        )
+        self.assertEqual(sheet.column("date"), [None, None, None])
+
+    def test_values_of_different_types_are_kept_apart(self):
+        sheet = Sheet("Attendance")
+        values = [1, 1.0, True, "1", [1], {"a": 1}, None]
+        for value in values:
+            sheet.append({"value": value})
+        column = sheet.column("value")
+        self.assertEqual(column, values)
+        self.assertEqual([type(value) for value in column], [type(v) for v in values])
+
+    def test_codes_widen_with_distinct_values(self):
+        sheet = Sheet("Attendance")
+        for index in range(70000):
+            sheet.append({"index": index, "parity": index % 2})
+        self.assertEqual(sheet.columns["parity"].codes.typecode, "B")
+        self.assertEqual(sheet.columns["index"].codes.typecode, "I")
+        self.assertEqual(sheet.column("index"), list(range(70000)))
+
+
+class SheetsEmulatorTests(unittest.TestCase):
+    def test_append_and_snapshot(self):
+        sheets = SheetsEmulator()
+        sheets.append("spreadsheet", "Attendance", {"cubName": "Akela"})
+        sheets.append("spreadsheet", "Attendance", {"time": "7:00:00"})
+        sheets.append("spreadsheet", "Other", {"cubName": "Baloo"})
+        self.assertEqual(
+            sheets.snapshot(encode=lambda value: value and value.upper()),
+            {
+                "spreadsheet": {
+                    "Attendance": {
+                        "columns": ["cubName", "time"],
+                        "rows": [["AKELA", None], [None, "7:00:00"]],
+                    },
+                    "Other": {"columns": ["cubName"], "rows": [["BALOO"]]},
+                }
+            },
+        )
+        sheets.clear()
+        self.assertEqual(sheets.snapshot(), {})
+
+
+class DummyServerSheetsTests(unittest.TestCase):
+    def setUp(self):
+        self.server = DummyServer(port=0, log_requests=False)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def post(self, endpoint, body, token):
+        conn = http.client.HTTPConnection("localhost", self.server.port, timeout=10)
+        try:
+            conn.request(
+                "POST",
+                f"/v1/{endpoint}",
+                json.dumps(body).encode(),
+                {"Authorization": f"Bearer {token}"},
+            )
+            return conn.getresponse().status
+        finally:
+            conn.close()
+
+    def save_settings(self, token, spreadsheet_id, sheet):
+        settings = {"spreadsheetId": spreadsheet_id, "attendanceSheet": sheet}
+        self.assertEqual(self.post("settings", settings, token), 200)
+
+    def test_rows_go_to_each_users_sheet(self):
+        self.save_settings("akela", "pack", "Monday")
+        self.save_settings("baloo", "pack", "Tuesday")
+        self.post("sign-in", {"cubName": "Mowgli"}, "akela")
+        self.post("sign-in", {"cubName": "Kaa"}, "baloo")
+        self.post("sign-out", {"cubName": "Mowgli"}, "akela")
+        self.assertEqual(
+            self.server.sheets(),
+            {
+                "pack": {
+                    "Monday": [
+                        {"action": "sign-in", "cubName": "Mowgli"},
+                        {"action": "sign-out", "cubName": "Mowgli"},
+                    ],
+                    "Tuesday": [{"action": "sign-in", "cubName": "Kaa"}],
+                }
+            },
+        )
+
+    def test_rows_are_dropped_without_settings(self):
+        self.post("sign-in", {"cubName": "Mowgli"}, "akela")
+        self.save_settings("baloo", "pack", "")
+        self.post("sign-in", {"cubName": "Kaa"}, "baloo")
+        self.assertEqual(self.server.sheets(), {})
+        # Only requests after the settings are saved are written
+        self.save_settings("akela", "pack", "Monday")
+        self.post("sign-in", {"cubName": "Bagheera"}, "akela")
+        self.assertEqual(
+            self.server.sheets(),
+            {"pack": {"Monday": [{"action": "sign-in", "cubName": "Bagheera"}]}},
+        )
+
+    def test_reconfigure_clears_the_sheets(self):
+        self.save_settings("akela", "pack", "Monday")
+        self.post("sign-in", {"cubName": "Mowgli"}, "akela")
+        self.server.reconfigure()
+        self.assertEqual(self.server.sheets(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
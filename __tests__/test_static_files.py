@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Unit tests for serving a production build of the frontend."""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from static_files import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    precompress,
+    resolve,
+)
+
+SCRIPT = "static/js/main.1a2b3c4d.chunk.js"
+
+
+class StaticFilesTests(unittest.TestCase):
+    def setUp(self):
+        parent = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, parent)
+        self.root = os.path.join(parent, "build")
+        self.write("../secret.txt", "secret")
+        self.write("index.html", "<html></html>" * 50)
+        self.write("manifest.json", "{}")
+        self.write("docs/index.html", "docs")
+        self.write(SCRIPT, "console.log(1);" * 50)
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def path(self, name):
+        return os.path.realpath(os.path.join(self.root, name))
+
+    def test_files(self):
+        static = resolve(self.root, "/manifest.json")
+        self.assertEqual(static.path, self.path("manifest.json"))
+        self.assertEqual(static.size, 2)
+        self.assertEqual(static.content_type, "application/json")
+        self.assertIsNone(static.encoding)
+        static = resolve(self.root, "/" + SCRIPT)
+        # text/ or application/javascript, depending on the Python version
+        self.assertRegex(static.content_type, "/javascript; charset=utf-8$")
+
+    def test_falls_back_to_index_html(self):
+        for url_path in ("/", "/sign-in", "/static/missing.js", "/docs/missing"):
+            with self.subTest(url_path=url_path):
+                static = resolve(self.root, url_path)
+                self.assertEqual(static.path, self.path("index.html"))
+        static = resolve(self.root, "/docs/")
+        self.assertEqual(static.path, self.path("docs/index.html"))
+
+    def test_traversal(self):
+        for url_path in (
+            "/../secret.txt",
+            "/static/../../secret.txt",
+            "/%2e%2e/secret.txt",
+            "/%2E%2E%2Fsecret.txt",
+            "/..%2fsecret.txt",
+        ):
+            with self.subTest(url_path=url_path):
+                static = resolve(self.root, url_path)
+                self.assertEqual(static.path, self.path("index.html"))
+
+    def test_nothing_to_serve(self):
+        os.unlink(os.path.join(self.root, "index.html"))
+        self.assertIsNone(resolve(self.root, "/sign-in"))
+
+    def test_cache_control(self):
+        self.assertEqual(
+            resolve(self.root, "/" + SCRIPT).cache_control, IMMUTABLE_CACHE_CONTROL
+        )
+        for url_path in ("/", "/manifest.json"):
+            with self.subTest(url_path=url_path):
+                self.assertEqual(
+                    resolve(self.root, url_path).cache_control,
+                    REVALIDATE_CACHE_CONTROL,
+                )
+
+    def test_gzip_only_when_accepted(self):
+        precompress(self.root)
+        static = resolve(self.root, "/" + SCRIPT)
+        self.assertEqual((static.path, static.encoding), (self.path(SCRIPT), None))
+        static = resolve(self.root, "/" + SCRIPT, accept_gzip=True)
+        self.assertEqual(static.path, self.path(SCRIPT) + ".gz")
+        self.assertEqual(static.encoding, "gzip")
+        self.assertEqual(static.size, os.path.getsize(static.path))
+        # Still the original's content type and cache policy
+        self.assertRegex(static.content_type, "/javascript; charset=utf-8$")
+        self.assertEqual(static.cache_control, IMMUTABLE_CACHE_CONTROL)
+
+    def test_stale_gzip_is_not_served(self):
+        precompress(self.root)
+        path = self.path(SCRIPT)
+        stat = os.stat(path + ".gz")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        static = resolve(self.root, "/" + SCRIPT, accept_gzip=True)
+        self.assertEqual((static.path, static.encoding), (path, None))
+
+    def test_precompress(self):
+        # Only the compressible files big enough to be worth it
+        self.assertEqual(precompress(self.root), 2)
+        with gzip.open(self.path(SCRIPT) + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "console.log(1);" * 50)
+        self.assertFalse(os.path.exists(self.path("manifest.json") + ".gz"))
+        # Up to date variants are left alone
+        self.assertEqual(precompress(self.root), 0)
+
+    def test_etag_changes_within_a_second(self):
+        path = self.path("manifest.json")
+        os.utime(path, ns=(0, 1500000000 * 10**9))
+        before = resolve(self.root, "/manifest.json").etag
+        os.utime(path, ns=(0, 1500000000 * 10**9 + 1000))
+        after = resolve(self.root, "/manifest.json").etag
+        self.assertNotEqual(before, after)
+        self.assertEqual(resolve(self.root, "/manifest.json").etag, after)
+
+
+if __name__ == "__main__":
+    unittest.main()